@@ -0,0 +1,268 @@
+import os
+import sys
+import json
+import time
+import typing
+import platform
+import datetime
+import multiprocessing
+import concurrent.futures
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fbvsupport
+import syntheticData
+
+try:
+    import resource
+except ImportError:  # Not available on Windows, where peak memory is left out of the results
+    resource = None
+
+
+STAGES = ("analyzeFastaWithStatistics", "readBEDFile", "validateBED", "crosscheckBEDFile", "validateBEDStream")  # Named after the function each one times
+
+PRESETS = {
+    "small": {"referenceBases": 1000000, "bedRows": [1000, 100000]},
+    "medium": {"referenceBases": 100000000, "bedRows": [1000000]},
+    "large": {"referenceBases": 3000000000, "bedRows": [10000000, 50000000]}
+}
+
+DEFAULTSETTINGS = {
+    "preset": "small",
+    "contigCount": 25,
+    "lineWidth": 60,
+    "bedFormats": [3, 4, 6, 12],
+    "errorRate": 0.01,
+    "duplicateRate": 0.01,
+    "repeats": 3,
+    "seed": 0,
+    "stages": list(STAGES),
+    "dataDirectory": os.path.join(os.path.dirname(os.path.abspath(__file__)), "data"),
+    "comparePath": ""
+}
+
+
+def parseIntegerList(value:str) -> typing.List[int]:
+    return [int(float(item)) for item in value.split(",")]
+
+
+def parseStages(value:str) -> typing.List[str]:
+    stages = value.split(",")
+    for stage in stages:
+        if stage not in STAGES:
+            raise ValueError("Unknown stage %s" %stage)
+    return stages
+
+
+def parsePreset(value:str) -> str:
+    if value not in PRESETS:
+        raise ValueError("Unknown preset %s" %value)
+    return value
+
+
+VALUEOPTIONS = {
+    "--preset": ("preset", parsePreset),
+    "--reference-mb": ("referenceBases", lambda value: int(float(value) * 1000000)),
+    "--contigs": ("contigCount", int),
+    "--line-width": ("lineWidth", int),
+    "--bed-rows": ("bedRows", parseIntegerList),
+    "--bed-formats": ("bedFormats", parseIntegerList),
+    "--error-rate": ("errorRate", float),
+    "--duplicate-rate": ("duplicateRate", float),
+    "--repeats": ("repeats", int),
+    "--seed": ("seed", int),
+    "--stages": ("stages", parseStages),
+    "--data-dir": ("dataDirectory", str),
+    "--compare": ("comparePath", str)
+}
+
+
+class BenchmarkArgumentError(Exception):
+    pass
+
+
+def printHelp():
+    print("USAGE: python3 benchmarks/runBenchmarks.py [options] <results.json>")
+    print("Generates synthetic FASTA and BED files (kept in the data directory for later runs) and times each validation stage on them.")
+    print("Options:")
+    print("  --preset NAME    Input sizes to use: %s (default small)" %", ".join(PRESETS))
+    print("  --reference-mb N    Size of the synthetic reference in megabases (overrides the preset)")
+    print("  --contigs N    Number of contigs in the synthetic reference (default 25)")
+    print("  --line-width N    Bases per FASTA line (default 60)")
+    print("  --bed-rows N,N    Number of lines in each synthetic BED file (overrides the preset)")
+    print("  --bed-formats N,N    BED formats to generate, any of 3, 4, 6 and 12 (default all of them)")
+    print("  --error-rate X    Fraction of BED lines with an error (default 0.01)")
+    print("  --duplicate-rate X    Fraction of BED lines that repeat an earlier line (default 0.01)")
+    print("  --repeats N    Times to run each stage, each in a fresh process (default 3)")
+    print("  --seed N    Seed for the synthetic data (default 0)")
+    print("  --stages NAME,NAME    Stages to time, any of %s (default all of them)" %", ".join(STAGES))
+    print("  --data-dir PATH    Where to keep the synthetic data (default benchmarks/data)")
+    print("  --compare PATH    Results file from an earlier run to print a comparison with")
+
+
+def parseArgs(args:typing.List[str]) -> typing.Tuple[dict, str]:
+    settings = dict(DEFAULTSETTINGS)
+    positionalArgs = []
+    argIterator = iter(args)
+    for arg in argIterator:
+        if arg in VALUEOPTIONS:
+            settingName, settingType = VALUEOPTIONS[arg]
+            value = next(argIterator, None)
+            if value is None:
+                raise BenchmarkArgumentError("Option %s requires a value" %arg)
+            try:
+                settings[settingName] = settingType(value)
+            except ValueError:
+                raise BenchmarkArgumentError("Unable to use %s as the value for option %s" %(value, arg))
+        elif arg.startswith("--"):
+            raise BenchmarkArgumentError("Unrecognized option %s" %arg)
+        else:
+            positionalArgs.append(arg)
+    if len(positionalArgs) != 1:
+        raise BenchmarkArgumentError("Expected exactly one results file path, but got %s" %len(positionalArgs))
+    for settingName, value in PRESETS[settings["preset"]].items():
+        settings.setdefault(settingName, value)
+    return settings, positionalArgs[0]
+
+
+def peakRSSBytes() -> typing.Optional[int]:
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":  # Reported in bytes on macOS and kilobytes everywhere else
+        return peak
+    return peak * 1024
+
+
+def prepareStage(stage:str, referencePath:str, bedPath:str, contigs:typing.List[typing.Tuple[str, int]]) -> typing.Callable[[], object]:
+    """Does the set up a stage needs (outside of the timing) and returns a function that runs the stage itself"""
+    if stage == "analyzeFastaWithStatistics":
+        return lambda: fbvsupport.fastaAnalysis.analyzeFastaWithStatistics(referencePath)
+    if stage == "readBEDFile":
+        return lambda: fbvsupport.bedTable.readBEDFile(bedPath)
+    contigLengthTable = fbvsupport.contigBoundsChecker.ContigLengthTable(*zip(*contigs))
+    if stage == "validateBEDStream":
+        return lambda: fbvsupport.validations.validateBEDStream(bedPath, contigLengthTable)
+    bedList = fbvsupport.bedTable.readBEDFile(bedPath)
+    if stage == "validateBED":
+        return lambda: fbvsupport.validations.validateBED(bedList)
+    return lambda: fbvsupport.validations.crosscheckBEDFile(bedList, contigLengthTable)
+
+
+def runStage(stage:str, referencePath:str, bedPath:str, contigs:typing.List[typing.Tuple[str, int]]) -> dict:
+    """Runs in a fresh worker process, so the peak memory belongs to this stage alone (plus its set up, which is reported separately)"""
+    stageFunction = prepareStage(stage, referencePath, bedPath, contigs)
+    setupPeak = peakRSSBytes()
+    startTime = time.perf_counter()
+    stageFunction()
+    seconds = time.perf_counter() - startTime
+    return {"seconds": seconds, "setupPeakRSSBytes": setupPeak, "peakRSSBytes": peakRSSBytes()}
+
+
+def runStageInFreshProcess(stage:str, referencePath:str, bedPath:str, contigs:typing.List[typing.Tuple[str, int]]) -> dict:
+    context = multiprocessing.get_context("spawn")
+    with concurrent.futures.ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+        return executor.submit(runStage, stage, referencePath, bedPath, contigs).result()
+
+
+def prepareData(settings:dict) -> typing.Tuple[str, typing.List[typing.Tuple[str, int]], typing.List[typing.Tuple[int, int, str]]]:
+    """Writes any synthetic files that are not already in the data directory. Returns (reference path, contigs, [(BED format, rows, BED path)])."""
+    dataDirectory = settings["dataDirectory"]
+    os.makedirs(dataDirectory, exist_ok=True)
+    referencePath = syntheticData.referencePath(dataDirectory, settings["referenceBases"], settings["contigCount"], settings["lineWidth"], settings["seed"])
+    if os.path.isfile(referencePath):
+        contigs = syntheticData.referenceContigs(settings["referenceBases"], settings["contigCount"])
+    else:
+        print("Writing synthetic reference %s" %referencePath)
+        contigs = syntheticData.writeReference(referencePath + ".partial", settings["referenceBases"], settings["contigCount"], settings["lineWidth"], settings["seed"])
+        os.replace(referencePath + ".partial", referencePath)
+    bedFiles = []
+    for bedFormat in settings["bedFormats"]:
+        for rows in settings["bedRows"]:
+            bedPath = syntheticData.bedPath(dataDirectory, referencePath, rows, bedFormat, settings["errorRate"], settings["duplicateRate"], settings["seed"])
+            if not os.path.isfile(bedPath):
+                print("Writing synthetic BED %s" %bedPath)
+                syntheticData.writeBED(bedPath + ".partial", contigs, rows, bedFormat, settings["errorRate"], settings["duplicateRate"], settings["seed"])
+                os.replace(bedPath + ".partial", bedPath)
+            bedFiles.append((bedFormat, rows, bedPath))
+    return referencePath, contigs, bedFiles
+
+
+def makeMeasurement(stage:str, label:str, referencePath:str, bedPath:str, contigs:typing.List[typing.Tuple[str, int]], repeats:int) -> dict:
+    runs = [runStageInFreshProcess(stage, referencePath, bedPath, contigs) for repeat in range(max(1, repeats))]
+    seconds = [run["seconds"] for run in runs]
+    peaks = [run["peakRSSBytes"] for run in runs if run["peakRSSBytes"] is not None]
+    setupPeaks = [run["setupPeakRSSBytes"] for run in runs if run["setupPeakRSSBytes"] is not None]
+    measurement = {
+        "stage": stage,
+        "input": label,
+        "seconds": seconds,
+        "bestSeconds": min(seconds),
+        "peakRSSBytes": max(peaks) if peaks else None,
+        "setupPeakRSSBytes": max(setupPeaks) if setupPeaks else None
+    }
+    print("%s on %s: best of %s %.3fs" %(stage, label, len(seconds), measurement["bestSeconds"]))
+    return measurement
+
+
+def runBenchmarks(settings:dict) -> dict:
+    referencePath, contigs, bedFiles = prepareData(settings)
+    results = []
+    for stage in settings["stages"]:
+        if stage == "analyzeFastaWithStatistics":
+            label = os.path.basename(referencePath)
+            results.append(makeMeasurement(stage, label, referencePath, "", contigs, settings["repeats"]))
+            continue
+        for bedFormat, rows, bedPath in bedFiles:
+            label = os.path.basename(bedPath)
+            measurement = makeMeasurement(stage, label, referencePath, bedPath, contigs, settings["repeats"])
+            measurement["bedFormat"] = bedFormat
+            measurement["rows"] = rows
+            measurement["rowsPerSecond"] = rows / measurement["bestSeconds"] if measurement["bestSeconds"] else None
+            results.append(measurement)
+    return {
+        "version": fbvsupport.versionInfo.VERSION,
+        "date": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpuCount": os.cpu_count(),
+        "settings": {key: value for key, value in settings.items() if key not in ("dataDirectory", "comparePath")},
+        "results": results
+    }
+
+
+def compareResults(previous:dict, current:dict) -> typing.List[str]:
+    """Lines comparing the best time of every stage and input found in both results"""
+    previousTimes = {(result["stage"], result["input"]): result["bestSeconds"] for result in previous["results"]}
+    lines = ["Compared with version %s from %s (ratio below 1 is faster now):" %(previous.get("version"), previous.get("date"))]
+    for result in current["results"]:
+        previousSeconds = previousTimes.get((result["stage"], result["input"]))
+        if not previousSeconds:
+            continue
+        lines.append("  %s on %s: %.3fs -> %.3fs (%.2f)" %(result["stage"], result["input"], previousSeconds, result["bestSeconds"], result["bestSeconds"] / previousSeconds))
+    return lines
+
+
+def main(args:typing.List[str]) -> int:
+    try:
+        settings, outputPath = parseArgs(args)
+    except BenchmarkArgumentError as error:
+        print("ERROR: %s" %error)
+        printHelp()
+        return 1
+    benchmarkResults = runBenchmarks(settings)
+    outputFile = open(outputPath, 'w')
+    json.dump(benchmarkResults, outputFile, indent=2)
+    outputFile.close()
+    print("Wrote benchmark results to %s" %outputPath)
+    if settings["comparePath"]:
+        previousFile = open(settings["comparePath"], 'r')
+        previousResults = json.load(previousFile)
+        previousFile.close()
+        for line in compareResults(previousResults, benchmarkResults):
+            print(line)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
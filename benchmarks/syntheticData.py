@@ -0,0 +1,131 @@
+import os
+import random
+import typing
+
+
+_BASETABLE = bytes.maketrans(bytes(range(256)), b"ACGT" * 64)
+_TILEBASES = 1 << 20
+_TILECOUNT = 4
+_ERRORKINDS = ("startAfterEnd", "zeroLength", "outOfBounds", "unknownContig", "badStrand", "badScore")
+_BEDWRITEBATCH = 100000
+
+
+def referenceContigs(totalBases:int, contigCount:int) -> typing.List[typing.Tuple[str, int]]:
+    """Names and lengths of the contigs of a synthetic reference, with the bases split as evenly as possible"""
+    contigCount = max(1, min(contigCount, totalBases))
+    baseLength, remainder = divmod(totalBases, contigCount)
+    return [("chr%s" %(number + 1), baseLength + (number < remainder)) for number in range(contigCount)]
+
+
+def makeSequenceTiles(lineWidth:int, seed:int) -> typing.List[bytes]:
+    """Blocks of random sequence already wrapped at lineWidth. Each is a whole number of lines, so contigs can be written by repeating them."""
+    generator = random.Random(seed)
+    tileLines = max(1, _TILEBASES // lineWidth)
+    tiles = []
+    for tileNumber in range(_TILECOUNT):
+        tileBytes = tileLines * lineWidth
+        sequence = generator.getrandbits(tileBytes * 8).to_bytes(tileBytes, "little").translate(_BASETABLE)
+        tiles.append(b"".join(sequence[start:start + lineWidth] + b"\n" for start in range(0, len(sequence), lineWidth)))
+    return tiles
+
+
+def writeReference(path:str, totalBases:int, contigCount:int=25, lineWidth:int=60, seed:int=0) -> typing.List[typing.Tuple[str, int]]:
+    """Writes a FASTA of random bases with the same content for the same arguments every time. Returns (contig, length) for each contig."""
+    contigs = referenceContigs(totalBases, contigCount)
+    tiles = makeSequenceTiles(lineWidth, seed)
+    tileBases = len(tiles[0]) // (lineWidth + 1) * lineWidth
+    outputFile = open(path, 'wb')
+    tileNumber = 0
+    for contig, length in contigs:
+        outputFile.write(b">%s\n" %contig.encode())
+        remaining = length
+        while remaining >= tileBases:
+            outputFile.write(tiles[tileNumber % len(tiles)])
+            tileNumber += 1
+            remaining -= tileBases
+        if remaining:
+            fullLines, lastLine = divmod(remaining, lineWidth)
+            tail = tiles[tileNumber % len(tiles)][:fullLines * (lineWidth + 1)]
+            if lastLine:
+                tail += tiles[tileNumber % len(tiles)][fullLines * (lineWidth + 1):fullLines * (lineWidth + 1) + lastLine] + b"\n"
+            outputFile.write(tail)
+            tileNumber += 1
+    outputFile.close()
+    return contigs
+
+
+def makeBEDFields(generator:random.Random, contigs:typing.List[typing.Tuple[str, int]], bedFormat:int, rowNumber:int,
+                  errorKind:str=None) -> typing.List[str]:
+    contig, contigLength = generator.choice(contigs)
+    length = generator.randint(50, 2000)
+    start = generator.randrange(0, max(1, contigLength - length))
+    end = min(start + length, contigLength)
+    strand = generator.choice("+-")
+    score = "0"
+    if errorKind == "startAfterEnd":
+        start, end = end, start
+    elif errorKind == "zeroLength":
+        end = start
+    elif errorKind == "outOfBounds":
+        end = contigLength + length
+    elif errorKind == "unknownContig":
+        contig = "notInReference%s" %generator.randrange(10)
+    elif errorKind == "badStrand":
+        strand = "x"
+    elif errorKind == "badScore":
+        score = "5000"
+    fields = [contig, str(start), str(end)]
+    if bedFormat >= 4:
+        fields.append("interval%s" %rowNumber)
+    if bedFormat >= 6:
+        fields += [score, strand]
+    if bedFormat == 12:
+        blockCount = generator.randint(1, 5) if end - start >= 10 else 1
+        span = max(1, end - start)
+        blockSize = max(1, span // (2 * blockCount))
+        blockStarts = [0] + [span * number // blockCount for number in range(1, blockCount)]
+        blockSizes = [blockSize] * (blockCount - 1) + [span - blockStarts[-1]]
+        thickStart, thickEnd = sorted((start, end))  # Only the interval itself carries the error
+        fields += [str(thickStart), str(thickEnd), "0,0,0", str(blockCount), ",".join(map(str, blockSizes)) + ",", ",".join(map(str, blockStarts)) + ","]
+    return fields
+
+
+def writeBED(path:str, contigs:typing.List[typing.Tuple[str, int]], rows:int, bedFormat:int=6, errorRate:float=0.0, duplicateRate:float=0.0,
+             seed:int=0) -> str:
+    """Writes a BED file of random intervals on the given contigs. errorRate is the fraction of lines with one of several kinds of error, and
+    duplicateRate the fraction of lines that repeat an earlier line (and so both its interval and its name)."""
+    generator = random.Random("%s:%s:%s" %(seed, bedFormat, rows))
+    outputFile = open(path, 'w', newline="\n")
+    outputFile.write("track name=synthetic%s description=\"Synthetic benchmark intervals\"\n" %bedFormat)
+    lines = []
+    previousLines = []
+    for rowNumber in range(rows):
+        draw = generator.random()
+        if previousLines and draw < duplicateRate:
+            line = generator.choice(previousLines)
+        else:
+            errorKind = generator.choice(_ERRORKINDS) if draw < duplicateRate + errorRate else None
+            if errorKind in ("badStrand", "badScore") and bedFormat < 6:
+                errorKind = "startAfterEnd"
+            line = "\t".join(makeBEDFields(generator, contigs, bedFormat, rowNumber, errorKind))
+            if len(previousLines) < 1000:
+                previousLines.append(line)
+            else:
+                previousLines[generator.randrange(1000)] = line
+        lines.append(line)
+        if len(lines) >= _BEDWRITEBATCH:
+            outputFile.write("\n".join(lines) + "\n")
+            lines = []
+    if lines:
+        outputFile.write("\n".join(lines) + "\n")
+    outputFile.close()
+    return path
+
+
+def referencePath(dataDirectory:str, totalBases:int, contigCount:int, lineWidth:int, seed:int) -> str:
+    return os.path.join(dataDirectory, "reference_%sbp_%scontigs_%swide_seed%s.fa" %(totalBases, contigCount, lineWidth, seed))
+
+
+def bedPath(dataDirectory:str, referenceFile:str, rows:int, bedFormat:int, errorRate:float, duplicateRate:float, seed:int) -> str:
+    referenceName = os.path.splitext(os.path.basename(referenceFile))[0]
+    return os.path.join(dataDirectory, "%s_%srows_bed%s_err%s_dup%s_seed%s.bed" %(referenceName, rows, bedFormat, errorRate, duplicateRate, seed))
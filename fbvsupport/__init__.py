@@ -1,10 +1,43 @@
-from . import samtoolsRunner
-from . import bedReader
-from . import faidxReader
-from . import fastaDictReader
-from . import gzipDetector
-from . import validations
-from . import validationReport
-from . import slottedDataClass
-from . import fastaAnalysis
-from . import gui
+import importlib
+
+
+_SUBMODULES = (
+    "samtoolsRunner",
+    "bedReader",
+    "bedTable",
+    "bedBlocks",
+    "contigBoundsChecker",
+    "duplicateKeys",
+    "intervalIndex",
+    "referenceCache",
+    "sidecarFile",
+    "faidxReader",
+    "fastaDictReader",
+    "gzipDetector",
+    "bgzf",
+    "validations",
+    "validationReport",
+    "errorCollection",
+    "jsonWriter",
+    "stageTimer",
+    "slottedDataClass",
+    "sequenceStatistics",
+    "sequenceFetcher",
+    "fastaAnalysis",
+    "versionInfo",
+    "gui",
+    "validationServer",
+    "batchValidation"
+)
+
+
+def __getattr__(name:str):
+    """Submodules are imported the first time they are used rather than with the package, so a run only pays for the parts it needs (and
+    the GUI is only loaded if it is going to be shown)"""
+    if name in _SUBMODULES:
+        return importlib.import_module("." + name, __name__)  # Also sets the attribute, so this only runs once per submodule
+    raise AttributeError("module %r has no attribute %r" %(__name__, name))
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_SUBMODULES))
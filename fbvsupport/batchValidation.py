@@ -0,0 +1,182 @@
+import os
+import json
+import typing
+import itertools
+from . import errorCollection
+from . import referenceCache
+from . import slottedDataClass
+from . import stageTimer
+from . import validationReport
+from . import validations
+from . import versionInfo
+
+
+class ManifestError(Exception):
+    pass
+
+
+@slottedDataClass.slottedDataClass(slots=True)
+class BatchJob:
+    fastaPath: str
+    bedPaths: typing.List[str]
+    outputPath: str
+
+
+def resolvePath(path:str, manifestDirectory:str) -> str:
+    return os.path.join(manifestDirectory, os.path.expanduser(path))  # Absolute paths are kept as they are
+
+
+def readTSVManifest(manifestPath:str) -> typing.List[BatchJob]:
+    """One job per line with the FASTA, any number of BED files and then the output file separated by tabs, in the same order as on the
+    command line. Blank lines and lines starting with # are skipped."""
+    jobs = []
+    manifestDirectory = os.path.dirname(os.path.abspath(manifestPath))
+    manifestFile = open(manifestPath, 'r')
+    for lineNumber, line in enumerate(manifestFile, 1):
+        line = line.rstrip("\r\n")
+        if not line.strip() or line.startswith("#"):
+            continue
+        fields = [field.strip() for field in line.split("\t") if field.strip()]
+        if len(fields) < 2:
+            manifestFile.close()
+            raise ManifestError("Line %s of manifest %s needs at least a FASTA and an output file separated by a tab" %(lineNumber, manifestPath))
+        paths = [resolvePath(field, manifestDirectory) for field in fields]
+        jobs.append(BatchJob(paths[0], paths[1:-1], paths[-1]))
+    manifestFile.close()
+    return jobs
+
+
+def readJSONManifest(manifestPath:str) -> typing.List[BatchJob]:
+    """A list of jobs, each an object like {"fasta": path, "beds": [paths], "output": path}"""
+    manifestDirectory = os.path.dirname(os.path.abspath(manifestPath))
+    manifestFile = open(manifestPath, 'r')
+    try:
+        manifest = json.load(manifestFile)
+    except ValueError as error:
+        raise ManifestError("Unable to read manifest %s as JSON: %s" %(manifestPath, error))
+    finally:
+        manifestFile.close()
+    if not isinstance(manifest, list):
+        raise ManifestError("Manifest %s should hold a list of jobs" %manifestPath)
+    jobs = []
+    for jobNumber, job in enumerate(manifest, 1):
+        if not isinstance(job, dict) or not isinstance(job.get("fasta"), str) or not isinstance(job.get("output"), str):
+            raise ManifestError("Job %s of manifest %s needs fasta and output paths" %(jobNumber, manifestPath))
+        bedPaths = job.get("beds", [])
+        if not isinstance(bedPaths, list) or not all(isinstance(bedPath, str) for bedPath in bedPaths):
+            raise ManifestError("The beds of job %s of manifest %s should be a list of paths" %(jobNumber, manifestPath))
+        jobs.append(BatchJob(resolvePath(job["fasta"], manifestDirectory), [resolvePath(bedPath, manifestDirectory) for bedPath in bedPaths],
+                             resolvePath(job["output"], manifestDirectory)))
+    return jobs
+
+
+def readManifest(manifestPath:str) -> typing.List[BatchJob]:
+    """Reads a JSON manifest (if the file ends in .json) or else a tab separated one. Relative paths are taken as relative to the manifest."""
+    if manifestPath.lower().endswith(".json"):
+        jobs = readJSONManifest(manifestPath)
+    else:
+        jobs = readTSVManifest(manifestPath)
+    if not jobs:
+        raise ManifestError("No jobs found in manifest %s" %manifestPath)
+    outputPaths = set()
+    for job in jobs:
+        outputPath = os.path.abspath(job.outputPath)
+        if outputPath in outputPaths:
+            raise ManifestError("More than one job in manifest %s writes to %s" %(manifestPath, job.outputPath))
+        outputPaths.add(outputPath)
+    return jobs
+
+
+def groupJobsByReference(jobs:typing.Iterable[BatchJob]) -> typing.List[typing.List[BatchJob]]:
+    """Jobs that share a FASTA, in the order each FASTA first appears and with the jobs for it in their original order"""
+    groups = {}
+    for job in jobs:
+        groups.setdefault(os.path.abspath(job.fastaPath), []).append(job)
+    return list(groups.values())
+
+
+def runBatch(jobs:typing.List[BatchJob], verbose:bool=True, streaming:bool=False, workers:int=1, useCache:bool=True,
+             cacheDirectory:str=referenceCache.DEFAULTCACHEDIRECTORY, cacheSizeLimit:int=None, backend:str="auto",
+             checkOverlaps:bool=False, compareBEDs:bool=False, maxExamples:int=errorCollection.DEFAULTMAXEXAMPLES,
+             instrument:bool=False, checkSequence:bool=False, gcRange:typing.Tuple[float, float]=validations.DEFAULTGCRANGE,
+             maxSoftMasked:float=validations.DEFAULTMAXSOFTMASKED, checkFastaContent:bool=False,
+             cacheBEDTables:bool=False, writeIndex:bool=False) -> typing.Iterator[typing.Tuple[BatchJob, validationReport.ValidationReport]]:
+    """Runs every job with its own report and yields (job, report) as each one finishes. Jobs are grouped by FASTA so that each reference is
+    analyzed and validated once, and all of the BED files for a reference are validated in one pool of worker processes (when more than one
+    worker is requested). A BED file used by several jobs on the same reference is only validated once. The options are the same as for
+    runValidations and apply to every job."""
+    if verbose:
+        print("Tecan Genomics FASTA and BED cross validator | Version: %s | Date: %s" % (versionInfo.VERSION, versionInfo.DATE))
+    if useCache:
+        cache = referenceCache.ReferenceCache(cacheDirectory, cacheSizeLimit, cacheBEDTables)
+        if verbose:
+            print("Caching analyses in %s (use --no-cache to turn this off)" %cache.directory)
+    else:
+        cache = None
+    for groupJobs in groupJobsByReference(jobs):
+        yield from runReferenceGroup(groupJobs, cache, verbose, streaming, workers, backend, checkOverlaps, compareBEDs, maxExamples, instrument,
+                                     checkSequence, gcRange, maxSoftMasked, checkFastaContent, writeIndex)
+
+
+def runReferenceGroup(jobs:typing.List[BatchJob], cache:referenceCache.ReferenceCache, verbose:bool, streaming:bool, workers:int, backend:str,
+                      checkOverlaps:bool, compareBEDs:bool, maxExamples:int,
+                      instrument:bool, checkSequence:bool=False, gcRange:typing.Tuple[float, float]=validations.DEFAULTGCRANGE,
+                      maxSoftMasked:float=validations.DEFAULTMAXSOFTMASKED, checkFastaContent:bool=False,
+                      writeIndex:bool=False) -> typing.Iterator[typing.Tuple[BatchJob, validationReport.ValidationReport]]:
+    reports = [validationReport.ValidationReport(validations.REPORTNAME) for job in jobs]
+    timers = [stageTimer.StageTimer(enabled=instrument) for job in jobs]
+    ready = [validations.startReport(report, job.fastaPath, job.bedPaths) for job, report in zip(jobs, reports)]
+    readyJobs = list(itertools.compress(jobs, ready))
+    reference = None
+    if readyJobs:
+        firstReady = ready.index(True)
+        preparationReport = validationReport.ValidationReport(validations.REPORTNAME)
+        reference = validations.prepareReference(jobs[firstReady].fastaPath, preparationReport, verbose=verbose, cache=cache, backend=backend,
+                                                 timer=timers[firstReady], needStatistics=checkFastaContent,
+                                                 writeIndex=writeIndex)  # Timed as part of the first job that needed it
+    if reference is None:
+        for job, report, jobReady in zip(jobs, reports, ready):
+            if jobReady:
+                report.addCriticals(preparationReport.criticalList)
+            yield job, report
+        return
+    bedUses = {}
+    for job in readyJobs:
+        for bedPath in dict.fromkeys(job.bedPaths):
+            bedUses[bedPath] = bedUses.get(bedPath, 0) + 1
+    buildIntervalIndex = checkOverlaps or compareBEDs or checkSequence
+    workers = min(workers, len(bedUses))
+    executor = None
+    bedResults = {}
+    if workers > 1:
+        executor = validations.makeBEDWorkerPool(reference.contigLengthTable, workers)
+        for bedPath in bedUses:
+            bedResults[bedPath] = executor.submit(validations._validateBEDFileInWorker, bedPath, streaming, buildIntervalIndex, instrument, maxExamples, cache)
+    try:
+        for job, report, timer, jobReady in zip(jobs, reports, timers, ready):
+            if not jobReady:
+                yield job, report
+                continue
+            uniqueBedPaths = list(dict.fromkeys(job.bedPaths))
+            jobResults = []
+            for bedPath in uniqueBedPaths:
+                if executor is not None:
+                    result, records = bedResults[bedPath].result()
+                    timer.merge(records)
+                elif bedPath in bedResults:
+                    result = bedResults[bedPath]
+                else:
+                    result = validations.validateBEDFile(bedPath, reference.contigLengthTable, streaming, buildIntervalIndex, timer, maxExamples, cache)
+                    bedResults[bedPath] = result
+                jobResults.append(result)
+                bedUses[bedPath] -= 1
+                if not bedUses[bedPath]:
+                    del bedResults[bedPath]  # Results are only kept while a later job still needs them
+            validations.addValidationResults(report, job.fastaPath, reference, uniqueBedPaths, jobResults, checkOverlaps, compareBEDs, maxExamples, timer,
+                                             checkSequence, gcRange, maxSoftMasked, checkFastaContent)
+            for stage, values in timer.toDict().items():
+                report.addPerformance(stage, values)
+            yield job, report
+    finally:
+        if executor is not None:
+            executor.shutdown()
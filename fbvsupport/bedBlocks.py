@@ -0,0 +1,110 @@
+import bisect
+import itertools
+import json
+import operator
+import typing
+from . import bedTable
+
+
+_PLAININTEGERCHARACTERS = b"0123456789,-"
+
+
+def splitIntegerLists(integerLists:typing.Sequence[str]) -> typing.Tuple[typing.List[str], typing.List[int]]:
+    """Takes comma separated lists as written in BED12 (with or without the trailing comma) and returns (lists without the trailing comma,
+    number of items in each list)"""
+    strippedLists = list(map(operator.methodcaller("rstrip", ","), integerLists))
+    itemCounts = list(map(operator.add, map(operator.methodcaller("count", ","), strippedLists), map(bool, strippedLists)))
+    return strippedLists, itemCounts
+
+
+def parseIntegerLists(strippedLists:typing.Iterable[str]) -> typing.List[int]:
+    """Parses every list into one flat list, raising ValueError if any item is not an integer"""
+    joinedLists = ",".join(filter(None, strippedLists))
+    if not joinedLists:
+        return []
+    if joinedLists.isascii() and not joinedLists.encode().translate(None, _PLAININTEGERCHARACTERS):
+        try:
+            return json.loads("[%s]" %joinedLists)  # The JSON scanner parses plain integers about twice as fast as int()
+        except ValueError:  # Leading zeros and stray minus signs are not JSON, so those get int()'s own verdict
+            pass
+    return list(map(int, joinedLists.split(",")))
+
+
+def listIsIntegers(strippedList:str) -> bool:
+    try:
+        parseIntegerLists([strippedList])
+    except ValueError:
+        return False
+    return True
+
+
+def selectRows(column:typing.Sequence, rows:typing.Sequence[int]) -> list:
+    return list(map(column.__getitem__, rows))
+
+
+def findBlockErrors(bedList:bedTable.BEDTable) -> typing.List[typing.Tuple[int, str, str, tuple]]:
+    """Checks the blocks of every BED12 row that has no other errors. The block lists of all rows are parsed into two flat lists and each
+    check runs over the whole list at once, so Python only visits the rows that fail. Returns (row, error category, message template,
+    message arguments) in row order."""
+    if bedList.bedFormatLength != 12:
+        return []
+    if bedList.errorRows:
+        rows = list(itertools.filterfalse(set(bedList.errorRows).__contains__, range(len(bedList))))
+        blockCounts = selectRows(bedList.blockCounts, rows)
+        sizeLists, sizeCounts = splitIntegerLists(selectRows(bedList.blockSizes, rows))
+        startLists, startCounts = splitIntegerLists(selectRows(bedList.blockStarts, rows))
+    else:
+        rows = range(len(bedList))
+        blockCounts = bedList.blockCounts
+        sizeLists, sizeCounts = splitIntegerLists(bedList.blockSizes)
+        startLists, startCounts = splitIntegerLists(bedList.blockStarts)
+    errors = []
+    for position in itertools.compress(range(len(rows)), map(operator.ne, sizeCounts, blockCounts)):
+        errors.append((rows[position], "Block count does not match block sizes", "Block count of %s does not match the %s block sizes given", (blockCounts[position], sizeCounts[position])))
+    for position in itertools.compress(range(len(rows)), map(operator.ne, startCounts, blockCounts)):
+        errors.append((rows[position], "Block count does not match block starts", "Block count of %s does not match the %s block starts given", (blockCounts[position], startCounts[position])))
+    checked = list(map(operator.and_, map(operator.eq, sizeCounts, blockCounts), map(operator.eq, startCounts, blockCounts)))
+    checked = list(map(operator.and_, checked, map(bool, blockCounts)))
+    try:
+        sizes = parseIntegerLists(itertools.compress(sizeLists, checked))
+        starts = parseIntegerLists(itertools.compress(startLists, checked))
+    except ValueError:  # Find the rows at fault and leave them out
+        for position in itertools.compress(range(len(rows)), checked):
+            if not listIsIntegers(sizeLists[position]):
+                errors.append((rows[position], "Block sizes are not integers", "Block sizes %s are not a comma separated list of integers", (sizeLists[position],)))
+                checked[position] = False
+            elif not listIsIntegers(startLists[position]):
+                errors.append((rows[position], "Block starts are not integers", "Block starts %s are not a comma separated list of integers", (startLists[position],)))
+                checked[position] = False
+        sizes = parseIntegerLists(itertools.compress(sizeLists, checked))
+        starts = parseIntegerLists(itertools.compress(startLists, checked))
+    checkedRows = rows if all(checked) else list(itertools.compress(rows, checked))
+    blockOffsets = list(itertools.accumulate(itertools.compress(blockCounts, checked), initial=0))
+    firstBlocks = blockOffsets[:-1]
+    lastBlocks = list(map(operator.sub, blockOffsets[1:], itertools.repeat(1)))
+    blockEnds = list(map(operator.add, starts, sizes))
+    shortBlocks = itertools.compress(range(len(sizes)), map(operator.gt, itertools.repeat(1), sizes)) if sizes and min(sizes) < 1 else []
+    for position in shortBlocks:
+        row = bisect.bisect_right(blockOffsets, position) - 1
+        errors.append((checkedRows[row], "Empty block", "Block %s has a size of %s, but blocks must be at least one base long", (position - blockOffsets[row] + 1, sizes[position])))
+    firstStarts = selectRows(starts, firstBlocks)
+    for row in itertools.compress(range(len(checkedRows)), firstStarts):
+        errors.append((checkedRows[row], "First block does not start at the interval start", "First block starts at %s, but should start at 0", (firstStarts[row],)))
+    lastEnds = selectRows(blockEnds, lastBlocks)
+    if checkedRows is rows and not bedList.errorRows:
+        lengths = list(map(operator.sub, bedList.ends, bedList.starts))
+    else:
+        lengths = list(map(operator.sub, selectRows(bedList.ends, checkedRows), selectRows(bedList.starts, checkedRows)))
+    for row in itertools.compress(range(len(checkedRows)), map(operator.ne, lastEnds, lengths)):
+        errors.append((checkedRows[row], "Last block does not end at the interval end", "Last block ends %s bases into the interval, but the interval is %s bases long", (lastEnds[row], lengths[row])))
+    rowStarts = set(firstBlocks)
+    overlapping = itertools.compress(range(1, len(starts)), map(operator.lt, starts[1:], blockEnds[:-1]))
+    reportedRows = set()
+    for position in itertools.filterfalse(rowStarts.__contains__, overlapping):
+        row = bisect.bisect_right(blockOffsets, position) - 1
+        if row in reportedRows:
+            continue
+        reportedRows.add(row)
+        errors.append((checkedRows[row], "Overlapping blocks", "Block %s starts at %s, before the end of the block before it at %s", (position - blockOffsets[row] + 1, starts[position], blockEnds[position - 1])))
+    errors.sort(key=operator.itemgetter(0))
+    return errors
@@ -1,13 +1,50 @@
 import typing
 import os
+import functools
 import dataclasses
 from . import slottedDataClass
+from . import bgzf
 
 
 VALIDBEDFORMATLENGTHS = [3, 4, 6, 12]
 
 VALIDATIONRUN = False
 
+INVALIDSTRANDERROR = "Valid strand values include +, -, and . only. %s is not a valid strand value."
+NEGATIVESTARTERROR = "Start value of %s is less than zero"
+STARTAFTERENDERROR = "Given start value for interval of %s that was AFTER end value of %s"
+ZEROLENGTHERROR = "Start and end values of %s are equal, specifying an interval of no length."
+NOTINTEGERERROR = "%s was given where an integer belongs"
+SCORENOTNUMBERERROR = "Score value of %s does not appear to be a number."
+SCORERANGEERROR = "Score value was %s, but should be between 0 and 1000"
+BLOCKCOUNTNOTINTEGERERROR = "Block count value of %s does not appear to be an integer."
+NEGATIVEBLOCKCOUNTERROR = "Block count value of %s is less than zero."
+THICKINTERVALPREFIX = "ThickInterval: "
+LINEERRORCATEGORIES = {  # Message templates of the line errors above and the category each is counted under
+    INVALIDSTRANDERROR: "Invalid strand",
+    NEGATIVESTARTERROR: "Negative start",
+    STARTAFTERENDERROR: "Start after end",
+    ZEROLENGTHERROR: "Zero length interval",
+    SCORENOTNUMBERERROR: "Score is not a number",
+    SCORERANGEERROR: "Score out of range",
+    BLOCKCOUNTNOTINTEGERERROR: "Invalid block count",
+    NEGATIVEBLOCKCOUNTERROR: "Invalid block count",
+    NOTINTEGERERROR: "Value is not an integer"
+}
+_LINEERRORSTARTS = [(template.partition("%s")[0], category) for template, category in LINEERRORCATEGORIES.items() if not template.startswith("%s")]
+_LINEERRORCATEGORYCACHESIZE = 4096
+
+
+@functools.lru_cache(maxsize=_LINEERRORCATEGORYCACHESIZE)  # A file that is broken throughout tends to repeat the same few messages
+def categorizeLineError(error:str) -> str:
+    """Category of a formatted line error message from BEDLine"""
+    if error.startswith(THICKINTERVALPREFIX):
+        return "Thick interval: " + categorizeLineError(error[len(THICKINTERVALPREFIX):])
+    for messageStart, category in _LINEERRORSTARTS:
+        if error.startswith(messageStart):
+            return category
+    return LINEERRORCATEGORIES[NOTINTEGERERROR]
+
 
 #@dataclasses.dataclass(order=True, slots=True)
 @slottedDataClass.slottedDataClass(order=True, slots=True)
@@ -28,13 +65,13 @@ class Interval:
         self._end = self.checkInt(self._end)
         validatedStrandValue = self.checkStrandValue(self._strand)
         if not validatedStrandValue:
-            message = "Valid strand values include +, -, and . only. %s is not a valid strand value." % self.strand
+            message = INVALIDSTRANDERROR % self.strand
             if VALIDATIONRUN:
                 self.errors.append(message)
             else:
                 raise GenomicIntervalError(message)
         if not self.startValidRelativeToBase(self._start):
-            message = "Start value of %s is less than zero" %self._start
+            message = NEGATIVESTARTERROR %self._start
             if VALIDATIONRUN:
                 self.errors.append(message)
             else:
@@ -44,13 +81,13 @@ class Interval:
 
     def validateStartAndEndRelativePositions(self, start: int, end: int):
         if end < start:
-            message = "Given start value for interval of %s that was AFTER end value of %s" % (start, end)
+            message = STARTAFTERENDERROR % (start, end)
             if VALIDATIONRUN:
                 self.errors.append(message)
             else:
                 raise GenomicIntervalError(message)
         if start == end:
-            message =  "Start and end values of %s are equal, specifying an interval of no length." % start
+            message =  ZEROLENGTHERROR % start
             if VALIDATIONRUN:
                 self.errors.append(message)
             else:
@@ -60,7 +97,7 @@ class Interval:
         try:
             return int(value)
         except ValueError:
-            message = "%s was given where an integer belongs" % value
+            message = NOTINTEGERERROR % value
             if VALIDATIONRUN:
                 self.errors.append(message)
             else:
@@ -81,7 +118,7 @@ class Interval:
         start = self.checkInt(value)
         self.validateStartAndEndRelativePositions(start, self._end)
         if not self.startValidRelativeToBase(start):
-            message = "Start value of %s is less than zero" % start
+            message = NEGATIVESTARTERROR % start
             if VALIDATIONRUN:
                 self.errors.append(message)
             else:
@@ -115,7 +152,7 @@ class Interval:
     def strand(self, strandValue:str):
         validatedStrandValue = self.checkStrandValue(strandValue)
         if not validatedStrandValue:
-            message = "Valid strand values include +, -, and . only. %s is not a valid strand value." %strandValue
+            message = INVALIDSTRANDERROR %strandValue
             if VALIDATIONRUN:
                 self.errors.append(message)
             else:
@@ -212,13 +249,13 @@ class BEDLine:
         try:
             score = float(score)
         except ValueError:
-            message = "Score value of %s does not appear to be a number." %score
+            message = SCORENOTNUMBERERROR %score
             if VALIDATIONRUN:
                 self._errors.append(message)
             else:
                 raise BEDLineError(message)
         if type(score) in [float, int] and not 0 <= score <= 1000:
-            message = "Score value was %s, but should be between 0 and 1000" %score
+            message = SCORERANGEERROR %score
             if VALIDATIONRUN:
                 self._errors.append(message)
             else:
@@ -231,13 +268,13 @@ class BEDLine:
         try:
             blockCount = int(blockCount)
         except ValueError:
-            message = "Block count value of %s does not appear to be an integer." %blockCount
+            message = BLOCKCOUNTNOTINTEGERERROR %blockCount
             if VALIDATIONRUN:
                 self._errors.append(message)
             else:
                 raise BEDLineError(message)
         if blockCount < 0:
-            message = "Block count value of %s is less than zero." %blockCount
+            message = NEGATIVEBLOCKCOUNTERROR %blockCount
             if VALIDATIONRUN:
                 self._errors.append(message)
             else:
@@ -253,7 +290,7 @@ class BEDLine:
             errorList.append(error)
         if self.thickInterval:
             for error in self.thickInterval.errors:
-                errorList.append("ThickInterval: " + error)
+                errorList.append(THICKINTERVALPREFIX + error)
         return errorList
 
     @property
@@ -333,10 +370,10 @@ def processBEDStream(bedStream:typing.TextIO) -> typing.List[BEDLine]:
         raise BEDLineError("Attempted to process BED data, but go no BED lines")
 
 
-def readBEDFile(path:str) -> typing.List[BEDLine]:
+def readBEDFile(path:str, threads:int=bgzf.DEFAULTTHREADS) -> typing.List[BEDLine]:
     if not os.path.isfile(path):
         raise FileNotFoundError("Unable to find file %s" %path)
-    file = open(path, 'r')
+    file = bgzf.openText(path, threads)
     bedLineList = processBEDStream(file)
     file.close()
     return bedLineList
@@ -0,0 +1,578 @@
+import array
+import bisect
+import itertools
+import math
+import operator
+import os
+import sys
+import typing
+from . import bedReader
+from . import bgzf
+from . import errorCollection
+
+
+_VALIDSTRANDS = ("+", "-", ".")
+_READSIZE = 4 * 1024 * 1024
+_UNPLAINCHARACTERS = (" ", "\r", "\x0b", "\x0c", "\x1c", "\x1d", "\x1e", "\x1f")  # Whitespace that strip() would remove or that becomes a tab
+_UNPLAINLINESTARTS = frozenset("\t#bBtT")  # Could be a header, a comment or a line that needs stripping
+_DOTSCORE = {".": "0"}
+_LINEERRORPREFIX = "Line %s: "
+_LINEERRORS = {template: (category, _LINEERRORPREFIX + template) for template, category in bedReader.LINEERRORCATEGORIES.items()}
+_THICKLINEERRORS = {template: ("Thick interval: " + category, _LINEERRORPREFIX + bedReader.THICKINTERVALPREFIX + template)
+                    for template, category in bedReader.LINEERRORCATEGORIES.items()}
+
+DEFAULTCHUNKSIZE = 100000
+
+
+class StringTable:
+    """Hands out a small integer code for each distinct string so that columns can hold codes instead of string objects"""
+
+    def __init__(self):
+        self.strings = []
+        self.codes = {}
+
+    def encode(self, string:str) -> int:
+        code = self.codes.get(string)
+        if code is None:
+            code = len(self.strings)
+            string = sys.intern(string)
+            self.strings.append(string)
+            self.codes[string] = code
+        return code
+
+    def decode(self, code:int) -> str:
+        return self.strings[code]
+
+    def __contains__(self, string:str):
+        return string in self.codes
+
+    def __len__(self):
+        return len(self.strings)
+
+
+class BEDTable:
+    """Column-oriented storage for a BED file. Values are kept in arrays (one entry per row) and BEDLine objects are only built when a single row is requested.
+    Rows with errors are listed in errorRows, and their errors go in lineErrors, which keeps at most maxExamples of each category (all of them if
+    None) as message templates and arguments and only counts the rest."""
+
+    def __init__(self, bedFormatLength:int, firstRow:int=0, maxExamples:int=None):
+        self.bedFormatLength = int(bedFormatLength)
+        self.firstRow = firstRow
+        self.contigs = StringTable()
+        self.strands = StringTable()
+        self.contigCodes = array.array("i")
+        self.starts = array.array("q")
+        self.ends = array.array("q")
+        self.strandCodes = array.array("i")
+        self.scores = array.array("d")
+        self.names = []
+        self.thickStarts = array.array("q")
+        self.thickEnds = array.array("q")
+        self.rgbs = []
+        self.blockCounts = array.array("q")
+        self.blockSizes = []
+        self.blockStarts = []
+        self.errorRows = array.array("q")
+        self.lineErrors = errorCollection.ErrorCollection(maxExamples)
+        self._rowSources = {}
+        self._defaultStrandCode = self.strands.encode(".")
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __iter__(self) -> typing.Iterator[bedReader.BEDLine]:
+        for index in range(len(self)):
+            yield self.getBEDLine(index)
+
+    def __getitem__(self, index:int) -> bedReader.BEDLine:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("BED table row index %s is out of range" %index)
+        return self.getBEDLine(index)
+
+    def appendFields(self, fields:typing.List[str]) -> None:
+        """Adds one row from its split fields. Anything that is not a clean row gets handed to BEDLine so the error messages (or exceptions) are exactly the ones it would give."""
+        formatLength = self.bedFormatLength
+        try:
+            start = int(fields[1])
+            end = int(fields[2])
+            clean = 0 <= start < end
+            if formatLength >= 6:
+                score = fields[4]
+                score = 0.0 if score == "." else float(score)
+                strand = fields[5]
+                clean = clean and 0 <= score <= 1000 and strand in _VALIDSTRANDS
+            if formatLength == 12:
+                thickStart = int(fields[6])
+                thickEnd = int(fields[7])
+                blockCount = int(fields[9])
+                clean = clean and 0 <= thickStart < thickEnd and blockCount >= 0
+        except ValueError:
+            clean = False
+        if not clean:
+            self._appendBEDLine(bedReader.BEDLine(formatLength, *fields), fields)
+            return
+        self.contigCodes.append(self.contigs.encode(fields[0]))
+        self.starts.append(start)
+        self.ends.append(end)
+        if formatLength >= 4:
+            self.names.append(sys.intern(fields[3]))
+        if formatLength >= 6:
+            self.scores.append(score)
+            self.strandCodes.append(self.strands.encode(strand))
+        else:
+            self.strandCodes.append(self._defaultStrandCode)
+        if formatLength == 12:
+            self.thickStarts.append(thickStart)
+            self.thickEnds.append(thickEnd)
+            self.rgbs.append(sys.intern(fields[8]))
+            self.blockCounts.append(blockCount)
+            self.blockSizes.append(fields[10])
+            self.blockStarts.append(fields[11])
+
+    def appendColumns(self, columns:typing.List[typing.List[str]]) -> bool:
+        """Adds a batch of rows given as columns of field strings, converting each column with one map call. In a validation run, rows with
+        values out of range or scores that are not numbers are added along with their errors. Nothing is added and False is returned for a
+        batch holding a row BEDLine would fail on (or, outside of a validation run, any row with errors), so the caller can fall back to adding
+        the rows one at a time with appendFields."""
+        formatLength = self.bedFormatLength
+        try:
+            starts = array.array("q", list(map(int, columns[1])))  # Building the list first is quicker than filling the array from the map
+            ends = array.array("q", list(map(int, columns[2])))
+            if formatLength == 12:
+                thickStarts = array.array("q", list(map(int, columns[6])))
+                thickEnds = array.array("q", list(map(int, columns[7])))
+                blockCounts = array.array("q", list(map(int, columns[9])))
+        except (ValueError, OverflowError):  # BEDLine fails outright on positions and block counts that are not integers
+            return False
+        unparsableScoreRows = set()
+        if formatLength >= 6:
+            scores, unparsableScoreRows = convertScores(columns[4])
+        if not starts:
+            return True
+        clean = min(starts) >= 0 and all(map(operator.lt, starts, ends))
+        if formatLength >= 6:
+            strands = set(columns[5])
+            clean = clean and strands.issubset(_VALIDSTRANDS) and min(scores) >= 0 and max(scores) <= 1000 and not math.isnan(sum(scores))  # min and max can step over a NaN
+        if formatLength == 12:
+            if not all(map(operator.le, thickStarts, thickEnds)):  # BEDLine fails outright on these, so appendFields has to report them
+                return False
+            clean = clean and min(thickStarts) >= 0 and all(map(operator.lt, thickStarts, thickEnds)) and min(blockCounts) >= 0
+        if not clean:
+            if not bedReader.VALIDATIONRUN:  # BEDLine raises on the first bad row outside of a validation run, so let appendFields do that
+                return False
+            self._addRowErrors(len(self), starts, ends, columns, scores if formatLength >= 6 else None, unparsableScoreRows,
+                               thickStarts if formatLength == 12 else None, thickEnds if formatLength == 12 else None, blockCounts if formatLength == 12 else None)
+        contigCodes = self.contigs.codes
+        for contig in set(columns[0]).difference(contigCodes):
+            self.contigs.encode(contig)
+        self.contigCodes.extend(map(contigCodes.__getitem__, columns[0]))
+        self.starts.extend(starts)
+        self.ends.extend(ends)
+        if formatLength >= 4:
+            self.names.extend(map(sys.intern, columns[3]))
+        if formatLength >= 6:
+            self.scores.extend(scores)
+            strandCodes = self.strands.codes
+            for strand in strands.difference(strandCodes):
+                self.strands.encode(strand)
+            self.strandCodes.extend(map(strandCodes.__getitem__, columns[5]))
+        else:
+            self.strandCodes.extend(itertools.repeat(self._defaultStrandCode, len(starts)))
+        if formatLength == 12:
+            self.thickStarts.extend(thickStarts)
+            self.thickEnds.extend(thickEnds)
+            self.rgbs.extend(map(sys.intern, columns[8]))
+            self.blockCounts.extend(blockCounts)
+            self.blockSizes.extend(columns[10])
+            self.blockStarts.extend(columns[11])
+        return True
+
+    def _addRowErrors(self, firstIndex:int, starts:array.array, ends:array.array, columns:typing.List[typing.List[str]], scores:array.array,
+                      unparsableScoreRows:typing.Container[int], thickStarts:array.array, thickEnds:array.array, blockCounts:array.array) -> None:
+        """Records the errors of the rows in a converted batch that have values out of range or scores that are not numbers, with the messages
+        BEDLine gives for them in the same order. This keeps a file with an error on every line on the bulk path instead of building a BEDLine
+        for each one, and messages are only formatted for the errors lineErrors keeps. Empty thick intervals are zeroed the way BEDLine leaves
+        them. The columns only hold a NaN for a score that is not a number, so the fields of such a row are kept if any of its errors were."""
+        formatLength = self.bedFormatLength
+        zeros = itertools.repeat(0)
+        checks = [map(operator.ge, starts, ends), map(operator.lt, starts, zeros)]
+        if formatLength >= 6:
+            strandIsValid = {strand: bool(bedReader.Interval.checkStrandValue(strand)) for strand in set(columns[5])}
+            checks += [map(operator.not_, map(strandIsValid.__getitem__, columns[5])), map(operator.lt, scores, zeros),
+                       map(operator.gt, scores, itertools.repeat(1000)), map(operator.ne, scores, scores)]
+        if formatLength == 12:
+            checks += [map(operator.ge, thickStarts, thickEnds), map(operator.lt, thickStarts, zeros), map(operator.lt, blockCounts, zeros)]
+        lineErrors = self.lineErrors
+        for row in itertools.compress(range(len(starts)), map(any, zip(*checks))):
+            errors = []
+            if row in unparsableScoreRows:
+                errors.append((_LINEERRORS[bedReader.SCORENOTNUMBERERROR], (columns[4][row],)))
+            elif formatLength >= 6 and not 0 <= scores[row] <= 1000:
+                errors.append((_LINEERRORS[bedReader.SCORERANGEERROR], (scores[row],)))
+            if formatLength == 12 and blockCounts[row] < 0:
+                errors.append((_LINEERRORS[bedReader.NEGATIVEBLOCKCOUNTERROR], (blockCounts[row],)))
+            if formatLength >= 6 and not strandIsValid[columns[5][row]]:
+                errors.append((_LINEERRORS[bedReader.INVALIDSTRANDERROR], (columns[5][row],)))
+            start = starts[row]
+            end = ends[row]
+            if start < 0:
+                errors.append((_LINEERRORS[bedReader.NEGATIVESTARTERROR], (start,)))
+            if end < start:
+                errors.append((_LINEERRORS[bedReader.STARTAFTERENDERROR], (start, end)))
+            if start == end:
+                errors.append((_LINEERRORS[bedReader.ZEROLENGTHERROR], (start,)))
+            if formatLength == 12:
+                if thickStarts[row] == thickEnds[row]:
+                    thickStarts[row] = thickEnds[row] = 0
+                elif thickStarts[row] < 0:
+                    errors.append((_THICKLINEERRORS[bedReader.NEGATIVESTARTERROR], (thickStarts[row],)))
+            if errors:
+                self.errorRows.append(firstIndex + row)
+                lineNumber = self.firstRow + firstIndex + row + 1
+                kept = [lineErrors.add(category, template, lineNumber, *args) for (category, template), args in errors]
+                if row in unparsableScoreRows and any(kept):
+                    self._rowSources[firstIndex + row] = [column[row] for column in columns]
+
+    def appendBEDLine(self, bedLine:bedReader.BEDLine) -> None:
+        self._appendBEDLine(bedLine, bedLine)
+
+    def _appendBEDLine(self, bedLine:bedReader.BEDLine, source:[bedReader.BEDLine, typing.List[str]]) -> None:
+        index = len(self)
+        formatLength = self.bedFormatLength
+        errors = bedLine.errors
+        kept = False
+        if errors:
+            self.errorRows.append(index)
+            lineNumber = self.firstRow + index + 1
+            for error in errors:  # BEDLine has already formatted these
+                kept = self.lineErrors.add(bedReader.categorizeLineError(error), "Line %s: %s", lineNumber, error) or kept
+        if kept or isinstance(source, bedReader.BEDLine):  # Rows rebuilt from the columns give the same errors, except for values that are not numbers
+            self._rowSources[index] = source
+        self.contigCodes.append(self.contigs.encode(bedLine.contig))
+        self.starts.append(bedLine.start)
+        self.ends.append(bedLine.end)
+        if formatLength >= 4:
+            self.names.append(sys.intern(bedLine.name))
+        if formatLength >= 6:
+            score = bedLine._score
+            self.scores.append(score if type(score) in [float, int] else math.nan)
+        self.strandCodes.append(self.strands.encode(bedLine.strand))
+        if formatLength == 12:
+            self.thickStarts.append(bedLine.thickInterval.start if bedLine.thickInterval else 0)
+            self.thickEnds.append(bedLine.thickInterval.end if bedLine.thickInterval else 0)
+            self.rgbs.append(sys.intern(bedLine.rgb))
+            blockCount = bedLine.blockCount
+            self.blockCounts.append(blockCount if type(blockCount) == int else -1)
+            self.blockSizes.append(bedLine.blockSizes)
+            self.blockStarts.append(bedLine.blockStarts)
+
+    def getBEDLine(self, index:int) -> bedReader.BEDLine:
+        source = self._rowSources.get(index)
+        if isinstance(source, bedReader.BEDLine):
+            return source
+        if source is not None:
+            return bedReader.BEDLine(self.bedFormatLength, *source)
+        fields = [self.contig(index), self.starts[index], self.ends[index]]
+        if self.bedFormatLength >= 4:
+            fields.append(self.names[index])
+        if self.bedFormatLength >= 6:
+            fields.append(self.scores[index])
+            fields.append(self.strand(index))
+        if self.bedFormatLength == 12:
+            fields += [self.thickStarts[index], self.thickEnds[index], self.rgbs[index], self.blockCounts[index], self.blockSizes[index], self.blockStarts[index]]
+        return bedReader.BEDLine(self.bedFormatLength, *fields)
+
+    def contig(self, index:int) -> str:
+        return self.contigs.decode(self.contigCodes[index])
+
+    def strand(self, index:int) -> str:
+        return self.strands.decode(self.strandCodes[index])
+
+    def name(self, index:int) -> str:
+        if self.bedFormatLength >= 4:
+            return self.names[index]
+        return ""
+
+    def nameOrElse(self, index:int) -> str:
+        if self.bedFormatLength > 3:
+            return self.names[index]
+        return "%s_%s_%s" %(self.contig(index), self.starts[index], self.ends[index])
+
+    def namesOrElse(self) -> typing.Iterable[str]:
+        if self.bedFormatLength > 3:
+            return self.names
+        decode = self.contigs.strings
+        return ("%s_%s_%s" %(decode[code], start, end) for code, start, end in zip(self.contigCodes, self.starts, self.ends))
+
+    def intervalString(self, index:int) -> str:
+        strand = self.strand(index)
+        if not strand in "+-":
+            strand = ""
+        return "%s:%s-%s%s" %(self.contig(index), self.starts[index], self.ends[index], strand)
+
+    def hasErrors(self, index:int) -> bool:
+        position = bisect.bisect_left(self.errorRows, index)
+        return position < len(self.errorRows) and self.errorRows[position] == index
+
+    def errors(self, index:int) -> typing.List[str]:
+        """The errors BEDLine gives for the row. Rows whose errors lineErrors did not keep are rebuilt from the columns, where a score that was
+        not a number reads as nan."""
+        if not self.hasErrors(index):
+            return []
+        return self.getBEDLine(index).errors
+
+    def toSections(self) -> typing.Dict[str, typing.Any]:
+        """The table as named arrays and lists of strings, for storing in a sidecar file and reading back with fromSections. Raises ValueError
+        for tables holding rows that were added as BEDLine objects, which cannot be stored."""
+        sourceRows = array.array("q", sorted(self._rowSources))
+        sources = []
+        for row in sourceRows:
+            source = self._rowSources[row]
+            if isinstance(source, bedReader.BEDLine) or any("\t" in field for field in source):
+                raise ValueError("Row %s of the BED table cannot be stored" %row)
+            sources.append("\t".join(source))
+        return {
+            "layout": {"bedFormatLength": self.bedFormatLength, "firstRow": self.firstRow},
+            "contigs": self.contigs.strings,
+            "strands": self.strands.strings,
+            "contigCodes": self.contigCodes,
+            "starts": self.starts,
+            "ends": self.ends,
+            "strandCodes": self.strandCodes,
+            "scores": self.scores,
+            "names": self.names,
+            "thickStarts": self.thickStarts,
+            "thickEnds": self.thickEnds,
+            "rgbs": self.rgbs,
+            "blockCounts": self.blockCounts,
+            "blockSizes": self.blockSizes,
+            "blockStarts": self.blockStarts,
+            "errorRows": self.errorRows,
+            "lineErrors": self.lineErrors.toDict(),
+            "sourceRows": sourceRows,
+            "sources": sources
+        }
+
+    @classmethod
+    def fromSections(cls, section:typing.Callable[[str], typing.Any]) -> 'BEDTable':
+        """Rebuilds a table from the sections written by toSections, given a function that returns each section by name"""
+        layout = section("layout")
+        table = cls(layout["bedFormatLength"], layout["firstRow"])
+        for contig in section("contigs"):
+            table.contigs.encode(contig)
+        for strand in section("strands"):
+            table.strands.encode(strand)
+        for column in ("contigCodes", "starts", "ends", "strandCodes", "scores", "names", "thickStarts", "thickEnds", "rgbs", "blockCounts",
+                       "blockSizes", "blockStarts"):
+            setattr(table, column, section(column))
+        table.errorRows = section("errorRows")
+        table.lineErrors = errorCollection.ErrorCollection.fromDict(section("lineErrors"))
+        table._rowSources = {row: source.split("\t") for row, source in zip(section("sourceRows"), section("sources"))}
+        return table
+
+    @classmethod
+    def fromBEDLines(cls, bedLines:typing.Iterable[bedReader.BEDLine]) -> 'BEDTable':
+        table = None
+        for bedLine in bedLines:
+            if table is None:
+                table = cls(bedLine._bedFormatLength)
+            table.appendBEDLine(bedLine)
+        if table is None:
+            table = cls(3)
+        return table
+
+
+def convertScores(scoreColumn:typing.Sequence[str]) -> typing.Tuple[array.array, typing.Set[int]]:
+    """Converts a column of scores, reading "." as 0. A score that is not a number becomes a NaN and its row goes in the returned set, which
+    is only worked out value by value for a column that has one."""
+    try:
+        return array.array("d", list(map(float, map(_DOTSCORE.get, scoreColumn, scoreColumn)))), set()
+    except ValueError:
+        pass
+    scores = array.array("d")
+    unparsableRows = set()
+    for row, score in enumerate(scoreColumn):
+        try:
+            scores.append(float(_DOTSCORE.get(score, score)))
+        except ValueError:
+            scores.append(math.nan)
+            unparsableRows.add(row)
+    return scores, unparsableRows
+
+
+def asBEDTable(bedData:[BEDTable, typing.Iterable[bedReader.BEDLine]]) -> BEDTable:
+    if isinstance(bedData, BEDTable):
+        return bedData
+    return BEDTable.fromBEDLines(bedData)
+
+
+class BEDStreamParser:
+    """Splits a BED stream into batches of data lines held as columns of field strings. The stream is read in large pieces and a piece with
+    nothing unusual in it (no headers, comments, blank lines, spaces or stray whitespace, and the same number of tabs on every line) is
+    split into fields with a single str.split over the whole piece. Any other piece is taken a line at a time so it gets exactly the
+    handling (and error messages) of a line by line read."""
+
+    def __init__(self, bedStream:typing.TextIO, readSize:int=_READSIZE):
+        self.bedStream = bedStream
+        self.readSize = readSize
+        self.bedFormat = None
+
+    def prepareLine(self, line:str) -> typing.Optional[typing.Tuple[str, typing.List[str]]]:
+        """Returns (line, fields) for a data line, or None for a line that should be skipped"""
+        line = line.strip()
+        if not line:
+            return None
+        if line.lower().startswith("browser"):
+            return None
+        if line.lower().startswith("track"):
+            return None
+        if line.startswith("#"):
+            return None
+        line = line.replace(" ", "\t")
+        lineList = line.split("\t")
+        lineLength = len(lineList)
+        if self.bedFormat is None:
+            self.bedFormat = lineLength
+            if not self.bedFormat in bedReader.VALIDBEDFORMATLENGTHS:
+                raise bedReader.BEDLineError("This file appears to be a BED with %s elements per line, but the only valid numbers of elements per line are %s" %(self.bedFormat, bedReader.VALIDBEDFORMATLENGTHS))
+        if lineLength != self.bedFormat:
+            raise bedReader.BEDLineError("This BED file appears to be a BED%s format, but length %s was seen on line %s" %(self.bedFormat,lineLength, line))
+        return line, lineList
+
+    def iterateBlocks(self) -> typing.Iterator[str]:
+        """Yields the stream as pieces made up of whole lines, without the newline at the end of the last one"""
+        remainder = ""
+        while True:
+            text = self.bedStream.read(self.readSize)
+            if not text:
+                break
+            text = remainder + text
+            lastNewline = text.rfind("\n")
+            if lastNewline < 0:
+                remainder = text
+                continue
+            remainder = text[lastNewline + 1:]
+            yield text[:lastNewline]
+        if remainder:
+            yield remainder
+
+    def blockIsPlain(self, block:str, lines:typing.List[str]) -> bool:
+        """True if every line of the piece is a data line that needs no stripping or replacing of spaces and has the right number of tabs"""
+        if not block.isascii() or any(character in block for character in _UNPLAINCHARACTERS):
+            return False
+        try:
+            if not _UNPLAINLINESTARTS.isdisjoint(map(operator.itemgetter(0), lines)) or "\t" in set(map(operator.itemgetter(-1), lines)):
+                return False
+        except IndexError:  # A blank line
+            return False
+        return all(map(operator.eq, map(operator.methodcaller("count", "\t"), lines), itertools.repeat(self.bedFormat - 1)))
+
+    def parseBlock(self, block:str, retryBulk:bool=True) -> typing.Iterator[typing.Tuple[typing.List[str], typing.List[typing.List[str]]]]:
+        """Yields (lines, columns) batches for one piece of the stream"""
+        lines = block.split("\n")
+        if self.bedFormat is not None and self.blockIsPlain(block, lines):
+            fields = block.replace("\n", "\t").split("\t")
+            yield lines, [fields[column::self.bedFormat] for column in range(self.bedFormat)]
+            return
+        keptLines = []
+        keptFields = []
+        for lineNumber, line in enumerate(lines):
+            try:
+                prepared = self.prepareLine(line)
+            except bedReader.BEDLineError:
+                if keptLines:  # Rows before the bad line are processed first in case one of them has an error of its own
+                    yield keptLines, [list(column) for column in zip(*keptFields)]
+                raise
+            if prepared is None:
+                continue
+            keptLines.append(prepared[0])
+            keptFields.append(prepared[1])
+            if retryBulk and lineNumber + 1 < len(lines):
+                # Headers at the top of the file (or the first line fixing the format) should not keep the rest of the piece off the bulk path
+                yield keptLines, [list(column) for column in zip(*keptFields)]
+                yield from self.parseBlock("\n".join(lines[lineNumber + 1:]), retryBulk=False)
+                return
+        if keptLines:
+            yield keptLines, [list(column) for column in zip(*keptFields)]
+
+    def __iter__(self) -> typing.Iterator[typing.Tuple[typing.List[str], typing.List[typing.List[str]]]]:
+        for block in self.iterateBlocks():
+            yield from self.parseBlock(block)
+
+
+def iterateBEDLines(bedStream:typing.TextIO) -> typing.Iterator[typing.Tuple[str, typing.List[str]]]:
+    """Yields (line, fields) for each data line after skipping headers and comments and checking that every line has the same number of fields"""
+    for lines, columns in BEDStreamParser(bedStream):
+        for line, lineList in zip(lines, zip(*columns)):
+            yield line, list(lineList)
+
+
+def appendLineToTable(bedTable:BEDTable, line:str, lineList:typing.List[str]) -> None:
+    try:
+        bedTable.appendFields(lineList)
+    except Exception as error:
+        raise bedReader.BEDLineError("Trying to process the following line produced this error %s: %s   %s" %(type(error).__name__, error, line))
+
+
+def appendBatchToTable(bedTable:BEDTable, lines:typing.List[str], columns:typing.List[typing.List[str]]) -> None:
+    if bedTable.appendColumns(columns):
+        return
+    for line, lineList in zip(lines, zip(*columns)):
+        appendLineToTable(bedTable, line, list(lineList))
+
+
+def processBEDStream(bedStream:typing.TextIO, maxExamples:int=None) -> BEDTable:
+    bedTable = None
+    for lines, columns in BEDStreamParser(bedStream):
+        if bedTable is None:
+            bedTable = BEDTable(len(columns), maxExamples=maxExamples)
+        appendBatchToTable(bedTable, lines, columns)
+    if bedTable:
+        return bedTable
+    else:
+        raise bedReader.BEDLineError("Attempted to process BED data, but go no BED lines")
+
+
+def iterateBEDStream(bedStream:typing.TextIO, chunkSize:int=DEFAULTCHUNKSIZE, maxExamples:int=None) -> typing.Iterator[BEDTable]:
+    """Reads the stream as a series of BEDTables of at most chunkSize rows so that only one chunk is held in memory at a time. Each chunk's
+    firstRow is set to the number of rows before it so line numbers in error messages match a whole-file read."""
+    bedTable = None
+    rowsRead = 0
+    for lines, columns in BEDStreamParser(bedStream):
+        batchStart = 0
+        while batchStart < len(lines):
+            if bedTable is None:
+                bedTable = BEDTable(len(columns), firstRow=rowsRead, maxExamples=maxExamples)
+            batchEnd = batchStart + chunkSize - len(bedTable)
+            appendBatchToTable(bedTable, lines[batchStart:batchEnd], [column[batchStart:batchEnd] for column in columns])
+            batchStart = batchEnd
+            if len(bedTable) >= chunkSize:
+                rowsRead += len(bedTable)
+                yield bedTable
+                bedTable = None
+    if bedTable:
+        yield bedTable
+    elif not rowsRead:
+        raise bedReader.BEDLineError("Attempted to process BED data, but go no BED lines")
+
+
+def readBEDFile(path:str, threads:int=bgzf.DEFAULTTHREADS, maxExamples:int=None) -> BEDTable:
+    if not os.path.isfile(path):
+        raise FileNotFoundError("Unable to find file %s" %path)
+    file = bgzf.openText(path, threads)
+    bedTable = processBEDStream(file, maxExamples)
+    file.close()
+    return bedTable
+
+
+def iterateBEDFile(path:str, chunkSize:int=DEFAULTCHUNKSIZE, threads:int=bgzf.DEFAULTTHREADS, maxExamples:int=None) -> typing.Iterator[BEDTable]:
+    if not os.path.isfile(path):
+        raise FileNotFoundError("Unable to find file %s" %path)
+    file = bgzf.openText(path, threads)
+    try:
+        for bedTable in iterateBEDStream(file, chunkSize, maxExamples):
+            yield bedTable
+    finally:
+        file.close()
@@ -0,0 +1,261 @@
+import io
+import os
+import zlib
+import struct
+import bisect
+import typing
+import gzip
+import collections
+import concurrent.futures
+from . import gzipDetector
+
+
+_GZIPMAGIC = b"\x1f\x8b"
+_FIXEDHEADERLENGTH = 12
+_TRAILERLENGTH = 8
+_MAXBLOCKSIZE = 65536
+_BLOCKSINFLIGHTPERTHREAD = 8
+DEFAULTTHREADS = min(8, os.cpu_count() or 1)
+
+
+class BGZFError(Exception):
+    pass
+
+
+def parseBlockSize(header:bytes) -> int:
+    """Takes the 12 byte fixed gzip header plus the extra field of a block and returns the total block size from its BC subfield, or 0 if this is not a BGZF block"""
+    if len(header) < _FIXEDHEADERLENGTH or header[:2] != _GZIPMAGIC or header[2] != 8 or not header[3] & 4:
+        return 0
+    extraLength = struct.unpack("<H", header[10:12])[0]
+    extra = header[_FIXEDHEADERLENGTH:_FIXEDHEADERLENGTH + extraLength]
+    position = 0
+    while position + 4 <= len(extra):
+        subfieldLength = struct.unpack("<H", extra[position + 2:position + 4])[0]
+        if extra[position:position + 2] == b"BC" and subfieldLength == 2:
+            return struct.unpack("<H", extra[position + 4:position + 6])[0] + 1
+        position += 4 + subfieldLength
+    return 0
+
+
+def streamIsBGZF(dataStream:typing.IO[bytes]) -> bool:
+    dataStream.seek(0)
+    header = dataStream.read(_FIXEDHEADERLENGTH)
+    if len(header) == _FIXEDHEADERLENGTH and header[:2] == _GZIPMAGIC:
+        header += dataStream.read(struct.unpack("<H", header[10:12])[0])
+    dataStream.seek(0)
+    return parseBlockSize(header) > 0
+
+
+def fileIsBGZF(path:str) -> bool:
+    fileHandle = open(path, 'rb')
+    isBGZF = streamIsBGZF(fileHandle)
+    fileHandle.close()
+    return isBGZF
+
+
+def decompressBlock(block:bytes) -> bytes:
+    extraLength = struct.unpack("<H", block[10:12])[0]
+    uncompressedSize = struct.unpack("<I", block[-4:])[0]
+    data = zlib.decompress(block[_FIXEDHEADERLENGTH + extraLength:-_TRAILERLENGTH], -zlib.MAX_WBITS)  # Raw deflate, zlib releases the GIL while inflating
+    if len(data) != uncompressedSize:
+        raise BGZFError("BGZF block decompressed to %s bytes, but its trailer says it should be %s" %(len(data), uncompressedSize))
+    return data
+
+
+def gziPathFor(path:str) -> str:
+    return path + ".gzi"
+
+
+def gziIndexIsCurrent(path:str) -> bool:
+    gziPath = gziPathFor(path)
+    return os.path.isfile(gziPath) and os.path.getmtime(gziPath) >= os.path.getmtime(path)
+
+
+def readGziIndex(path:str) -> typing.List[typing.Tuple[int, int]]:
+    """Reads a .gzi file (as written by bgzip/samtools) into (compressed offset, uncompressed offset) pairs for every block after the first"""
+    gziFile = open(path, 'rb')
+    data = gziFile.read()
+    gziFile.close()
+    if len(data) < 8:
+        raise BGZFError("BGZF index at %s is too short to be valid" %path)
+    entryCount = struct.unpack("<Q", data[:8])[0]
+    if len(data) != 8 + entryCount * 16:
+        raise BGZFError("BGZF index at %s does not have the %s entries it says it has" %(path, entryCount))
+    values = struct.unpack("<%sQ" %(entryCount * 2), data[8:])
+    return list(zip(values[0::2], values[1::2]))
+
+
+def writeGziIndex(gziIndex:typing.List[typing.Tuple[int, int]], path:str) -> str:
+    gziFile = open(path, 'wb')
+    gziFile.write(struct.pack("<Q", len(gziIndex)))
+    for compressedOffset, uncompressedOffset in gziIndex:
+        gziFile.write(struct.pack("<QQ", compressedOffset, uncompressedOffset))
+    gziFile.close()
+    return path
+
+
+class BGZFReader:
+    """Block level reader for BGZF files. It can stream the whole file in large decompressed chunks or, given a block index, read any range of the uncompressed data by decompressing only the blocks that cover it."""
+
+    def __init__(self, path:str, gziIndex:typing.List[typing.Tuple[int, int]]=None):
+        self.path = path
+        self.file = open(path, 'rb')
+        self.gziIndex = gziIndex
+        self._blockStarts = None
+
+    def close(self) -> None:
+        self.file.close()
+
+    def readBlock(self) -> bytes:
+        header = self.file.read(_FIXEDHEADERLENGTH)
+        if not header:
+            return b""
+        if len(header) == _FIXEDHEADERLENGTH:
+            header += self.file.read(struct.unpack("<H", header[10:12])[0])
+        blockSize = parseBlockSize(header)
+        if not blockSize:
+            raise BGZFError("Found data that is not a BGZF block at byte %s of %s" %(self.file.tell() - len(header), self.path))
+        block = header + self.file.read(blockSize - len(header))
+        if len(block) != blockSize:
+            raise BGZFError("BGZF file %s ends partway through a block" %self.path)
+        return block
+
+    def iterateBlocks(self) -> typing.Iterator[typing.Tuple[int, bytes]]:
+        """Yields (compressed offset, compressed block) for every block from the current position"""
+        compressedOffset = self.file.tell()
+        block = self.readBlock()
+        while block:
+            yield compressedOffset, block
+            compressedOffset += len(block)
+            block = self.readBlock()
+
+    def iterateDecompressedBlocks(self, threads:int=1) -> typing.Iterator[typing.Tuple[int, bytes]]:
+        """Yields (compressed offset, decompressed data) for every block in file order. With more than one thread, blocks are read in order
+        and inflated on a thread pool with a bounded number of blocks in flight, since each block can be decompressed independently."""
+        self.file.seek(0)
+        if threads <= 1:
+            for compressedOffset, block in self.iterateBlocks():
+                yield compressedOffset, decompressBlock(block)
+            return
+        with concurrent.futures.ThreadPoolExecutor(max_workers=threads) as executor:
+            pending = collections.deque()
+            for compressedOffset, block in self.iterateBlocks():
+                pending.append((compressedOffset, executor.submit(decompressBlock, block)))
+                if len(pending) >= threads * _BLOCKSINFLIGHTPERTHREAD:
+                    compressedOffset, future = pending.popleft()
+                    yield compressedOffset, future.result()
+            while pending:
+                compressedOffset, future = pending.popleft()
+                yield compressedOffset, future.result()
+
+    def iterateChunks(self, chunkSize:int, threads:int=1) -> typing.Iterator[bytes]:
+        pieces = []
+        piecesLength = 0
+        for compressedOffset, data in self.iterateDecompressedBlocks(threads):
+            if not data:
+                continue
+            pieces.append(data)
+            piecesLength += len(data)
+            if piecesLength >= chunkSize:
+                yield b"".join(pieces)
+                pieces = []
+                piecesLength = 0
+        if pieces:
+            yield b"".join(pieces)
+
+    def read(self, uncompressedStart:int, length:int) -> bytes:
+        if self.gziIndex is None:
+            raise BGZFError("Random access to %s needs a block index" %self.path)
+        if self._blockStarts is None:
+            self._blockStarts = [0] + [uncompressedOffset for compressedOffset, uncompressedOffset in self.gziIndex]
+        blockNumber = bisect.bisect_right(self._blockStarts, uncompressedStart) - 1
+        if blockNumber == 0:
+            compressedOffset, blockUncompressedStart = 0, 0
+        else:
+            compressedOffset, blockUncompressedStart = self.gziIndex[blockNumber - 1]
+        self.file.seek(compressedOffset)
+        pieces = []
+        collected = 0
+        needed = uncompressedStart - blockUncompressedStart + length
+        while collected < needed:
+            block = self.readBlock()
+            if not block:
+                break
+            data = decompressBlock(block)
+            pieces.append(data)
+            collected += len(data)
+        data = b"".join(pieces)
+        offsetInData = uncompressedStart - blockUncompressedStart
+        return data[offsetInData:offsetInData + length]
+
+
+def buildGziIndex(path:str) -> typing.List[typing.Tuple[int, int]]:
+    """Builds the block index bgzip -i would write from the uncompressed size in the trailer of each block, without decompressing anything"""
+    reader = BGZFReader(path)
+    gziIndex = []
+    uncompressedOffset = 0
+    for compressedOffset, block in reader.iterateBlocks():
+        uncompressedSize = struct.unpack("<I", block[-4:])[0]
+        if not uncompressedSize:
+            continue
+        if compressedOffset:
+            gziIndex.append((compressedOffset, uncompressedOffset))
+        uncompressedOffset += uncompressedSize
+    reader.close()
+    return gziIndex
+
+
+def loadOrBuildGziIndex(path:str, writeIndex:bool=False) -> typing.List[typing.Tuple[int, int]]:
+    """Reads the .gzi next to the file if it is current, or builds the index in memory. It is only written next to the file with writeIndex."""
+    gziPath = gziPathFor(path)
+    if gziIndexIsCurrent(path):
+        return readGziIndex(gziPath)
+    gziIndex = buildGziIndex(path)
+    if writeIndex:
+        try:
+            writeGziIndex(gziIndex, gziPath)
+        except OSError as error:
+            print("WARNING: Unable to write BGZF index to %s: %s" %(gziPath, error))
+    return gziIndex
+
+
+class BGZFStream(io.RawIOBase):
+    """Read-only file object over the decompressed contents of a BGZF file, with the blocks being inflated on a thread pool ahead of the reader"""
+
+    def __init__(self, path:str, threads:int=DEFAULTTHREADS):
+        self.reader = BGZFReader(path)
+        self._blocks = self.reader.iterateDecompressedBlocks(threads)
+        self._current = memoryview(b"")
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        while not self._current:
+            nextBlock = next(self._blocks, None)
+            if nextBlock is None:
+                return 0
+            self._current = memoryview(nextBlock[1])
+        length = min(len(buffer), len(self._current))
+        buffer[:length] = self._current[:length]
+        self._current = self._current[length:]
+        return length
+
+    def close(self) -> None:
+        if not self.closed:
+            self._blocks.close()
+            self.reader.close()
+        super().close()
+
+
+def openText(path:str, threads:int=DEFAULTTHREADS) -> typing.TextIO:
+    """Opens a plain, gzip or BGZF compressed file for reading as text"""
+    fileHandle = open(path, 'rb')
+    gzipped = gzipDetector.streamIsGzipped(fileHandle)
+    bgzfCompressed = gzipped and streamIsBGZF(fileHandle)
+    fileHandle.close()
+    if bgzfCompressed:
+        return io.TextIOWrapper(io.BufferedReader(BGZFStream(path, threads), buffer_size=_MAXBLOCKSIZE))
+    if gzipped:
+        return gzip.open(path, 'rt')
+    return open(path, 'r')
@@ -0,0 +1,104 @@
+import array
+import hashlib
+import itertools
+import operator
+import typing
+from . import bedTable
+from . import faidxReader
+
+
+_UNKNOWNCONTIGLIMIT = -(2 ** 63)
+
+
+class ContigLengthTable:
+    """Contig lengths from the FASTA index keyed by an integer code. This is built once per reference and reused for every BED checked against it."""
+
+    def __init__(self, contigs:typing.Iterable[str]=(), lengths:typing.Iterable[int]=()):
+        self.codes = {}
+        self.contigs = []
+        self.lengths = array.array("q")
+        self._fingerprint = None
+        for contig, length in zip(contigs, lengths):
+            self.addContig(contig, length)
+
+    def addContig(self, contig:str, length:int) -> int:
+        self._fingerprint = None
+        if contig in self.codes:  # Keep the last length seen for a duplicated contig name, the same as building a dict from the index would
+            code = self.codes[contig]
+            self.lengths[code] = int(length)
+            return code
+        code = len(self.contigs)
+        self.codes[contig] = code
+        self.contigs.append(contig)
+        self.lengths.append(int(length))
+        return code
+
+    def __contains__(self, contig:str):
+        return contig in self.codes
+
+    def __len__(self):
+        return len(self.contigs)
+
+    def length(self, contig:str) -> int:
+        return self.lengths[self.codes[contig]]
+
+    def toDict(self) -> typing.Dict[str, int]:
+        return dict(zip(self.contigs, self.lengths))
+
+    def fingerprint(self) -> str:
+        """Hash of the contig names and lengths, which is all a BED crosscheck depends on"""
+        if self._fingerprint is None:
+            self._fingerprint = hashlib.sha1("\n".join(map("%s\t%s".__mod__, zip(self.contigs, self.lengths))).encode("utf-8", "surrogatepass")).hexdigest()
+        return self._fingerprint
+
+    @classmethod
+    def fromFaidx(cls, faidxData:typing.Iterable[faidxReader.FastaIndexLine]) -> 'ContigLengthTable':
+        table = cls()
+        for line in faidxData:
+            table.addContig(line.contig, line.baseLength)
+        return table
+
+
+def asContigLengthTable(contigData:[ContigLengthTable, typing.Iterable[faidxReader.FastaIndexLine]]) -> ContigLengthTable:
+    if isinstance(contigData, ContigLengthTable):
+        return contigData
+    return ContigLengthTable.fromFaidx(contigData)
+
+
+class CrosscheckResult:
+
+    def __init__(self, unknownContigRows:typing.List[int], outOfBoundsRows:typing.List[int]):
+        self.unknownContigRows = unknownContigRows
+        self.outOfBoundsRows = outOfBoundsRows
+
+    def __len__(self):
+        return len(self.unknownContigRows) + len(self.outOfBoundsRows)
+
+
+def crosscheckBEDTable(table:bedTable.BEDTable, contigLengthTable:ContigLengthTable) -> CrosscheckResult:
+    """Finds rows on contigs missing from the FASTA and rows whose last included base is past the contig length. Contig names are
+    translated once per distinct BED contig, then every row is compared through map/compress so no per-row Python code runs."""
+    # A row is out of bounds when end - 1 > contig length, so the per-row limit is stored as contig length + 1
+    limitByBEDCode = array.array("q")
+    unknownCodes = []
+    for bedCode, contig in enumerate(table.contigs.strings):
+        fastaCode = contigLengthTable.codes.get(contig)
+        if fastaCode is None:
+            limitByBEDCode.append(_UNKNOWNCONTIGLIMIT)
+            unknownCodes.append(bedCode)
+        else:
+            limitByBEDCode.append(contigLengthTable.lengths[fastaCode] + 1)
+    rowLimits = array.array("q", map(limitByBEDCode.__getitem__, table.contigCodes))
+    rowIndices = range(len(table))
+    if unknownCodes:
+        unknownCodeFlags = [False] * len(limitByBEDCode)
+        for bedCode in unknownCodes:
+            unknownCodeFlags[bedCode] = True
+        unknownContigRows = list(itertools.compress(rowIndices, map(unknownCodeFlags.__getitem__, table.contigCodes)))
+        knownRowFlags = map(operator.ne, rowLimits, itertools.repeat(_UNKNOWNCONTIGLIMIT))
+        outOfBoundsFlags = map(operator.and_, knownRowFlags, map(operator.gt, table.ends, rowLimits))
+    else:
+        unknownContigRows = []
+        outOfBoundsFlags = map(operator.gt, table.ends, rowLimits)
+    outOfBoundsRows = list(itertools.compress(rowIndices, outOfBoundsFlags))
+    return CrosscheckResult(unknownContigRows, outOfBoundsRows)
@@ -0,0 +1,113 @@
+import array
+import itertools
+import operator
+import typing
+from . import bedTable
+
+
+_BUCKETMASK = 63  # Keys are sorted in 64 buckets
+
+
+class IntervalKeyLayout:
+    """Packs (contig code, start, end) into one integer so duplicated intervals can be found by sorting plain integers instead of hashing
+    tuples. The key is exact, so the interval can be read back from it without going back to the BED rows."""
+
+    def __init__(self, starts:typing.Sequence[int], ends:typing.Sequence[int]):
+        self.offset = min(min(starts, default=0), min(ends, default=0), 0)  # Rows with errors can carry negative positions
+        self.width = max(max(starts, default=0), max(ends, default=0), 0) - self.offset
+        self.width = self.width.bit_length()
+        self.mask = (1 << self.width) - 1
+
+    def keys(self, contigCodes:typing.Iterable[int], starts:typing.Iterable[int], ends:typing.Iterable[int]) -> typing.Iterator[int]:
+        width = itertools.repeat(self.width)
+        offset = itertools.repeat(-self.offset)
+        codeAndStart = map(operator.or_, map(operator.lshift, contigCodes, width), map(operator.add, starts, offset))
+        return map(operator.or_, map(operator.lshift, codeAndStart, width), map(operator.add, ends, offset))
+
+    def unpack(self, key:int) -> typing.Tuple[int, int, int]:
+        end = (key & self.mask) + self.offset
+        key >>= self.width
+        start = (key & self.mask) + self.offset
+        return key >> self.width, start, end
+
+
+def hashStrings(strings:typing.Iterable[str]) -> array.array:
+    """Fixed width (64 bit) hashes of the strings. Equal strings always share a hash, and the rare distinct strings that share one are told
+    apart later by looking at the strings themselves."""
+    return array.array("q", list(map(hash, strings)))
+
+
+def findDuplicateKeys(keys:typing.Iterable[int]) -> typing.Set[int]:
+    """Returns the keys that occur more than once, found by sorting rather than by counting every key in a dict. Keys are first dealt by their
+    lowest bits into buckets of 64 bit integers, 8 bytes a key, and the buckets are sorted one at a time, so only one bucket at a time is ever a
+    list of boxed ints (about 45 bytes a key). A bucket that meets a key too wide for 64 bits becomes a list."""
+    buckets = [array.array("q") for bucket in range(_BUCKETMASK + 1)]
+    appends = [bucket.append for bucket in buckets]
+    for key in keys:
+        try:
+            appends[key & _BUCKETMASK](key)
+        except OverflowError:
+            bucket = key & _BUCKETMASK
+            buckets[bucket] = list(buckets[bucket])
+            appends[bucket] = buckets[bucket].append
+            appends[bucket](key)
+    duplicateKeys = set()
+    while buckets:
+        sortedKeys = sorted(buckets.pop())
+        duplicateKeys.update(itertools.compress(sortedKeys, map(operator.eq, sortedKeys, itertools.islice(sortedKeys, 1, None))))
+    return duplicateKeys
+
+
+def countOccurrences(inputList:typing.Iterable, occurrenceCounterDict:dict=None) -> dict:
+    if occurrenceCounterDict is None:
+        occurrenceCounterDict = {}
+    for item in inputList:
+        if not item in occurrenceCounterDict:
+            occurrenceCounterDict[item] = 0
+        occurrenceCounterDict[item] +=1
+    return occurrenceCounterDict
+
+
+def collisionsFromCounts(occurrenceCounterDict:dict) -> dict:
+    collisions = {}
+    for key, count in occurrenceCounterDict.items():
+        if count > 1:
+            collisions[key] = count
+    return collisions
+
+
+def countCollisions(items:typing.Iterable, keys:typing.Iterable[int], duplicateKeys:typing.Set[int], counts:dict=None) -> dict:
+    """Counts only the items whose key is one of the duplicate keys, in order of first occurrence"""
+    return countOccurrences(itertools.compress(items, map(duplicateKeys.__contains__, keys)), counts)
+
+
+def findNameCollisions(bedTables:typing.Iterable[bedTable.BEDTable], rawNameHashes:array.array, simplifiedNameHashes:array.array,
+                       simplifyName:typing.Callable[[str], str]) -> typing.Tuple[dict, dict]:
+    """Recovers the exact names behind the name hashes that collide. bedTables must give the rows the hashes were made from, in the same
+    order, and is only read if there is a collision. Returns (raw name collisions, simplified name collisions) as name: count."""
+    duplicateRawHashes = findDuplicateKeys(rawNameHashes)
+    duplicateSimplifiedHashes = findDuplicateKeys(simplifiedNameHashes)
+    rawNameCounts = {}
+    simplifiedNameCounts = {}
+    if not duplicateRawHashes and not duplicateSimplifiedHashes:
+        return rawNameCounts, simplifiedNameCounts
+    position = 0
+    for table in bedTables:
+        rowCount = len(table)
+        rowHashes = rawNameHashes[position:position + rowCount]
+        countCollisions(table.namesOrElse(), rowHashes, duplicateRawHashes, rawNameCounts)
+        rowHashes = simplifiedNameHashes[position:position + rowCount]
+        collidingNames = itertools.compress(table.namesOrElse(), map(duplicateSimplifiedHashes.__contains__, rowHashes))
+        countOccurrences(map(simplifyName, collidingNames), simplifiedNameCounts)
+        position += rowCount
+    return collisionsFromCounts(rawNameCounts), collisionsFromCounts(simplifiedNameCounts)
+
+
+def findIntervalCollisions(contigCodes:typing.Sequence[int], starts:typing.Sequence[int], ends:typing.Sequence[int]) -> typing.Dict[typing.Tuple[int, int, int], int]:
+    """Returns (contig code, start, end): count for every interval seen more than once, in order of first occurrence"""
+    layout = IntervalKeyLayout(starts, ends)
+    duplicateKeys = findDuplicateKeys(layout.keys(contigCodes, starts, ends))
+    if not duplicateKeys:
+        return {}
+    counts = countCollisions(layout.keys(contigCodes, starts, ends), layout.keys(contigCodes, starts, ends), duplicateKeys)
+    return {layout.unpack(key): count for key, count in counts.items()}
@@ -0,0 +1,86 @@
+import typing
+
+
+DEFAULTMAXEXAMPLES = 1000
+
+
+class ErrorCollection:
+    """Errors (or warnings) grouped by category. Every error is counted, but only the first maxExamples of each category are kept (all of them
+    if maxExamples is None), and their messages are only formatted when they are read. A file with an error on every line then costs little
+    more than a clean one. Iterating gives the kept messages in the order they were added, so an unbounded collection reads the same as the
+    list of messages it replaces."""
+
+    def __init__(self, maxExamples:int=None, prefix:str=""):
+        self.maxExamples = maxExamples
+        self.prefix = prefix
+        self.counts = {}
+        self.kept = {}
+        self.entries = []
+
+    def room(self, category:str) -> typing.Optional[int]:
+        """How many more errors of this category would be kept (None for no limit). Callers can use this to only build the messages that will
+        be kept and count the rest."""
+        if self.maxExamples is None:
+            return None
+        return max(self.maxExamples - self.kept.get(category, 0), 0)
+
+    def add(self, category:str, template:str, *args) -> bool:
+        """Counts the error and keeps it if there is room, returning whether it was kept"""
+        self.counts[category] = self.counts.get(category, 0) + 1
+        kept = self.kept.get(category, 0)
+        if self.maxExamples is None or kept < self.maxExamples:
+            self.kept[category] = kept + 1
+            self.entries.append((category, template, args))
+            return True
+        return False
+
+    def count(self, category:str, count:int=1) -> None:
+        """Counts errors of this category without keeping them"""
+        self.counts[category] = self.counts.get(category, 0) + count
+
+    def extend(self, other:"ErrorCollection") -> None:
+        """Adds the errors of another collection (kept ones subject to this collection's limit) after the ones already here"""
+        for category, template, args in other.entries:
+            if self.room(category) != 0:
+                self.kept[category] = self.kept.get(category, 0) + 1
+                self.entries.append((category, template, args))
+        for category, count in other.counts.items():
+            self.count(category, count)
+
+    def withPrefix(self, prefix:str) -> "ErrorCollection":
+        """The same errors with prefix (such as a file name) put in front of every message and category"""
+        prefixed = ErrorCollection(self.maxExamples, prefix + self.prefix)
+        prefixed.counts = self.counts
+        prefixed.kept = self.kept
+        prefixed.entries = self.entries
+        return prefixed
+
+    def toDict(self) -> dict:
+        """The counts and kept messages as plain values, which fromDict turns back into a collection. Messages are stored formatted and
+        without the prefix."""
+        return {"maxExamples": self.maxExamples, "counts": self.counts,
+                "entries": [[category, template %args if args else template] for category, template, args in self.entries]}
+
+    @classmethod
+    def fromDict(cls, values:dict) -> "ErrorCollection":
+        errors = cls(values["maxExamples"])
+        errors.counts = dict(values["counts"])
+        for category, message in values["entries"]:
+            errors.kept[category] = errors.kept.get(category, 0) + 1
+            errors.entries.append((category, message, ()))
+        return errors
+
+    def omitted(self) -> typing.Dict[str, int]:
+        """Number of errors counted but not kept for each category that has any"""
+        return {self.prefix + category: count - self.kept.get(category, 0) for category, count in self.counts.items() if count > self.kept.get(category, 0)}
+
+    def __len__(self) -> int:
+        return sum(self.counts.values())
+
+    def __bool__(self) -> bool:
+        return bool(self.counts)
+
+    def __iter__(self) -> typing.Iterator[str]:
+        prefix = self.prefix
+        for category, template, args in self.entries:
+            yield prefix + (template %args if args else template)
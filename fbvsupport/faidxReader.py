@@ -26,6 +26,11 @@ class FastaIndexLine:
         totalBytesWithLastLine = totalBytesWithoutLastLine + lastLineLength # this will leave off any non-printing characters on the last line
         return totalBytesWithLastLine
 
+    @property
+    def faidxString(self):
+        faidxString = "%s\t%s\t%s\t%s\t%s" % (self.contig, self.baseLength, self.startByte, self.lineBases, self.lineBytes)
+        return faidxString
+
     @property
     def picardString(self):
         picardString = "@SQ\tSN:%s\tLN:%s" % (self.contig, self.baseLength)
@@ -51,3 +56,11 @@ def readFastaIndexFile(path:str) -> typing.List[FastaIndexLine]:
     faidxList = processFaidxStream(file)
     file.close()
     return faidxList
+
+
+def writeFastaIndexFile(faidxList:typing.List[FastaIndexLine], path:str) -> str:
+    file = open(path, 'w', newline="\n")
+    for faidxLine in faidxList:
+        file.write(faidxLine.faidxString + "\n")
+    file.close()
+    return path
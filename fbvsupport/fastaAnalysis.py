@@ -1,9 +1,21 @@
 from . import faidxReader
 from . import fastaDictReader
+from . import gzipDetector
+from . import bgzf
+from . import sequenceStatistics
 import os
+import gzip
+import mmap
 import typing
 import hashlib
-import pathlib
+import concurrent.futures
+
+
+_BLOCKSIZE = 16 * 1024 * 1024
+_NONNEWLINEWHITESPACE = [bytes([character]) for character in b" \t\r\x0b\x0c\x1c\x1d\x1e\x1f"]  # Everything str.strip() would remove from an ASCII line other than the newline
+DEFAULTTHREADS = min(8, os.cpu_count() or 1)
+
+FastaAnalysis = typing.Tuple[typing.List[faidxReader.FastaIndexLine], typing.List[fastaDictReader.FastaDictLine], typing.List[sequenceStatistics.ContigStatistics]]
 
 
 def extractContigFromLine(line: str):
@@ -13,13 +25,289 @@ def extractContigFromLine(line: str):
     return line[1:].split()[0]
 
 
-def analyzeFasta(path:str) -> typing.Tuple[typing.List[faidxReader.FastaIndexLine], typing.List[fastaDictReader.FastaDictLine]]:
+def findContigHeaderStarts(fastaMap:mmap.mmap) -> typing.List[int]:
+    headerStarts = [0]
+    position = fastaMap.find(b"\n>")
+    while position != -1:
+        headerStarts.append(position + 1)
+        position = fastaMap.find(b"\n>", position + 1)
+    return headerStarts
+
+
+def samtoolsFileURI(path:str) -> str:
+    """The UR value samtools dict writes for a FASTA: the resolved path with a file:// prefix and no escaping"""
+    return "file://" + os.path.realpath(path)
+
+
+class ContigAccumulator:
+    """Running length, line layout, MD5 (of the upper cased sequence, as samtools dict does) and base composition for the sequence lines of one contig. Each feed must start at the beginning of a line and is checked
+    with whole-buffer operations instead of line by line. That only works for the regular layout (equal length lines with only a shorter last
+    line, no blank lines except at the end and no stray whitespace), so anything else marks the contig as irregular."""
+
+    def __init__(self):
+        self.md5Hash = hashlib.md5()
+        self.statistics = sequenceStatistics.SequenceStatisticsAccumulator()
+        self.baseLength = 0
+        self.lineBases = 0
+        self.lineBytes = 0
+        self.regular = True
+        self.lastLineShort = False
+        self.blankLinesPending = False
+
+    def feed(self, lines:bytes) -> bool:
+        if not self.regular:
+            return False
+        core = lines.rstrip(b"\n")
+        trailingNewlines = len(lines) - len(core)
+        if not core:
+            if trailingNewlines:
+                self.blankLinesPending = True
+            return True
+        if self.lastLineShort or self.blankLinesPending:
+            self.regular = False
+            return False
+        if not self.lineBytes:
+            firstNewline = core.find(b"\n")
+            if firstNewline == -1:
+                self.lineBases = len(core)
+                self.lineBytes = len(core) + 1  # samtools counts a newline even for a single line at the very end of the file that has none
+            else:
+                self.lineBases = firstNewline
+                self.lineBytes = firstNewline + 1
+            if not self.lineBases:
+                self.regular = False
+                return False
+        sequence = core.translate(None, b"\n")
+        lineEnds = core[self.lineBases::self.lineBytes]
+        newlines = len(core) - len(sequence)
+        if newlines != len(lineEnds) or lineEnds.count(b"\n") != newlines:
+            self.regular = False
+            return False
+        if not sequence.isascii() or any(whitespace in sequence for whitespace in _NONNEWLINEWHITESPACE):
+            self.regular = False
+            return False
+        upperSequence = sequence.upper()
+        self.md5Hash.update(upperSequence)
+        self.statistics.update(sequence, upperSequence)
+        self.baseLength += len(sequence)
+        self.lastLineShort = len(core) - newlines * self.lineBytes < self.lineBases
+        self.blankLinesPending = trailingNewlines > 1
+        return True
+
+    def result(self) -> [typing.Tuple[int, int, int, str, sequenceStatistics.SequenceStatisticsAccumulator], None]:
+        if not self.regular:
+            return None
+        return self.baseLength, self.lineBases, self.lineBytes, self.md5Hash.hexdigest(), self.statistics
+
+
+def analyzeContigBody(fastaMap:mmap.mmap, bodyStart:int, bodyEnd:int) -> [typing.Tuple[int, int, int, str, sequenceStatistics.SequenceStatisticsAccumulator], None]:
+    """Measures and hashes the sequence lines of one contig in blocks aligned to its line width. Returns (baseLength, lineBases, lineBytes, md5,
+    base composition) or None if the contig is not laid out regularly."""
+    accumulator = ContigAccumulator()
+    firstNewline = fastaMap.find(b"\n", bodyStart, bodyEnd)
+    lineBytes = (firstNewline if firstNewline != -1 else bodyEnd) - bodyStart + 1
+    blockSize = lineBytes * max(1, _BLOCKSIZE // lineBytes)
+    for blockStart in range(bodyStart, bodyEnd, blockSize):
+        if not accumulator.feed(fastaMap[blockStart: min(blockStart + blockSize, bodyEnd)]):
+            return None
+    return accumulator.result()
+
+
+class FastaStreamScanner:
+    """Works out the same index and dictionary data as analyzeFastaMapped from a stream of bytes fed in arbitrarily sized pieces, for FASTA files
+    that cannot be memory mapped (such as compressed ones). Offsets are positions in the uncompressed data."""
+
+    def __init__(self, fileURI:str):
+        self.fileURI = fileURI
+        self.carry = b""
+        self.offset = 0
+        self.regular = True
+        self.contigResults = []
+        self.currentContig = None
+        self.currentAccumulator = None
+
+    def feed(self, data:bytes) -> bool:
+        if not self.regular:
+            return False
+        buffer = self.carry + data
+        completeLinesEnd = buffer.rfind(b"\n") + 1
+        if not completeLinesEnd:
+            self.carry = buffer
+            return True
+        self.carry = buffer[completeLinesEnd:]
+        self.processLines(buffer[:completeLinesEnd])
+        return self.regular
+
+    def processLines(self, lines:bytes) -> None:
+        if not self.offset and not lines.startswith(b">"):
+            self.regular = False
+        position = 0
+        while self.regular and position < len(lines):
+            if lines[position] == 62:  # ">"
+                headerEnd = lines.find(b"\n", position)
+                if headerEnd == -1:
+                    headerEnd = len(lines)
+                header = lines[position:headerEnd]
+                if not header.isascii() or b"\r" in header:
+                    self.regular = False
+                    break
+                self.closeContig()
+                self.currentContig = (extractContigFromLine(header.decode()), self.offset + min(headerEnd + 1, len(lines)))
+                self.currentAccumulator = ContigAccumulator()
+                position = headerEnd + 1
+            else:
+                nextHeader = lines.find(b"\n>", position)
+                bodyEnd = len(lines) if nextHeader == -1 else nextHeader + 1
+                self.currentAccumulator.feed(lines[position:bodyEnd])
+                self.regular = self.currentAccumulator.regular
+                position = bodyEnd
+        self.offset += len(lines)
+
+    def closeContig(self) -> None:
+        if self.currentContig is None:
+            return
+        contigResult = self.currentAccumulator.result()
+        if contigResult is None:
+            self.regular = False
+        self.contigResults.append((self.currentContig, contigResult))
+        self.currentContig = None
+
+    def finish(self) -> [FastaAnalysis, None]:
+        if self.regular and self.carry:
+            self.processLines(self.carry)
+            self.carry = b""
+        self.closeContig()
+        if not self.regular or not self.contigResults:
+            return None
+        fastaIndexList = []
+        fastaDictList = []
+        statisticsList = []
+        for (contig, startByte), (baseLength, lineBases, lineBytes, md5Hash, statistics) in self.contigResults:
+            fastaIndexList.append(faidxReader.FastaIndexLine(contig, baseLength, startByte, lineBases, lineBytes))
+            fastaDictList.append(fastaDictReader.FastaDictLine(contig, baseLength, md5Hash, self.fileURI))
+            statisticsList.append(statistics.result(contig))
+        return fastaIndexList, fastaDictList, statisticsList
+
+
+def analyzeCompressedFasta(path:str, chunkSize:int=_BLOCKSIZE, threads:int=DEFAULTTHREADS) -> [FastaAnalysis, None]:
+    """Single pass analysis of a gzip or BGZF compressed FASTA, decompressing it in large pieces without writing it out anywhere. BGZF blocks
+    are decompressed on several threads. Returns None for anything the line by line analysis needs to handle."""
+    scanner = FastaStreamScanner(samtoolsFileURI(path))
+    if bgzf.fileIsBGZF(path):
+        blockReader = bgzf.BGZFReader(path)
+        for chunk in blockReader.iterateChunks(chunkSize, threads=threads):
+            if not scanner.feed(chunk):
+                break
+        blockReader.close()
+    else:
+        compressedFasta = gzip.open(path, 'rb')
+        chunk = compressedFasta.read(chunkSize)
+        while chunk and scanner.feed(chunk):
+            chunk = compressedFasta.read(chunkSize)
+        compressedFasta.close()
+    return scanner.finish()
+
+
+def analyzeFastaMapped(path:str, threads:int=DEFAULTTHREADS) -> [FastaAnalysis, None]:
+    """Memory maps the FASTA, finds every contig header and then measures and hashes the contigs on a pool of threads (hashlib releases the GIL
+    while hashing large blocks). Returns None for anything it cannot be sure to handle the same way as analyzeFastaByLine."""
+    fileURI = samtoolsFileURI(path)
+    fasta = open(path, 'rb')
+    try:
+        if os.fstat(fasta.fileno()).st_size == 0:
+            return None
+        fastaMap = mmap.mmap(fasta.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        fasta.close()
+        return None
+    try:
+        if fastaMap[:1] != b">":
+            return None
+        headerStarts = findContigHeaderStarts(fastaMap)
+        contigs = []
+        bodyRanges = []
+        for contigNumber, headerStart in enumerate(headerStarts):
+            if contigNumber + 1 < len(headerStarts):
+                bodyEnd = headerStarts[contigNumber + 1]
+            else:
+                bodyEnd = len(fastaMap)
+            headerEnd = fastaMap.find(b"\n", headerStart, bodyEnd)
+            if headerEnd == -1:
+                headerEnd = bodyEnd
+            header = fastaMap[headerStart:headerEnd]
+            if not header.isascii() or b"\r" in header:
+                return None
+            contigs.append((extractContigFromLine(header.decode()), min(headerEnd + 1, bodyEnd)))
+            bodyRanges.append((min(headerEnd + 1, bodyEnd), bodyEnd))
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, threads)) as executor:
+            contigResults = list(executor.map(lambda bodyRange: analyzeContigBody(fastaMap, *bodyRange), bodyRanges))
+    finally:
+        fastaMap.close()
+        fasta.close()
+    fastaIndexList = []
+    fastaDictList = []
+    statisticsList = []
+    for (contig, startByte), contigResult in zip(contigs, contigResults):
+        if contigResult is None:
+            return None
+        baseLength, lineBases, lineBytes, md5Hash, statistics = contigResult
+        fastaIndexList.append(faidxReader.FastaIndexLine(contig, baseLength, startByte, lineBases, lineBytes))
+        fastaDictList.append(fastaDictReader.FastaDictLine(contig, baseLength, md5Hash, fileURI))
+        statisticsList.append(statistics.result(contig))
+    return fastaIndexList, fastaDictList, statisticsList
+
+
+def openFastaText(path:str) -> typing.TextIO:
+    if gzipDetector.fileIsGzipped(path):
+        return gzip.open(path, 'rt', newline="")
+    return open(path, 'r', newline="")  # Line endings are left as they are in the file so line widths are counted in bytes like samtools does
+
+
+def analyzeFasta(path:str, threads:int=DEFAULTTHREADS) -> typing.Tuple[typing.List[faidxReader.FastaIndexLine], typing.List[fastaDictReader.FastaDictLine]]:
+    faidx, fastaDict, statistics = analyzeFastaWithStatistics(path, threads)
+    return faidx, fastaDict
+
+
+def analyzeFastaWithStatistics(path:str, threads:int=DEFAULTTHREADS) -> FastaAnalysis:
+    """Index and dictionary data for the FASTA along with the base composition of every contig, all from a single read of the file"""
+    if not os.path.isfile(path):
+        raise FileNotFoundError("Unable to find file %s" %path)
+    if gzipDetector.fileIsGzipped(path):
+        analysis = analyzeCompressedFasta(path, threads=threads)
+    else:
+        analysis = analyzeFastaMapped(path, threads)
+    if analysis is None:  # Irregular line layouts (and the errors they may need to raise) are left to the line by line analysis
+        analysis = analyzeFastaByLine(path)
+    return analysis
+
+
+def writeIndexFiles(path:str, forceReindex:bool=False, threads:int=DEFAULTTHREADS, faidx:typing.List[faidxReader.FastaIndexLine]=None,
+                    fastaDict:typing.List[fastaDictReader.FastaDictLine]=None) -> typing.Tuple[str, str]:
+    """In process replacement for samtools faidx and samtools dict. Both files come from a single read of the FASTA (or from the index and
+    dictionary of an earlier analysis, if given) and are written next to it with the same names and contents samtools would give them, along
+    with the .gzi block index of a BGZF compressed FASTA. Existing files are left alone unless forceReindex is set."""
+    faidxPath = os.path.abspath(path) + ".fai"
+    fastaDictPath = os.path.abspath(path) + ".dict"
+    if bgzf.fileIsBGZF(path) and (forceReindex or not bgzf.gziIndexIsCurrent(path)):
+        bgzf.writeGziIndex(bgzf.buildGziIndex(path), bgzf.gziPathFor(path))
+    if os.path.isfile(faidxPath) and os.path.isfile(fastaDictPath) and not forceReindex:
+        print("FASTA index and dictionary already exist at %s and %s. Not set to reindex, so using existing files." %(faidxPath, fastaDictPath))
+        return faidxPath, fastaDictPath
+    if faidx is None or fastaDict is None:
+        faidx, fastaDict = analyzeFasta(path, threads)
+    faidxReader.writeFastaIndexFile(faidx, faidxPath)
+    fastaDictReader.writeFastaDictFile(fastaDict, fastaDictPath)
+    return faidxPath, fastaDictPath
+
+
+def analyzeFastaByLine(path:str) -> FastaAnalysis:
     if not os.path.isfile(path):
         raise FileNotFoundError("Unable to find file %s" %path)
-    fileURI = pathlib.Path(os.path.abspath(path)).as_uri()
+    fileURI = samtoolsFileURI(path)
     fastaIndexList = []
     fastaDictList = []
-    fasta = open(path, 'r')
+    statisticsList = []
+    fasta = openFastaText(path)
     firstLine = fasta.readline().strip()
     if not firstLine.startswith(">"):
         raise ValueError("First FASTA line should start with a '>' character. First line: %s" %firstLine)
@@ -34,8 +322,8 @@ def analyzeFasta(path:str) -> typing.Tuple[typing.List[faidxReader.FastaIndexLin
     startByte = 0
     lineBases = 0
     lineBytes = 0
-    byteLength = 0
     md5Hash = hashlib.md5("".encode())
+    statistics = sequenceStatistics.SequenceStatisticsAccumulator()
     lastLineInconsistent = False
     line = fasta.readline()
     while line:
@@ -45,7 +333,8 @@ def analyzeFasta(path:str) -> typing.Tuple[typing.List[faidxReader.FastaIndexLin
         if line.startswith(">"):
             if not startingFile:
                 fastaIndexList.append(faidxReader.FastaIndexLine(contig, baseLength, startByte, lineBases, lineBytes))
-                fastaDictList.append(fastaDictReader.FastaDictLine(contig, byteLength, md5Hash.hexdigest(), fileURI))
+                fastaDictList.append(fastaDictReader.FastaDictLine(contig, baseLength, md5Hash.hexdigest(), fileURI))
+                statisticsList.append(statistics.result(contig))
             startingFile = False
             newContig = True
             contig = extractContigFromLine(line)
@@ -53,8 +342,8 @@ def analyzeFasta(path:str) -> typing.Tuple[typing.List[faidxReader.FastaIndexLin
             startByte = fasta.tell()
             lineBases = 0
             lineBytes = 0
-            byteLength = 0
             md5Hash = hashlib.md5("".encode())
+            statistics = sequenceStatistics.SequenceStatisticsAccumulator()
             line = fasta.readline()
             lastLineInconsistent = False
             continue
@@ -62,6 +351,8 @@ def analyzeFasta(path:str) -> typing.Tuple[typing.List[faidxReader.FastaIndexLin
             if lastLineInconsistent:
                 raise ValueError("Found inconsistent line lengths in contig %s" %contig)
             currentLineBytes = len(line)
+            if not line.endswith("\n"):  # samtools counts a newline for a last line that has none
+                currentLineBytes += 1
             line = line.strip()
             currentLineBases = len(line)
             if newContig:
@@ -71,11 +362,14 @@ def analyzeFasta(path:str) -> typing.Tuple[typing.List[faidxReader.FastaIndexLin
                 if currentLineBases != lineBases or  currentLineBytes != lineBytes:
                     lastLineInconsistent = True
             newContig = False
-            baseLength += lineBases
-            byteLength += lineBytes
-            md5Hash.update(line.encode())
+            baseLength += currentLineBases
+            sequence = line.encode()
+            upperSequence = sequence.upper()
+            md5Hash.update(upperSequence)
+            statistics.update(sequence, upperSequence)
             line = fasta.readline()
     fasta.close()
     fastaIndexList.append(faidxReader.FastaIndexLine(contig, baseLength, startByte, lineBases, lineBytes))
-    fastaDictList.append(fastaDictReader.FastaDictLine(contig, byteLength, md5Hash.hexdigest(), fileURI))
-    return fastaIndexList, fastaDictList
+    fastaDictList.append(fastaDictReader.FastaDictLine(contig, baseLength, md5Hash.hexdigest(), fileURI))
+    statisticsList.append(statistics.result(contig))
+    return fastaIndexList, fastaDictList, statisticsList
@@ -16,6 +16,13 @@ class FastaDictLine:
     def __post_init__(self):
         self.byteLength = int(self.byteLength)
 
+    @property
+    def dictString(self):
+        dictString = "@SQ\tSN:%s\tLN:%s\tM5:%s" % (self.contig, self.byteLength, self.md5Hash)
+        if self.uri:
+            dictString += "\tUR:%s" % self.uri
+        return dictString
+
 
 def stripDictFieldPrefix(value:str) -> str:
     return value[3:]
@@ -44,4 +51,13 @@ def readFastaDictFile(path:str) -> typing.List[FastaDictLine]:
     file = open(path, 'r')
     fastaDictList = processDictStream(file)
     file.close()
-    return fastaDictList
\ No newline at end of file
+    return fastaDictList
+
+
+def writeFastaDictFile(fastaDictList:typing.List[FastaDictLine], path:str) -> str:
+    file = open(path, 'w', newline="\n")
+    file.write("@HD\tVN:1.0\tSO:unsorted\n")
+    for fastaDictLine in fastaDictList:
+        file.write(fastaDictLine.dictString + "\n")
+    file.close()
+    return path
@@ -21,4 +21,5 @@ def streamIsGzipped(dataStream:typing.IO[bytes]) -> bool:
 def fileIsGzipped(path:str) -> bool:
     fileHandle = open(path, 'rb')
     gzipped = streamIsGzipped(fileHandle)
-    return gzipped
\ No newline at end of file
+    fileHandle.close()
+    return gzipped
@@ -0,0 +1,238 @@
+import array
+import bisect
+import itertools
+import operator
+import typing
+from . import bedTable
+
+
+_PASTANYPOSITION = 2 ** 62
+
+
+def sortedRanks(sortedValues:typing.Sequence[int], sortedQueries:typing.Sequence[int]) -> typing.List[int]:
+    """Gives bisect.bisect_right(sortedValues, query) for every query in an already sorted sequence of non-negative queries. Values are
+    doubled and queries doubled plus one so that a single sort of both (a linear merge of the two runs) puts each query just after every
+    value it is not less than, and a query's rank is then its position in the merged list less the number of queries before it."""
+    merged = list(map(operator.lshift, sortedValues, itertools.repeat(1)))
+    merged += map(operator.or_, map(operator.lshift, sortedQueries, itertools.repeat(1)), itertools.repeat(1))
+    merged.sort()
+    queryPositions = itertools.compress(range(len(merged)), map(operator.and_, merged, itertools.repeat(1)))
+    return list(map(operator.sub, queryPositions, itertools.count()))
+
+
+class ContigIntervals:
+    """The intervals on one contig sorted by start (longest first where starts are equal) along with the running maximum of their ends. The
+    running maximum is never decreasing, so a binary search on it skips every interval that ends before a query starts."""
+
+    def __init__(self, starts:array.array, ends:array.array, rows:array.array):
+        self.starts = starts
+        self.ends = ends
+        self.rows = rows
+        self.maxEnds = array.array("q", itertools.accumulate(ends, max))
+        self._merged = None
+        self._mergedLengthTotals = None
+
+    def __len__(self):
+        return len(self.starts)
+
+    def overlappingPositions(self, start:int, end:int) -> range:
+        """Range of sorted positions that may overlap [start, end). Every interval outside it is known not to."""
+        last = bisect.bisect_left(self.starts, end)
+        first = bisect.bisect_right(self.maxEnds, start, 0, last)
+        return range(first, last)
+
+    def overlapping(self, start:int, end:int) -> typing.List[int]:
+        """Rows of the intervals overlapping the half open range [start, end)"""
+        positions = self.overlappingPositions(start, end)
+        flags = map(operator.gt, self.ends[positions.start:positions.stop], itertools.repeat(start))
+        return list(itertools.compress(self.rows[positions.start:positions.stop], flags))
+
+    def overlapFlags(self) -> typing.Tuple[typing.List[bool], typing.List[bool]]:
+        """Returns (overlaps another interval, nested inside an earlier interval) for each sorted position. An interval overlaps an earlier one
+        when the running maximum end before it is past its start, and overlaps a later one when the next start is before its end."""
+        if not self.starts:
+            return [], []
+        previousMaxEnds = self.maxEnds[:-1]
+        laterStarts = self.starts[1:]
+        overlapsEarlier = itertools.chain([False], map(operator.gt, previousMaxEnds, laterStarts))
+        overlapsLater = itertools.chain(map(operator.lt, laterStarts, self.ends[:-1]), [False])
+        overlapFlags = list(map(operator.or_, overlapsEarlier, overlapsLater))
+        nestedFlags = [False] + list(map(operator.ge, previousMaxEnds, self.ends[1:]))
+        return overlapFlags, nestedFlags
+
+    def mergedIntervals(self) -> typing.Tuple[array.array, array.array]:
+        """Starts and ends of the union of the intervals, with overlapping and book-ended intervals merged together"""
+        if self._merged is None:
+            self._merged = self._mergeIntervals()
+        return self._merged
+
+    def _mergeIntervals(self) -> typing.Tuple[array.array, array.array]:
+        if not self.starts:
+            return array.array("q"), array.array("q")
+        newBlockFlags = itertools.chain([True], map(operator.gt, self.starts[1:], self.maxEnds[:-1]))
+        blockFirstPositions = list(itertools.compress(range(len(self.starts)), newBlockFlags))
+        mergedStarts = array.array("q", map(self.starts.__getitem__, blockFirstPositions))
+        blockLastPositions = map(operator.sub, itertools.chain(blockFirstPositions[1:], [len(self.starts)]), itertools.repeat(1))
+        mergedEnds = array.array("q", map(self.maxEnds.__getitem__, blockLastPositions))
+        return mergedStarts, mergedEnds
+
+    def footprint(self) -> int:
+        mergedStarts, mergedEnds = self.mergedIntervals()
+        return sum(mergedEnds) - sum(mergedStarts)
+
+    def coveredBasesBefore(self, positions:typing.Sequence[int]) -> typing.List[int]:
+        """For each of a sorted sequence of positions, the number of bases before it covered by at least one interval. This is the total length
+        of the merged intervals starting at or before the position less whatever part of the last of them lies past the position."""
+        mergedStarts, mergedEnds = self.mergedIntervals()
+        if self._mergedLengthTotals is None:
+            self._mergedLengthTotals = array.array("q", itertools.accumulate(map(operator.sub, mergedEnds, mergedStarts), initial=0))
+        paddedEnds = array.array("q", [-_PASTANYPOSITION]) + mergedEnds
+        blockCounts = sortedRanks(mergedStarts, positions)
+        overhangs = map(max, map(operator.sub, map(paddedEnds.__getitem__, blockCounts), positions), itertools.repeat(0))
+        return list(map(operator.sub, map(self._mergedLengthTotals.__getitem__, blockCounts), overhangs))
+
+    def coverageFlags(self, starts:typing.Sequence[int], ends:typing.Sequence[int]) -> typing.Tuple[typing.List[bool], typing.List[bool]]:
+        """For each query range, in order of start, returns (overlaps an interval here, lies entirely inside the union of the intervals here).
+        The merged intervals are sorted and do not touch, so the only one that can cover the start of a query is the first one ending after
+        that start."""
+        mergedStarts, mergedEnds = self.mergedIntervals()
+        paddedStarts = mergedStarts + array.array("q", [_PASTANYPOSITION])
+        paddedEnds = mergedEnds + array.array("q", [-1])
+        blockPositions = sortedRanks(mergedEnds, starts)
+        blockStarts = list(map(paddedStarts.__getitem__, blockPositions))
+        overlapFlags = list(map(operator.lt, blockStarts, ends))
+        startCovered = map(operator.le, blockStarts, starts)
+        endCovered = map(operator.ge, map(paddedEnds.__getitem__, blockPositions), ends)
+        coveredFlags = list(map(operator.and_, startCovered, endCovered))
+        return overlapFlags, coveredFlags
+
+
+class IntervalIndex:
+    """Overlap index over the intervals of a BED file, holding a ContigIntervals for each contig. Building it is one sort of the rows, after
+    which each query is a pair of binary searches plus a scan of the candidates they leave."""
+
+    def __init__(self):
+        self.contigs = {}
+
+    def __len__(self):
+        return sum(len(contigIntervals) for contigIntervals in self.contigs.values())
+
+    @classmethod
+    def fromColumns(cls, contigNames:typing.List[str], contigCodes:typing.Sequence[int], starts:typing.Sequence[int], ends:typing.Sequence[int],
+                    rows:typing.Sequence[int]=None) -> 'IntervalIndex':
+        index = cls()
+        if rows is None:
+            rows = range(len(starts))
+        # Three stable sorts on plain integer keys (longest first, then by start, then by contig) are quicker than one sort on tuple keys
+        order = sorted(range(len(starts)), key=ends.__getitem__, reverse=True)
+        order.sort(key=starts.__getitem__)
+        order.sort(key=contigCodes.__getitem__)
+        sortedCodes = array.array("q", map(contigCodes.__getitem__, order))
+        for code in sorted(set(contigCodes)):
+            contigOrder = order[bisect.bisect_left(sortedCodes, code):bisect.bisect_right(sortedCodes, code)]
+            index.contigs[contigNames[code]] = ContigIntervals(array.array("q", map(starts.__getitem__, contigOrder)),
+                                                               array.array("q", map(ends.__getitem__, contigOrder)),
+                                                               array.array("q", map(rows.__getitem__, contigOrder)))
+        return index
+
+    @classmethod
+    def fromBEDTable(cls, table:bedTable.BEDTable, knownContigs:typing.Container[str]=None) -> 'IntervalIndex':
+        """Indexes the rows of the table without errors, leaving out rows on contigs that are not in knownContigs (if given), since those already
+        have crosscheck errors. Rows are numbered from the start of the file, so they can be turned into line numbers."""
+        rows = range(table.firstRow, table.firstRow + len(table))
+        knownFlags = None
+        if knownContigs is not None:
+            knownFlags = [contig in knownContigs for contig in table.contigs.strings]
+            if all(knownFlags):
+                knownFlags = None
+        if not table.errorRows and knownFlags is None:
+            return cls.fromColumns(table.contigs.strings, table.contigCodes, table.starts, table.ends, rows)
+        if knownFlags is None:
+            cleanFlags = [True] * len(table)
+        else:
+            cleanFlags = list(map(knownFlags.__getitem__, table.contigCodes))
+        for errorRow in table.errorRows:
+            cleanFlags[errorRow] = False
+        return cls.fromColumns(table.contigs.strings, list(itertools.compress(table.contigCodes, cleanFlags)),
+                               list(itertools.compress(table.starts, cleanFlags)), list(itertools.compress(table.ends, cleanFlags)),
+                               list(itertools.compress(rows, cleanFlags)))
+
+    def overlapping(self, contig:str, start:int, end:int) -> typing.List[int]:
+        contigIntervals = self.contigs.get(contig)
+        if contigIntervals is None:
+            return []
+        return contigIntervals.overlapping(start, end)
+
+    def findOverlaps(self) -> typing.List[typing.Tuple[int, str, int, int, bool]]:
+        """Returns (row, contig, start, end, nested) for every interval overlapping another interval in the index, in row order"""
+        overlaps = []
+        for contig, contigIntervals in self.contigs.items():
+            overlapFlags, nestedFlags = contigIntervals.overlapFlags()
+            for position in itertools.compress(range(len(contigIntervals)), overlapFlags):
+                overlaps.append((contigIntervals.rows[position], contig, contigIntervals.starts[position], contigIntervals.ends[position], nestedFlags[position]))
+        overlaps.sort()
+        return overlaps
+
+    def footprint(self) -> int:
+        """Number of bases covered by at least one interval"""
+        return sum(contigIntervals.footprint() for contigIntervals in self.contigs.values())
+
+
+def intersectionLength(first:ContigIntervals, second:ContigIntervals) -> int:
+    """Bases covered by both sets of intervals. Each merged interval of the first set shares (bases of the second set covered before its end)
+    less (bases of the second set covered before its start) with the second set."""
+    firstStarts, firstEnds = first.mergedIntervals()
+    if not firstStarts or not second.starts:
+        return 0
+    return sum(second.coveredBasesBefore(firstEnds)) - sum(second.coveredBasesBefore(firstStarts))
+
+
+class IntervalComparison:
+    """Relationship between a target BED and a bait (or primer) BED. Each listed interval is (row, contig, start, end)."""
+
+    def __init__(self):
+        self.uncoveredTargets = []
+        self.partiallyCoveredTargets = []
+        self.baitsOutsideTargets = []
+        self.targetFootprint = 0
+        self.baitFootprint = 0
+        self.intersectedBases = 0
+
+    @property
+    def statistics(self) -> dict:
+        return {
+            "Targets without bait coverage": len(self.uncoveredTargets),
+            "Targets partially covered by baits": len(self.partiallyCoveredTargets),
+            "Baits outside targets": len(self.baitsOutsideTargets),
+            "Target footprint (bp)": self.targetFootprint,
+            "Bait footprint (bp)": self.baitFootprint,
+            "Intersected bases (bp)": self.intersectedBases
+        }
+
+
+def _flaggedIntervals(contig:str, contigIntervals:ContigIntervals, flags:typing.Iterable[bool]) -> typing.List[typing.Tuple[int, str, int, int]]:
+    return [(contigIntervals.rows[position], contig, contigIntervals.starts[position], contigIntervals.ends[position])
+            for position in itertools.compress(range(len(contigIntervals)), flags)]
+
+
+def compareIntervalIndexes(targets:IntervalIndex, baits:IntervalIndex) -> IntervalComparison:
+    """Finds targets no bait touches, targets only partly covered by baits, baits that touch no target and the number of bases both cover.
+    Every interval is checked against the merged intervals of the other file by binary search, so no pair of intervals is ever compared."""
+    comparison = IntervalComparison()
+    emptyContig = ContigIntervals(array.array("q"), array.array("q"), array.array("q"))
+    for contig, targetIntervals in targets.contigs.items():
+        baitIntervals = baits.contigs.get(contig, emptyContig)
+        overlapFlags, coveredFlags = baitIntervals.coverageFlags(targetIntervals.starts, targetIntervals.ends)
+        comparison.uncoveredTargets += _flaggedIntervals(contig, targetIntervals, map(operator.not_, overlapFlags))
+        comparison.partiallyCoveredTargets += _flaggedIntervals(contig, targetIntervals, map(operator.gt, overlapFlags, coveredFlags))
+        comparison.intersectedBases += intersectionLength(targetIntervals, baitIntervals)
+    for contig, baitIntervals in baits.contigs.items():
+        targetIntervals = targets.contigs.get(contig, emptyContig)
+        overlapFlags, coveredFlags = targetIntervals.coverageFlags(baitIntervals.starts, baitIntervals.ends)
+        comparison.baitsOutsideTargets += _flaggedIntervals(contig, baitIntervals, map(operator.not_, overlapFlags))
+    comparison.uncoveredTargets.sort()
+    comparison.partiallyCoveredTargets.sort()
+    comparison.baitsOutsideTargets.sort()
+    comparison.targetFootprint = targets.footprint()
+    comparison.baitFootprint = baits.footprint()
+    return comparison
@@ -0,0 +1,88 @@
+import json
+import typing
+import itertools
+
+
+_WRITEBATCH = 10000
+_encodeString = json.encoder.encode_basestring_ascii
+
+
+def encodeScalar(value) -> str:
+    if type(value) == str:
+        return _encodeString(value)
+    return json.dumps(value)
+
+
+def encodeKey(key) -> str:
+    """JSON object keys are always strings, so other keys are written the way json.dumps would convert them"""
+    if type(key) == str:
+        return _encodeString(key)
+    return _encodeString(json.dumps(key))
+
+
+def writeJSONValue(outputFile:typing.TextIO, value, indent:int=2, level:int=0) -> None:
+    """Writes value to outputFile as the same text json.dumps(value, indent=indent) would give, but a piece at a time, so a large report is never
+    held in memory as one string. Lists of plain values are written in batches rather than an item at a time to keep this quick."""
+    if isinstance(value, dict):
+        if not value:
+            outputFile.write("{}")
+            return
+        opener, closer = "{", "}"
+    elif isinstance(value, (list, tuple)):
+        if not value:
+            outputFile.write("[]")
+            return
+        opener, closer = "[", "]"
+    else:
+        outputFile.write(encodeScalar(value))
+        return
+    if indent is None:
+        newline = ""
+        closingNewline = ""
+        itemSeparator = ", "
+    else:
+        newline = "\n" + " " * (indent * (level + 1))
+        closingNewline = "\n" + " " * (indent * level)
+        itemSeparator = "," + newline
+    outputFile.write(opener + newline)
+    if opener == "{":
+        for itemNumber, (key, item) in enumerate(value.items()):
+            if itemNumber:
+                outputFile.write(itemSeparator)
+            outputFile.write(encodeKey(key) + ": ")
+            writeJSONValue(outputFile, item, indent, level + 1)
+    else:
+        iterator = iter(value)
+        first = True
+        while True:
+            batch = list(itertools.islice(iterator, _WRITEBATCH))
+            if not batch:
+                break
+            if not first:
+                outputFile.write(itemSeparator)
+            first = False
+            if any(isinstance(item, (dict, list, tuple)) for item in batch):
+                for itemNumber, item in enumerate(batch):
+                    if itemNumber:
+                        outputFile.write(itemSeparator)
+                    writeJSONValue(outputFile, item, indent, level + 1)
+            else:
+                outputFile.write(itemSeparator.join(map(encodeScalar, batch)))
+    outputFile.write(closingNewline + closer)
+
+
+def writeJSONLine(outputFile:typing.TextIO, value) -> None:
+    """Writes value as a single line of newline delimited JSON"""
+    outputFile.write(json.dumps(value) + "\n")
+
+
+def writeJSONLines(outputFile:typing.TextIO, fixedFields:dict, key:str, values:typing.Iterable) -> None:
+    """Writes one line of newline delimited JSON per value, each an object of fixedFields with the value added under key. The part of every
+    line that does not change is only encoded once."""
+    lineStart = json.dumps(dict(fixedFields, **{key: None}))[:-len("null}")]
+    iterator = iter(values)
+    while True:
+        batch = list(itertools.islice(iterator, _WRITEBATCH))
+        if not batch:
+            break
+        outputFile.write("".join([lineStart + encodeScalar(value) + "}\n" for value in batch]))
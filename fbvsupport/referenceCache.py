@@ -0,0 +1,250 @@
+import os
+import array
+import typing
+import hashlib
+import tempfile
+import dataclasses
+from . import bedTable
+from . import faidxReader
+from . import fastaDictReader
+from . import sequenceStatistics
+from . import sidecarFile
+
+
+DEFAULTCACHEDIRECTORY = os.environ.get("FBV_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "fbvalidation"))
+DEFAULTCACHESIZELIMIT = 256 * 1024 * 1024
+CACHESIZEVARIABLE = "FBV_CACHE_MAX_BYTES"
+_SIZESUFFIXES = {"K": 1024, "M": 1024 * 1024, "G": 1024 * 1024 * 1024}
+_FINGERPRINTSAMPLESIZE = 1024 * 1024
+_ENTRYEXTENSION = ".fbv"
+_MAXENTRYFRACTION = 0.25  # Larger entries would push most of the others out of the cache (or themselves, past the limit), so they are not stored
+_CACHEFORMATVERSION = 1  # Increase whenever the stored analysis changes so that older entries are no longer found
+_FASTAKIND = "FASTA"
+_BEDKIND = "BED"
+_STATISTICSFIELDS = [field.name for field in dataclasses.fields(sequenceStatistics.ContigStatistics)]
+
+
+def fingerprintFile(path:str) -> str:
+    """Cheap identity for a file: its absolute path, size and modification time plus a hash of the first, middle and last megabyte of content.
+    Any change to the file that matters for validation will almost certainly change this without having to read the whole file."""
+    absolutePath = os.path.abspath(path)
+    fileStats = os.stat(absolutePath)
+    fingerprint = hashlib.sha1()
+    fingerprint.update(("%s\t%s\t%s\t%s\n" %(_CACHEFORMATVERSION, absolutePath, fileStats.st_size, fileStats.st_mtime_ns)).encode())
+    file = open(absolutePath, 'rb')
+    for offset in (0, fileStats.st_size // 2, fileStats.st_size - _FINGERPRINTSAMPLESIZE):
+        file.seek(max(0, offset))
+        fingerprint.update(file.read(_FINGERPRINTSAMPLESIZE))
+    file.close()
+    return fingerprint.hexdigest()
+
+
+def parseSize(size:str) -> int:
+    """Takes a number of bytes, optionally with a K, M or G suffix (such as 256M)"""
+    size = size.strip().upper().rstrip("B")
+    multiplier = _SIZESUFFIXES.get(size[-1:], 1)
+    if multiplier != 1:
+        size = size[:-1]
+    value = int(float(size) * multiplier)
+    if value < 0:
+        raise ValueError("A size cannot be negative")
+    return value
+
+
+def defaultSizeLimit() -> int:
+    """The size limit set in FBV_CACHE_MAX_BYTES, or DEFAULTCACHESIZELIMIT if it is not set. This is only read when a cache is made, so a
+    bad value does not get in the way of runs that do not use the cache."""
+    size = os.environ.get(CACHESIZEVARIABLE)
+    if not size:
+        return DEFAULTCACHESIZELIMIT
+    try:
+        return parseSize(size)
+    except ValueError:
+        raise ValueError("Unable to use %s=%s as the cache size limit. Set it to a number of bytes, optionally with a K, M or G suffix (such as 256M)." %(CACHESIZEVARIABLE, size))
+
+
+class ReferenceCache:
+    """On-disk cache of FASTA analyses, and of parsed BED files and their findings, keyed by the fingerprint of the file they came from. Each
+    entry is one binary sidecar file (see sidecarFile) that also holds the fingerprint, so an entry for a file that has since changed is never
+    used. Entries are written to a temporary file and renamed into place so that several validator processes can share one cache directory,
+    and the least recently used entries are removed once the cache grows past its size limit. Entries larger than a quarter of the limit are
+    not stored at all. The parsed columns of BED files are only stored along with their findings if storeBEDTables is set. The size limit
+    comes from the environment (see defaultSizeLimit) unless one is given."""
+
+    def __init__(self, directory:str=DEFAULTCACHEDIRECTORY, sizeLimit:int=None, storeBEDTables:bool=False):
+        if sizeLimit is None:
+            sizeLimit = defaultSizeLimit()
+        self.directory = directory
+        self.sizeLimit = sizeLimit
+        self.storeBEDTables = storeBEDTables
+
+    @property
+    def maxEntrySize(self) -> float:
+        return self.sizeLimit * _MAXENTRYFRACTION
+
+    def entryPath(self, fingerprint:str) -> str:
+        return os.path.join(self.directory, fingerprint + _ENTRYEXTENSION)
+
+    def openEntry(self, path:str, kind:str, fingerprint:str=None) -> typing.Optional[sidecarFile.Sidecar]:
+        """Opens the entry for the file, or returns None on a cache miss"""
+        try:
+            if fingerprint is None:
+                fingerprint = fingerprintFile(path)
+            entry = sidecarFile.Sidecar(self.entryPath(fingerprint), kind, fingerprint)
+        except (OSError, sidecarFile.SidecarError):  # Missing entries (or entries removed by another process while reading) are just a cache miss
+            return None
+        try:
+            os.utime(entry.path)  # Modification time is used as the last access time for eviction
+        except OSError:
+            pass
+        return entry
+
+    def load(self, fastaPath:str) -> [typing.Tuple[typing.List[faidxReader.FastaIndexLine], typing.List[fastaDictReader.FastaDictLine], typing.List[sequenceStatistics.ContigStatistics]], None]:
+        """Returns the cached index, dictionary and sequence statistics for the FASTA, or None on a cache miss. The statistics are None if the
+        entry was stored without them (such as after a Samtools analysis)."""
+        entry = self.openEntry(fastaPath, _FASTAKIND)
+        if entry is None:
+            return None
+        try:
+            faidx = list(map(faidxReader.FastaIndexLine, entry.section("faidx.contig"), entry.section("faidx.baseLength"),
+                             entry.section("faidx.startByte"), entry.section("faidx.lineBases"), entry.section("faidx.lineBytes")))
+            fastaDict = list(map(fastaDictReader.FastaDictLine, entry.section("dict.contig"), entry.section("dict.byteLength"),
+                                 entry.section("dict.md5Hash"), entry.section("dict.uri")))
+            if "statistics.contig" in entry:
+                statistics = list(map(sequenceStatistics.ContigStatistics, *[entry.section("statistics." + field) for field in _STATISTICSFIELDS]))
+            else:
+                statistics = None
+        except (sidecarFile.SidecarError, ValueError, TypeError):
+            return None
+        finally:
+            entry.close()
+        return faidx, fastaDict, statistics
+
+    def store(self, fastaPath:str, faidx:typing.List[faidxReader.FastaIndexLine], fastaDict:typing.List[fastaDictReader.FastaDictLine],
+              statistics:typing.List[sequenceStatistics.ContigStatistics]=None) -> bool:
+        sections = {
+            "faidx.contig": [line.contig for line in faidx],
+            "faidx.baseLength": array.array("q", [line.baseLength for line in faidx]),
+            "faidx.startByte": array.array("q", [line.startByte for line in faidx]),
+            "faidx.lineBases": array.array("q", [line.lineBases for line in faidx]),
+            "faidx.lineBytes": array.array("q", [line.lineBytes for line in faidx]),
+            "dict.contig": [line.contig for line in fastaDict],
+            "dict.byteLength": array.array("q", [line.byteLength for line in fastaDict]),
+            "dict.md5Hash": [line.md5Hash for line in fastaDict],
+            "dict.uri": [line.uri for line in fastaDict]
+        }
+        if statistics is not None:
+            sections["statistics.contig"] = [contigStatistics.contig for contigStatistics in statistics]
+            for field in _STATISTICSFIELDS[1:]:
+                sections["statistics." + field] = array.array("q", [getattr(contigStatistics, field) for contigStatistics in statistics])
+        return self.storeEntry(fastaPath, _FASTAKIND, sections)
+
+    def loadBEDFindings(self, bedPath:str) -> typing.Tuple[typing.Optional[str], typing.Optional[dict]]:
+        """Returns (fingerprint of the BED file, stored findings or None). The fingerprint is None if the file could not be read."""
+        try:
+            fingerprint = fingerprintFile(bedPath)
+        except OSError:
+            return None, None
+        entry = self.openEntry(bedPath, _BEDKIND, fingerprint)
+        if entry is None:
+            return fingerprint, None
+        try:
+            return fingerprint, entry.section("findings")
+        except (sidecarFile.SidecarError, ValueError):
+            return fingerprint, None
+        finally:
+            entry.close()
+
+    def loadBEDTable(self, bedPath:str, fingerprint:str) -> typing.Optional[bedTable.BEDTable]:
+        """Returns the parsed BED file stored with its findings, or None if there is none (such as after a streaming run)"""
+        entry = self.openEntry(bedPath, _BEDKIND, fingerprint)
+        if entry is None:
+            return None
+        try:
+            if "layout" not in entry:
+                return None
+            return bedTable.BEDTable.fromSections(entry.section)
+        except (sidecarFile.SidecarError, ValueError, KeyError, TypeError):
+            return None
+        finally:
+            entry.close()
+
+    def storeBED(self, bedPath:str, fingerprint:str, table:typing.Optional[bedTable.BEDTable], findings:dict) -> bool:
+        """Stores the findings for a BED file, along with the parsed file itself if it is given, the cache is set to store BED tables and it
+        fits. The fingerprint should be the one taken before the file was read, so that a file changed while it was being validated is not
+        stored under its new fingerprint."""
+        sections = {"findings": findings}
+        if table is not None and self.storeBEDTables:
+            try:
+                tableSections = table.toSections()
+            except ValueError:
+                tableSections = {}
+            if sum(map(sidecarFile.sectionSize, tableSections.values())) <= self.maxEntrySize:
+                sections.update(tableSections)
+        return self.storeEntry(bedPath, _BEDKIND, sections, fingerprint)
+
+    def storeEntry(self, path:str, kind:str, sections:dict, fingerprint:str=None) -> bool:
+        if sum(map(sidecarFile.sectionSize, sections.values())) > self.maxEntrySize:
+            return False
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            if fingerprint is None:
+                fingerprint = fingerprintFile(path)
+            self._atomicWrite(lambda entrySections, temporaryPath: sidecarFile.writeSidecar(temporaryPath, kind, fingerprint, entrySections),
+                              sections, self.entryPath(fingerprint))
+        except sidecarFile.SidecarError:  # Data the format cannot hold (such as names with newlines) is just not cached
+            return False
+        except OSError as error:
+            print("WARNING: Unable to write %s data to the cache at %s: %s" %(kind, self.directory, error))
+            return False
+        self.evict()
+        return True
+
+    def _atomicWrite(self, writer:typing.Callable, data:[list, dict], path:str) -> None:
+        fileDescriptor, temporaryPath = tempfile.mkstemp(dir=self.directory, prefix=".incomplete_")
+        os.close(fileDescriptor)
+        try:
+            writer(data, temporaryPath)
+            os.replace(temporaryPath, path)
+        except (OSError, sidecarFile.SidecarError):
+            try:
+                os.remove(temporaryPath)
+            except OSError:
+                pass
+            raise
+
+    def evict(self) -> typing.List[str]:
+        """Removes whole entries, oldest access first, until the cache fits in its size limit. Returns the fingerprints of the removed entries."""
+        entries = {}
+        try:
+            fileNames = os.listdir(self.directory)
+        except OSError:
+            return []
+        for fileName in fileNames:
+            fingerprint, extension = os.path.splitext(fileName)
+            if extension != _ENTRYEXTENSION:
+                continue
+            path = os.path.join(self.directory, fileName)
+            try:
+                fileStats = os.stat(path)
+            except OSError:
+                continue
+            entries[fingerprint] = (fileStats.st_size, fileStats.st_mtime, path)
+        totalSize = sum(size for size, lastAccess, path in entries.values())
+        evicted = []
+        for fingerprint, (size, lastAccess, path) in sorted(entries.items(), key=lambda entry: entry[1][1]):
+            if totalSize <= self.sizeLimit:
+                break
+            try:
+                os.remove(path)
+            except OSError:  # Another process may have already removed it
+                pass
+            totalSize -= size
+            evicted.append(fingerprint)
+        return evicted
+
+    def clear(self) -> None:
+        sizeLimit = self.sizeLimit
+        self.sizeLimit = -1
+        self.evict()
+        self.sizeLimit = sizeLimit
@@ -1,13 +1,18 @@
 import os
-from . import gzipDetector
+import shlex
+import shutil
+import typing
 import subprocess
+from . import gzipDetector
 
 
 _SAMTOOLSPATH = ""
+_SAMTOOLSSEARCHED = False
 
 
 def setSamToolsPath(forcePath:str="", validatePath:bool=True) -> str:
-    global _SAMTOOLSPATH
+    global _SAMTOOLSPATH, _SAMTOOLSSEARCHED
+    _SAMTOOLSSEARCHED = True
     commonSamtoolsPaths = [
         "/usr/bin/samtools",
         "/opt/conda/bin/samtools"
@@ -15,12 +20,7 @@ def setSamToolsPath(forcePath:str="", validatePath:bool=True) -> str:
     if forcePath:
         _SAMTOOLSPATH = forcePath
     if not _SAMTOOLSPATH:
-        try:
-            whichSamtools = subprocess.Popen(["which" "samtools"], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-            stdout, stderr = whichSamtools.communicate()
-            _SAMTOOLSPATH = stdout.decode().strip()
-        except FileNotFoundError: # This should be hit if the system doesn't have the which command
-            pass
+        _SAMTOOLSPATH = shutil.which("samtools") or ""  # Searches the PATH the same way the which command would, without starting a process
     if not _SAMTOOLSPATH:
         for commonPath in commonSamtoolsPaths:
             if os.path.isfile(commonPath):
@@ -41,6 +41,40 @@ def setSamToolsPath(forcePath:str="", validatePath:bool=True) -> str:
     return _SAMTOOLSPATH
 
 
+def getSamToolsPath() -> str:
+    """Path of the Samtools executable, or an empty string if there is none. It is looked for the first time it is needed rather than when
+    this module is imported, since the builtin FASTA analysis means most runs never need it."""
+    if not _SAMTOOLSSEARCHED:
+        setSamToolsPath(validatePath=False)
+    return _SAMTOOLSPATH
+
+
+def describeCommand(command:typing.List[str], inputFilePath:str="") -> str:
+    """The command as it would be typed in a shell, for logging"""
+    description = " ".join(map(shlex.quote, command))
+    if inputFilePath:
+        description = "gzip -dc %s | %s" %(shlex.quote(inputFilePath), description)
+    return description
+
+
+def runCommand(command:typing.List[str], gzippedInputPath:str="") -> int:
+    """Runs the command without a shell and returns its exit status. With gzippedInputPath, the decompressed file is piped into the command
+    the way gzip -dc file | command would, and a failure of either gives a non-zero status."""
+    try:
+        if not gzippedInputPath:
+            return subprocess.run(command).returncode
+        decompressor = subprocess.Popen(["gzip", "-dc", gzippedInputPath], stdout=subprocess.PIPE)
+        try:
+            returnCode = subprocess.run(command, stdin=decompressor.stdout).returncode
+        finally:
+            decompressor.stdout.close()  # Lets gzip stop if the command exits without reading everything
+            decompressorReturnCode = decompressor.wait()
+        return returnCode or decompressorReturnCode
+    except OSError as error:  # Such as an executable that cannot be run
+        print("Unable to run %s: %s" %(command[0], error))
+        return 127
+
+
 def indexFasta(inputFilePath:str, forceReindex:bool=False) -> str:
     if not os.path.isfile(inputFilePath):
         raise FileNotFoundError("Unable to find input file at %s" %inputFilePath)
@@ -52,17 +86,22 @@ def indexFasta(inputFilePath:str, forceReindex:bool=False) -> str:
         if not forceReindex:
             print("FASTA dictionary already exists at %s. Not set to reindex, so using existing file." %outputFilePath)
             return outputFilePath
-    gzippedFile = gzipDetector.fileIsGzipped(inputFilePath)
-    if gzippedFile:
-        command = "gzip -dc %s | %s faidx --fai-idx %s -" %(inputFilePath, _SAMTOOLSPATH, outputFilePath)
-        altCommand = "gzip -dc %s | %s faidx - && mv ./-.fai %s" %(inputFilePath, _SAMTOOLSPATH, outputFilePath) #Workaround for older versions of samtools that do not support naming the fasta index
+    samtoolsPath = getSamToolsPath()
+    gzippedInputPath = inputFilePath if gzipDetector.fileIsGzipped(inputFilePath) else ""
+    if gzippedInputPath:
+        command = [samtoolsPath, "faidx", "--fai-idx", outputFilePath, "-"]
     else:
-        command = "%s faidx -o %s %s" %(_SAMTOOLSPATH, outputFilePath, inputFilePath)
-    print("Running Fasta Index: " + command)
-    returnCode = os.system(command)
-    if gzippedFile and returnCode != 0:
+        command = [samtoolsPath, "faidx", "-o", outputFilePath, inputFilePath]
+    print("Running Fasta Index: " + describeCommand(command, gzippedInputPath))
+    returnCode = runCommand(command, gzippedInputPath)
+    if gzippedInputPath and returnCode != 0:
         print("Initial attempt on gzipped file failed. Attempting workaround command.")
-        returnCode = os.system(altCommand)
+        returnCode = runCommand([samtoolsPath, "faidx", "-"], gzippedInputPath)  # Workaround for older versions of samtools that do not support naming the fasta index
+        if returnCode == 0:
+            try:
+                shutil.move("-.fai", outputFilePath)
+            except OSError:
+                returnCode = 1
     if returnCode != 0:
         raise SamtoolsFailure("Samtools fasta index returned a non-zero exit status")
     else:
@@ -80,12 +119,14 @@ def makeFastaDict(inputFilePath:str, forceReindex:bool=False) -> str:
         if not forceReindex:
             print("FASTA dictionary already exists at %s. Not set to reindex, so using existing file." %outputFilePath)
             return outputFilePath
-    if gzipDetector.fileIsGzipped(inputFilePath):
-        command = "gzip -dc %s | %s dict -o %s -" % (inputFilePath, _SAMTOOLSPATH, outputFilePath)
+    samtoolsPath = getSamToolsPath()
+    gzippedInputPath = inputFilePath if gzipDetector.fileIsGzipped(inputFilePath) else ""
+    if gzippedInputPath:
+        command = [samtoolsPath, "dict", "-o", outputFilePath, "-"]
     else:
-        command = "%s dict -o %s %s" %(_SAMTOOLSPATH, outputFilePath, inputFilePath)
-    print("Running Fasta Dictionary: " + command)
-    returnCode = os.system(command)
+        command = [samtoolsPath, "dict", "-o", outputFilePath, inputFilePath]
+    print("Running Fasta Dictionary: " + describeCommand(command, gzippedInputPath))
+    returnCode = runCommand(command, gzippedInputPath)
     if returnCode != 0:
         raise SamtoolsFailure("Samtools fasta dict returned a non-zero exit status")
     else:
@@ -94,6 +135,3 @@ def makeFastaDict(inputFilePath:str, forceReindex:bool=False) -> str:
 
 class SamtoolsFailure(Exception):
     pass
-
-
-setSamToolsPath(validatePath=False)
\ No newline at end of file
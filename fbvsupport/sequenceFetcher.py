@@ -0,0 +1,106 @@
+import os
+import mmap
+import typing
+from . import bgzf
+from . import faidxReader
+from . import gzipDetector
+
+
+_NEWLINEBYTES = b"\r\n"
+_COALESCEGAP = 16384  # Bases between intervals that are read through rather than skipped, since skipping less than a few pages saves nothing
+_MAXREADBASES = 1 << 22  # Longest stretch read in one piece while coalescing, so a dense BED does not pull in a whole chromosome at once
+
+
+class SequenceFetchError(Exception):
+    pass
+
+
+def byteOffset(indexLine:faidxReader.FastaIndexLine, position:int) -> int:
+    """Offset in the (uncompressed) FASTA of the base at a 0-based position on the contig. A position at the start of a line (including
+    the end of the contig) gives the offset just past the newline before it, so a slice between two offsets only has newlines to remove."""
+    if not indexLine.lineBases:
+        return indexLine.startByte
+    lines, column = divmod(position, indexLine.lineBases)
+    return indexLine.startByte + lines * indexLine.lineBytes + column
+
+
+class SequenceFetcher:
+    """Random access to the bases of a FASTA using its faidx entries. An uncompressed FASTA is memory mapped so any interval is one slice of
+    the map followed by newline removal, and a BGZF compressed FASTA is read through its block index. Plain gzip cannot be read at random."""
+
+    def __init__(self, fastaPath:str, faidx:typing.List[faidxReader.FastaIndexLine]):
+        self.path = fastaPath
+        self.index = {indexLine.contig: indexLine for indexLine in faidx}
+        self.fastaMap = None
+        self.bgzfReader = None
+        self.file = None
+        if gzipDetector.fileIsGzipped(fastaPath):
+            if not bgzf.fileIsBGZF(fastaPath):
+                raise SequenceFetchError("Unable to fetch sequence from %s because it is gzip compressed without BGZF blocks. Compress it with bgzip or decompress it to check the sequence of intervals." %fastaPath)
+            self.bgzfReader = bgzf.BGZFReader(fastaPath, bgzf.loadOrBuildGziIndex(fastaPath))
+            return
+        self.file = open(fastaPath, 'rb')
+        if os.fstat(self.file.fileno()).st_size:
+            self.fastaMap = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def close(self) -> None:
+        if self.fastaMap is not None:
+            self.fastaMap.close()
+        if self.bgzfReader is not None:
+            self.bgzfReader.close()
+        if self.file is not None:
+            self.file.close()
+
+    def __contains__(self, contig:str) -> bool:
+        return contig in self.index
+
+    def readBytes(self, startByte:int, endByte:int) -> bytes:
+        if self.bgzfReader is not None:
+            return self.bgzfReader.read(startByte, endByte - startByte)
+        if self.fastaMap is None:
+            return b""
+        return self.fastaMap[startByte:endByte]
+
+    def readBases(self, indexLine:faidxReader.FastaIndexLine, start:int, end:int) -> bytes:
+        if end <= start:
+            return b""
+        return self.readBytes(byteOffset(indexLine, start), byteOffset(indexLine, end)).translate(None, _NEWLINEBYTES)
+
+    def fetch(self, contig:str, start:int, end:int) -> bytes:
+        """Bases of the 0-based, half open interval, clipped to the contig"""
+        indexLine = self.index.get(contig)
+        if indexLine is None:
+            raise SequenceFetchError("Contig %s is not in the index for %s" %(contig, self.path))
+        start = min(max(start, 0), indexLine.baseLength)
+        end = min(max(end, start), indexLine.baseLength)
+        return self.readBases(indexLine, start, end)
+
+    def fetchSorted(self, contig:str, starts:typing.Sequence[int], ends:typing.Sequence[int]) -> typing.Iterator[bytes]:
+        """Yields the bases of each interval (clipped to the contig) for intervals sorted by start, such as those of a ContigIntervals. Reads
+        only ever move forward: intervals that overlap or sit close together are read as one coalesced stretch, and bases still needed by later
+        intervals are kept from one read to the next, so each part of the reference is read at most once however many intervals cover it."""
+        indexLine = self.index.get(contig)
+        if indexLine is None:
+            raise SequenceFetchError("Contig %s is not in the index for %s" %(contig, self.path))
+        contigLength = indexLine.baseLength
+        count = len(starts)
+        buffer = b""
+        bufferStart = 0
+        bufferEnd = 0
+        lookahead = 0
+        for position in range(count):
+            start = min(max(starts[position], 0), contigLength)
+            end = min(max(ends[position], start), contigLength)
+            if end > bufferEnd:
+                if start >= bufferEnd:
+                    buffer = b""
+                    bufferStart = bufferEnd = start
+                readEnd = end
+                lookahead = max(lookahead, position + 1)
+                while lookahead < count and starts[lookahead] <= readEnd + _COALESCEGAP and readEnd - bufferEnd < _MAXREADBASES:
+                    readEnd = max(readEnd, min(ends[lookahead], contigLength))
+                    lookahead += 1
+                buffer = buffer[start - bufferStart:] + self.readBases(indexLine, bufferEnd, readEnd)
+                bufferStart = start
+                bufferEnd = readEnd
+            yield buffer[start - bufferStart:end - bufferStart]
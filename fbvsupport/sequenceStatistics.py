@@ -0,0 +1,85 @@
+import re
+import typing
+from . import slottedDataClass
+
+
+_NRUNREGEX = re.compile(b"N+")
+_AMBIGUITYCODES = b"RYKMSWBDHV"
+_NONAMBIGUITYBYTES = bytes(character for character in range(256) if character not in _AMBIGUITYCODES)
+_LOWERCASEBYTES = bytes(range(ord("a"), ord("z") + 1))
+_BASECLASSTABLE = bytes(1 if character in b"GCgc" else 2 if character in b"ATat" else 3 if character in b"Nn" else 0 for character in range(256))
+
+
+@slottedDataClass.slottedDataClass(slots=True)
+class ContigStatistics:
+    contig:str
+    baseLength:int
+    gcCount:int
+    atCount:int
+    nCount:int
+    softMaskedCount:int
+    ambiguityCount:int
+    invalidCount:int
+    nRunCount:int
+    longestNRun:int
+
+
+def baseComposition(sequence:bytes) -> typing.Tuple[int, int, int, int]:
+    """(GC, AT, N, soft-masked) base counts for a short sequence such as one BED interval. One translate sorts the bases into classes, which
+    is quicker on short sequences than counting each base in an upper cased copy."""
+    classes = sequence.translate(_BASECLASSTABLE)
+    return classes.count(b"\x01"), classes.count(b"\x02"), classes.count(b"\x03"), len(sequence) - len(sequence.translate(None, _LOWERCASEBYTES))
+
+
+class SequenceStatisticsAccumulator:
+    """Running base composition for the sequence of one contig, fed in pieces with the newlines already removed. Every count is done by
+    bytes.count or bytes.translate over the whole piece, so only the N runs are visited individually from Python."""
+
+    def __init__(self):
+        self.baseLength = 0
+        self.gcCount = 0
+        self.atCount = 0
+        self.nCount = 0
+        self.softMaskedCount = 0
+        self.ambiguityCount = 0
+        self.invalidCount = 0
+        self.nRunCount = 0
+        self.longestNRun = 0
+        self.openNRun = 0  # Length of an N run that reaches the end of the last piece and may carry on into the next
+
+    def update(self, sequence:bytes, upperSequence:bytes=None) -> None:
+        if upperSequence is None:
+            upperSequence = sequence.upper()
+        length = len(sequence)
+        gcCount = upperSequence.count(b"G") + upperSequence.count(b"C")
+        atCount = upperSequence.count(b"A") + upperSequence.count(b"T")
+        nCount = upperSequence.count(b"N")
+        ambiguityCount = len(upperSequence.translate(None, _NONAMBIGUITYBYTES))
+        self.baseLength += length
+        self.gcCount += gcCount
+        self.atCount += atCount
+        self.nCount += nCount
+        self.ambiguityCount += ambiguityCount
+        self.invalidCount += length - gcCount - atCount - nCount - ambiguityCount
+        self.softMaskedCount += length - len(sequence.translate(None, _LOWERCASEBYTES))
+        if not nCount:
+            self.closeNRun()
+            return
+        for nRun in _NRUNREGEX.finditer(upperSequence):
+            runStart, runEnd = nRun.span()
+            if not (runStart == 0 and self.openNRun):
+                self.closeNRun()
+            self.openNRun += runEnd - runStart
+            if runEnd != length:
+                self.closeNRun()
+
+    def closeNRun(self) -> None:
+        if self.openNRun:
+            self.nRunCount += 1
+            self.longestNRun = max(self.longestNRun, self.openNRun)
+            self.openNRun = 0
+
+    def result(self, contig:str) -> ContigStatistics:
+        self.closeNRun()
+        return ContigStatistics(contig, self.baseLength, self.gcCount, self.atCount, self.nCount, self.softMaskedCount, self.ambiguityCount,
+                                self.invalidCount, self.nRunCount, self.longestNRun)
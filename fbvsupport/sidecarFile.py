@@ -0,0 +1,129 @@
+import sys
+import mmap
+import json
+import array
+import struct
+import typing
+
+
+_MAGIC = b"FBVSIDE\x00"
+_FORMATVERSION = 1
+_BYTEORDERS = {"little": 1, "big": 2}
+_HEADER = struct.Struct("<8sHBx8s40sI")  # Magic, format version, byte order, kind, source fingerprint, section count
+_SECTIONENTRY = struct.Struct("<32scxxxxxxxQQQ")  # Name, type code, offset, length in bytes, item count
+_ALIGNMENT = 8
+_STRINGSEPARATOR = "\n"
+_STRINGSTYPE = b"s"
+_JSONTYPE = b"j"
+_ARRAYTYPES = frozenset(b"bBhHiIlLqQfd")
+
+
+class SidecarError(Exception):
+    pass
+
+
+def encodeSection(value) -> typing.Tuple[bytes, bytes, int]:
+    """Returns (type code, data, item count) for an array, a list of strings or anything else JSON can hold. Strings are joined with newlines,
+    which no line based input can contain."""
+    if isinstance(value, array.array):
+        return value.typecode.encode(), value.tobytes(), len(value)
+    if isinstance(value, list) and all(type(item) == str for item in value):
+        joined = _STRINGSEPARATOR.join(value)
+        if joined.count(_STRINGSEPARATOR) != max(len(value) - 1, 0):
+            raise SidecarError("Unable to store strings that contain newlines")
+        return _STRINGSTYPE, joined.encode("utf-8", "surrogatepass"), len(value)
+    return _JSONTYPE, json.dumps(value).encode(), 1
+
+
+def sectionSize(value) -> int:
+    """Roughly the number of bytes encodeSection would give for the value, without encoding it (strings are counted as ASCII)"""
+    if isinstance(value, array.array):
+        return value.itemsize * len(value)
+    if isinstance(value, list) and all(type(item) == str for item in value):
+        return sum(map(len, value)) + len(value)
+    return len(json.dumps(value))
+
+
+def writeSidecar(path:str, kind:str, fingerprint:str, sections:typing.Dict[str, typing.Any]) -> str:
+    """Writes named sections (see encodeSection) to a binary file headed by the kind of data it holds and the fingerprint of the file it was
+    made from. Each section starts on an 8 byte boundary so arrays can be read straight from a memory map."""
+    encodedSections = [(name.encode(),) + encodeSection(value) for name, value in sections.items()]
+    offset = _HEADER.size + _SECTIONENTRY.size * len(encodedSections)
+    entries = []
+    for name, typeCode, data, count in encodedSections:
+        offset += -offset % _ALIGNMENT
+        entries.append(_SECTIONENTRY.pack(name, typeCode, offset, len(data), count))
+        offset += len(data)
+    file = open(path, 'wb')
+    file.write(_HEADER.pack(_MAGIC, _FORMATVERSION, _BYTEORDERS[sys.byteorder], kind.encode(), fingerprint.encode(), len(entries)))
+    file.write(b"".join(entries))
+    for name, typeCode, data, count in encodedSections:
+        file.write(b"\x00" * (-file.tell() % _ALIGNMENT))
+        file.write(data)
+    file.close()
+    return path
+
+
+class Sidecar:
+    """Memory mapped reader for a file written by writeSidecar. Opening it checks that it holds the expected kind of data for a source with
+    the expected fingerprint, written on a machine with the same byte order, and raises SidecarError otherwise so the caller can treat it as
+    stale. Arrays are copied straight out of the map without any parsing."""
+
+    def __init__(self, path:str, kind:str, fingerprint:str):
+        self.path = path
+        file = open(path, 'rb')
+        try:
+            self.fileMap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # An empty file cannot be mapped
+            raise SidecarError("Sidecar file %s is empty" %path)
+        finally:
+            file.close()
+        try:
+            self.sections = self.readHeader(kind, fingerprint)
+        except (SidecarError, struct.error, UnicodeDecodeError) as error:
+            self.close()
+            if isinstance(error, SidecarError):
+                raise
+            raise SidecarError("Sidecar file %s is damaged: %s" %(path, error))
+
+    def readHeader(self, kind:str, fingerprint:str) -> typing.Dict[str, typing.Tuple[str, int, int, int]]:
+        magic, formatVersion, byteOrder, storedKind, storedFingerprint, sectionCount = _HEADER.unpack_from(self.fileMap, 0)
+        if magic != _MAGIC or formatVersion != _FORMATVERSION:
+            raise SidecarError("%s is not a sidecar file this version can read" %self.path)
+        if byteOrder != _BYTEORDERS[sys.byteorder]:
+            raise SidecarError("Sidecar file %s was written on a machine with a different byte order" %self.path)
+        if storedKind.rstrip(b"\x00").decode() != kind or storedFingerprint.decode() != fingerprint:
+            raise SidecarError("Sidecar file %s was made from a different or changed %s file" %(self.path, kind))
+        sections = {}
+        for sectionNumber in range(sectionCount):
+            name, typeCode, offset, length, count = _SECTIONENTRY.unpack_from(self.fileMap, _HEADER.size + _SECTIONENTRY.size * sectionNumber)
+            if offset + length > len(self.fileMap):
+                raise SidecarError("Sidecar file %s is truncated" %self.path)
+            sections[name.rstrip(b"\x00").decode()] = (typeCode.decode(), offset, length, count)
+        return sections
+
+    def close(self) -> None:
+        self.fileMap.close()
+
+    def __contains__(self, name:str) -> bool:
+        return name in self.sections
+
+    def section(self, name:str):
+        """Returns an array, a list of strings or the JSON value stored under name"""
+        if name not in self.sections:
+            raise SidecarError("Sidecar file %s has no %s section" %(self.path, name))
+        typeCode, offset, length, count = self.sections[name]
+        if typeCode != _STRINGSTYPE.decode() and typeCode != _JSONTYPE.decode() and ord(typeCode) not in _ARRAYTYPES:
+            raise SidecarError("Sidecar file %s has a section of unknown type %s" %(self.path, typeCode))
+        with memoryview(self.fileMap) as fileView, fileView[offset:offset + length] as data:  # Views are released so the map can be closed
+            if typeCode == _STRINGSTYPE.decode():
+                if not count:
+                    return []
+                return str(data, "utf-8", "surrogatepass").split(_STRINGSEPARATOR)
+            if typeCode == _JSONTYPE.decode():
+                return json.loads(bytes(data))
+            values = array.array(typeCode)
+            if length != values.itemsize * count:
+                raise SidecarError("Sidecar file %s was written with %s byte %s arrays" %(self.path, length // max(count, 1), typeCode))
+            values.frombytes(data)
+            return values
@@ -0,0 +1,125 @@
+import sys
+import time
+import typing
+import contextlib
+from . import slottedDataClass
+
+try:
+    import resource
+except ImportError:  # Not available on Windows, where peak memory is left out of the timings
+    resource = None
+
+
+def peakMemoryBytes() -> [int, None]:
+    """Highest resident memory of this process so far, or None where it cannot be measured"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":  # Reported in bytes on macOS and kilobytes everywhere else
+        return peak
+    return peak * 1024
+
+
+@slottedDataClass.slottedDataClass(slots=True)
+class StageRecord:
+    name: str
+    seconds: float = 0.0
+    calls: int = 0
+    rows: [int, None] = None
+    bytesRead: [int, None] = None
+    peakMemory: [int, None] = None
+
+    def addRows(self, rows:int) -> None:
+        self.rows = (self.rows or 0) + rows
+
+    def addBytes(self, bytesRead:int) -> None:
+        self.bytesRead = (self.bytesRead or 0) + bytesRead
+
+    def add(self, other:"StageRecord") -> None:
+        self.seconds += other.seconds
+        self.calls += other.calls
+        if other.rows is not None:
+            self.addRows(other.rows)
+        if other.bytesRead is not None:
+            self.addBytes(other.bytesRead)
+        if other.peakMemory is not None:
+            self.peakMemory = max(self.peakMemory or 0, other.peakMemory)
+
+    def toDict(self) -> dict:
+        values = {"Seconds": round(self.seconds, 6)}
+        if self.calls > 1:
+            values["Calls"] = self.calls
+        if self.rows is not None:
+            values["Rows"] = self.rows
+            if self.seconds:
+                values["Rows Per Second"] = round(self.rows / self.seconds)
+        if self.bytesRead is not None:
+            values["Bytes Read"] = self.bytesRead
+            if self.seconds:
+                values["Megabytes Per Second"] = round(self.bytesRead / self.seconds / 1000000, 2)
+        if self.peakMemory is not None:
+            values["Peak Memory MB"] = round(self.peakMemory / (1024 * 1024), 1)
+        return values
+
+
+class StageTimer:
+    """Times the named stages of a validation run along with the rows and bytes each one handled and the peak memory of the process when it
+    finished. A stage entered more than once (such as a check run on every chunk of a streamed file) adds up. A disabled timer measures
+    and keeps nothing, so it can be passed around unconditionally."""
+
+    def __init__(self, enabled:bool=True):
+        self.enabled = enabled
+        self.records = {}
+
+    def record(self, name:str) -> StageRecord:
+        if not self.enabled:
+            return StageRecord(name)
+        if name not in self.records:
+            self.records[name] = StageRecord(name)
+        return self.records[name]
+
+    @contextlib.contextmanager
+    def stage(self, name:str) -> typing.Iterator[StageRecord]:
+        record = self.record(name)
+        if not self.enabled:
+            yield record
+            return
+        startTime = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record.seconds += time.perf_counter() - startTime
+            record.calls += 1
+            record.peakMemory = peakMemoryBytes()
+
+    def iterate(self, name:str, iterable:typing.Iterable) -> typing.Iterator:
+        """Yields from iterable, adding the time spent producing each item (but not the time the caller spends on it) to the named stage"""
+        if not self.enabled:
+            yield from iterable
+            return
+        record = self.record(name)
+        record.calls += 1
+        iterator = iter(iterable)
+        while True:
+            startTime = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                break
+            finally:
+                record.seconds += time.perf_counter() - startTime
+            yield item
+        record.peakMemory = peakMemoryBytes()
+
+    def merge(self, records:typing.Iterable[StageRecord]) -> None:
+        """Adds stages timed elsewhere, such as in a worker process"""
+        if not self.enabled:
+            return
+        for record in records:
+            self.record(record.name).add(record)
+
+    def toDict(self) -> dict:
+        return {name: record.toDict() for name, record in self.records.items()}
+
+
+DISABLEDTIMER = StageTimer(enabled=False)
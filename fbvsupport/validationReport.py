@@ -1,6 +1,11 @@
 import json
 import typing
 import logging
+from . import errorCollection
+from . import jsonWriter
+
+
+_FINDINGLEVELS = {"Warnings" : "Warning", "Errors" : "Error", "Critical Errors" : "Critical"}
 
 
 class ValidationReport:
@@ -20,33 +25,53 @@ class ValidationReport:
         else:
             self.warningList = warningList.copy()
         self._inputs = {}
+        self._statistics = {}
+        self._performance = {}
+        self._omittedErrors = {}
+        self._omittedWarnings = {}
 
     @property
     def noErrors(self) -> bool:
-        if self.errorList or self.criticalList:
+        if self.errorList or self.criticalList or self._omittedErrors:
             return False
         else:
             return True
 
     @property
     def noWarnings(self) -> bool:
-        if self.warningList:
+        if self.warningList or self._omittedWarnings:
             return False
         else:
             return True
 
     @property
     def warningCount(self) -> int:
-        return len(self.warningList)
+        return len(self.warningList) + sum(self._omittedWarnings.values())
 
     @property
     def errorCount(self) -> int:
-        return len(self.errorList) + len(self.criticalList)
+        return len(self.errorList) + len(self.criticalList) + sum(self._omittedErrors.values())
 
     @property
     def inputs(self) -> dict:
         return self._inputs.copy()
 
+    @property
+    def statistics(self) -> dict:
+        return {section: values.copy() for section, values in self._statistics.items()}
+
+    @property
+    def performance(self) -> dict:
+        return {stage: values.copy() for stage, values in self._performance.items()}
+
+    @property
+    def omittedErrors(self) -> dict:
+        return self._omittedErrors.copy()
+
+    @property
+    def omittedWarnings(self) -> dict:
+        return self._omittedWarnings.copy()
+
     @property
     def passed(self) -> bool:
         return self.noWarnings and self.noErrors
@@ -59,6 +84,16 @@ class ValidationReport:
         except: # Using a general exception here because this is expected to error in many cases and we have a fallback
             self._inputs[name].append(value)
 
+    def addStatistics(self, section:str, values:dict) -> None:
+        if section not in self._statistics:
+            self._statistics[section] = {}
+        self._statistics[section].update(values)
+
+    def addPerformance(self, stage:str, values:dict) -> None:
+        if stage not in self._performance:
+            self._performance[stage] = {}
+        self._performance[stage].update(values)
+
     def addWarning(self, warning:str) -> None:
         self.warningList.append(warning)
 
@@ -68,17 +103,26 @@ class ValidationReport:
     def addCritical(self, criticalError:str) -> None:
         self.criticalList.append(criticalError)
     
-    def addWarnings(self, warnings:typing.List[str]) -> None:
+    def addWarnings(self, warnings:[typing.List[str], errorCollection.ErrorCollection]) -> None:
         if type(warnings) == str:
             raise ValueError("The addWarnings method should only be run on a list. To add a string, run the addWarning method")
         for warning in warnings:
             self.warningList.append(warning)
+        if isinstance(warnings, errorCollection.ErrorCollection):
+            self._addOmitted(self._omittedWarnings, warnings.omitted())
             
-    def addErrors(self, errors:typing.List[str]) -> None:
+    def addErrors(self, errors:[typing.List[str], errorCollection.ErrorCollection]) -> None:
         if type(errors) == str:
             raise ValueError("The addErrors method should only be run on a list. To add a string, run the addError method")
         for error in errors:
             self.errorList.append(error)
+        if isinstance(errors, errorCollection.ErrorCollection):
+            self._addOmitted(self._omittedErrors, errors.omitted())
+
+    @staticmethod
+    def _addOmitted(omittedCounts:dict, omitted:dict) -> None:
+        for category, count in omitted.items():
+            omittedCounts[category] = omittedCounts.get(category, 0) + count
             
     def addCriticals(self, criticals:typing.List[str]) -> None: # Please let nobody ever have to use this method.
         if type(criticals) == str:
@@ -87,20 +131,50 @@ class ValidationReport:
             self.criticalList.append(critical)
 
     def toDict(self):
+        return {self.testName : self._makeDataDict(copyLists=True)}
+
+    def _makeDataDict(self, copyLists:bool=True) -> dict:
+        if copyLists:
+            warnings, errors, criticals = self.warningList.copy(), self.errorList.copy(), self.criticalList.copy()
+        else:  # Only for writing the report straight out, where copies of long lists would just use memory
+            warnings, errors, criticals = self.warningList, self.errorList, self.criticalList
         dataDict = {
             "Passed" : self.passed,
             "Warning Count" : self.warningCount,
             "Error Count" : self.errorCount,
             "Inputs" : self.inputs,
-            "Warnings" : self.warningList.copy(),
-            "Errors" : self.errorList.copy(),
-            "Critical Errors" : self.criticalList.copy()
+            "Warnings" : warnings,
+            "Errors" : errors,
+            "Critical Errors" : criticals
         }
-        return {self.testName : dataDict}
+        if self._statistics:  # Only there when something was measured, so reports without statistics look the same as they always have
+            dataDict["Statistics"] = self.statistics
+        if self._omittedErrors:  # Only there when some errors were left out of the lists above
+            dataDict["Errors Not Shown"] = self.omittedErrors
+        if self._omittedWarnings:
+            dataDict["Warnings Not Shown"] = self.omittedWarnings
+        if self._performance:  # Only there when the run was instrumented
+            dataDict["Performance"] = self.performance
+        return dataDict
 
     def toJSON(self, indent:int=2):
         return json.dumps(self.toDict(), indent=indent)
 
+    def writeJSON(self, outputFile:typing.TextIO, indent:int=2) -> None:
+        """Writes the same JSON as toJSON to an open file as it goes, without first building the report as a dictionary and a string"""
+        jsonWriter.writeJSONValue(outputFile, {self.testName : self._makeDataDict(copyLists=False)}, indent)
+
+    def writeNDJSON(self, outputFile:typing.TextIO) -> None:
+        """Writes the report as newline delimited JSON: a first line with everything but the findings, then one line per finding"""
+        dataDict = self._makeDataDict(copyLists=False)
+        summary = {"Test" : self.testName}
+        for key, value in dataDict.items():
+            if key not in _FINDINGLEVELS:
+                summary[key] = value
+        jsonWriter.writeJSONLine(outputFile, summary)
+        for key, level in _FINDINGLEVELS.items():
+            jsonWriter.writeJSONLines(outputFile, {"Level" : level}, "Message", dataDict[key])
+
     def dumpToLogger(self, logger:logging.Logger) -> None:
         logger.info("Dumping results for test %s" %self.testName)
         for inputType, files in self.inputs.items():
@@ -111,8 +185,17 @@ class ValidationReport:
             logger.critical(criticalError)
         for error in self.errorList:
             logger.error(error)
+        for category, count in self._omittedErrors.items():
+            logger.error("%s more errors of type %s not shown" %(count, category))
         for warning in self.warningList:
             logger.warning(warning)
+        for category, count in self._omittedWarnings.items():
+            logger.warning("%s more warnings of type %s not shown" %(count, category))
+        for section, values in self._statistics.items():
+            for name, value in values.items():
+                logger.info("%s %s: %s" %(section, name, value))
+        for stage, values in self._performance.items():
+            logger.info("Performance of %s: %s" %(stage, ", ".join("%s %s" %(name, value) for name, value in values.items())))
 
     def __str__(self):
         if self.passed:
@@ -0,0 +1,207 @@
+import io
+import os
+import hmac
+import json
+import typing
+import secrets
+import threading
+import traceback
+import http.server
+from . import referenceCache
+from . import validationReport
+from . import validations
+from . import versionInfo
+
+
+DEFAULTHOST = "127.0.0.1"  # Jobs name files on this machine, so the server only listens locally
+DEFAULTPORT = 8765
+_MAXREQUESTBYTES = 1024 * 1024
+LOCALHOSTNAMES = ("127.0.0.1", "localhost")
+TOKENHEADER = "X-FBV-Token"
+JOBOPTIONS = {  # Validation options a job may set and the types their values may have
+    "streaming": (bool,),
+    "checkOverlaps": (bool,),
+    "compareBEDs": (bool,),
+    "checkSequence": (bool,),
+    "checkFastaContent": (bool,),
+    "gcRange": (list,),
+    "maxSoftMasked": (float, int),
+    "instrument": (bool,),
+    "workers": (int,),
+    "maxExamples": (int, type(None)),
+    "backend": (str,)
+}
+OUTPUTFORMATS = ("json", "ndjson")
+
+
+class ValidationJobError(Exception):
+    pass
+
+
+def parseJob(job:dict) -> typing.Tuple[str, typing.List[str], dict, str]:
+    """Checks a job sent to the server, which looks like {"fasta": path, "beds": [paths], "options": {name: value}, "format": "json"}. Only
+    fasta is required. Returns (FASTA path, BED paths, options, output format)."""
+    if not isinstance(job, dict):
+        raise ValidationJobError("A job must be a JSON object")
+    for key in job:
+        if key not in ("fasta", "beds", "options", "format"):
+            raise ValidationJobError("Unrecognized job field %s" %key)
+    fastaPath = job.get("fasta")
+    if not isinstance(fastaPath, str) or not fastaPath:
+        raise ValidationJobError("A job needs the path of a FASTA file in its fasta field")
+    bedPaths = job.get("beds", [])
+    if not isinstance(bedPaths, list) or not all(isinstance(bedPath, str) for bedPath in bedPaths):
+        raise ValidationJobError("The beds field of a job must be a list of BED file paths")
+    options = job.get("options", {})
+    if not isinstance(options, dict):
+        raise ValidationJobError("The options field of a job must be a JSON object")
+    for name, value in options.items():
+        if name not in JOBOPTIONS:
+            raise ValidationJobError("Unrecognized option %s. Jobs may set %s" %(name, ", ".join(JOBOPTIONS)))
+        if type(value) not in JOBOPTIONS[name]:
+            raise ValidationJobError("Unable to use %s as the value for option %s" %(json.dumps(value), name))
+    if "maxExamples" in options and not options["maxExamples"]:
+        options = dict(options, maxExamples=None)  # 0 lists them all, the same as on the command line
+    if "gcRange" in options:
+        gcRange = options["gcRange"]
+        if len(gcRange) != 2 or not all(type(bound) in (float, int) for bound in gcRange) or not 0 <= gcRange[0] <= gcRange[1] <= 1:
+            raise ValidationJobError("Option gcRange must be a list of a minimum and a maximum GC fraction between 0 and 1")
+        options = dict(options, gcRange=tuple(gcRange))
+    outputFormat = job.get("format", "json")
+    if outputFormat not in OUTPUTFORMATS:
+        raise ValidationJobError("Output format must be one of %s, but got %s" %(", ".join(OUTPUTFORMATS), outputFormat))
+    return fastaPath, bedPaths, options, outputFormat
+
+
+class ValidationRequestHandler(http.server.BaseHTTPRequestHandler):
+    """POST /validate runs a job and responds with its validation report, the same JSON the command line writes to its output file.
+    GET /status lists the references held in memory. Every request must carry the server's token and name the server by its local address
+    in its Host header, and jobs must be sent as application/json, so that web pages open in a local browser cannot send jobs to it."""
+
+    server_version = "FBValidation/%s" %versionInfo.VERSION
+
+    def requestRefusal(self) -> typing.Optional[typing.Tuple[int, str]]:
+        """Returns (status, reason) if the request should be refused, or None if it may go ahead"""
+        port = self.server.server_address[1]
+        if self.headers.get("Host", "").lower() not in ["%s:%s" %(hostName, port) for hostName in LOCALHOSTNAMES]:  # Stops DNS rebinding
+            return 403, "Requests must be sent to 127.0.0.1:%s or localhost:%s" %(port, port)
+        if not hmac.compare_digest(self.headers.get(TOKENHEADER, "").encode(), self.server.token.encode()):
+            return 403, "Requests must carry the token the server printed when it started in an %s header" %TOKENHEADER
+        return None
+
+    def do_GET(self):
+        refusal = self.requestRefusal()
+        if refusal:
+            self.sendJSON(refusal[0], {"Error": refusal[1]})
+            return
+        if self.path != "/status":
+            self.sendJSON(404, {"Error": "Unknown path %s" %self.path})
+            return
+        self.sendJSON(200, {"Version": versionInfo.VERSION, "Jobs": self.server.jobCount, "References": self.server.referenceStore.fastaPaths()})
+
+    def do_POST(self):
+        refusal = self.requestRefusal()
+        if refusal:
+            self.sendJSON(refusal[0], {"Error": refusal[1]})
+            return
+        if self.path != "/validate":
+            self.sendJSON(404, {"Error": "Unknown path %s" %self.path})
+            return
+        if self.headers.get_content_type() != "application/json":  # Browsers can send other types from any page without asking first
+            self.sendJSON(415, {"Error": "Jobs must be sent with a Content-Type of application/json"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            if length > _MAXREQUESTBYTES:
+                raise ValidationJobError("Job is larger than %s bytes" %_MAXREQUESTBYTES)
+            fastaPath, bedPaths, options, outputFormat = parseJob(json.loads(self.rfile.read(length)))
+        except (ValueError, ValidationJobError) as error:  # JSON decoding errors are ValueErrors
+            self.sendJSON(400, {"Error": str(error)})
+            return
+        try:
+            report = self.server.runJob(fastaPath, bedPaths, options)
+        except Exception as error:  # A job that breaks should not take the server down with it
+            traceback.print_exc()
+            self.sendJSON(500, {"Error": "%s: %s" %(type(error).__name__, error)})
+            return
+        self.send_response(200)
+        if outputFormat == "ndjson":
+            self.send_header("Content-Type", "application/x-ndjson")
+        else:
+            self.send_header("Content-Type", "application/json")
+        self.end_headers()
+        outputFile = io.TextIOWrapper(self.wfile, encoding="utf-8")  # The connection closes after the response, so no length is needed
+        if outputFormat == "ndjson":
+            report.writeNDJSON(outputFile)
+        else:
+            report.writeJSON(outputFile)
+        outputFile.flush()
+        outputFile.detach()
+
+    def sendJSON(self, status:int, value:dict) -> None:
+        body = json.dumps(value, indent=2).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class ValidationServer(http.server.ThreadingHTTPServer):
+    """HTTP server that runs validation jobs against references it keeps in memory. Each job gets its own report, and jobs run in their own
+    threads so a long job does not hold up short ones. Requests must carry the token, which is made up when the server starts unless one is
+    given."""
+
+    daemon_threads = True
+
+    def __init__(self, port:int=DEFAULTPORT, referenceStore:validations.ReferenceStore=None, defaultOptions:dict=None, token:str=None):
+        super().__init__((DEFAULTHOST, port), ValidationRequestHandler)
+        if not token:
+            token = secrets.token_urlsafe(24)
+        self.token = token
+        if referenceStore is None:
+            referenceStore = validations.ReferenceStore()
+        self.referenceStore = referenceStore
+        if defaultOptions is None:
+            defaultOptions = {}
+        self.defaultOptions = defaultOptions
+        self.jobCount = 0
+        self.jobCountLock = threading.Lock()  # Jobs run in their own threads
+
+    def runJob(self, fastaPath:str, bedPaths:typing.List[str], options:dict) -> validationReport.ValidationReport:
+        with self.jobCountLock:
+            self.jobCount += 1
+        jobOptions = dict(self.defaultOptions, **options)
+        report = validationReport.ValidationReport(validations.REPORTNAME)
+        return validations.generateValidationReport(fastaPath, *bedPaths, verbose=False, report=report, referenceStore=self.referenceStore, **jobOptions)
+
+    def loadReference(self, fastaPath:str) -> validationReport.ValidationReport:
+        """Prepares a reference ahead of the first job that needs it. Returns a report with any problems found while preparing it."""
+        report = validationReport.ValidationReport(validations.REPORTNAME)
+        if not os.path.isfile(fastaPath):
+            report.addCritical("Unable to find FASTA file at %s" %fastaPath)
+            return report
+        self.referenceStore.get(fastaPath, report, backend=self.defaultOptions.get("backend", "auto"),
+                                needStatistics=self.defaultOptions.get("checkFastaContent", False),
+                                writeIndex=self.defaultOptions.get("writeIndex", False))
+        return report
+
+
+def makeServer(port:int=DEFAULTPORT, fastaPaths:typing.Iterable[str]=(), useCache:bool=True, cacheDirectory:str=referenceCache.DEFAULTCACHEDIRECTORY,
+               cacheSizeLimit:int=None, referenceLimit:int=validations.DEFAULTREFERENCELIMIT,
+               cacheBEDTables:bool=False, token:str=None, **defaultOptions) -> ValidationServer:
+    """Makes a server with the given FASTA files already loaded and a new token unless one is given. Other options (see runValidations) are
+    the defaults for every job."""
+    if useCache:
+        cache = referenceCache.ReferenceCache(cacheDirectory, cacheSizeLimit, cacheBEDTables)
+        print("Caching analyses in %s (use --no-cache to turn this off)" %cache.directory)
+    else:
+        cache = None
+    server = ValidationServer(port, validations.ReferenceStore(referenceLimit, cache), defaultOptions, token)
+    for fastaPath in fastaPaths:
+        report = server.loadReference(fastaPath)
+        for criticalError in report.criticalList:
+            print("ERROR: %s" %criticalError)
+        if report.noErrors:
+            print("Loaded reference %s" %fastaPath)
+    return server
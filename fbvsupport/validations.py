@@ -1,48 +1,79 @@
 import typing
-import re
+import array
+import functools
+import operator
 import os
+import itertools
+import threading
+import collections
+import concurrent.futures
 
 import fbvsupport.fastaAnalysis
 from . import faidxReader
 from . import fastaDictReader
+from . import bedBlocks
+from . import bgzf
 from . import bedReader
+from . import bedTable
+from . import contigBoundsChecker
+from . import duplicateKeys
+from . import errorCollection
+from . import intervalIndex
 from . import samtoolsRunner
+from . import sequenceFetcher
+from . import referenceCache
+from . import sequenceStatistics
+from . import slottedDataClass
+from . import stageTimer
 from . import validationReport
 from . import versionInfo
 
 
 bedReader.VALIDATIONRUN = True
 
-_WHITESPACEREGEX = re.compile("\s")
-_VALIDATIONREPORT = validationReport.ValidationReport("FASTA and BED Validation")
+_WHITESPACEDELETIONTABLE = str.maketrans(dict.fromkeys(character for character in map(chr, range(0x3001)) if character.isspace()))  # U+3000 is the last whitespace character
+_deleteWhitespace = operator.methodcaller("translate", _WHITESPACEDELETIONTABLE)
+_SIMPLIFIEDNAMECACHESIZE = 2 ** 16
+_NAMESEPARATOR = "\x00"
+_UNKNOWNCONTIG = "Unknown contig"
+_OUTOFBOUNDS = "Interval out of contig bounds"
+REPORTNAME = "FASTA and BED Validation"
+_WORKERCONTIGLENGTHTABLE = None
+DEFAULTREFERENCELIMIT = 8
+BACKENDS = ("auto", "samtools", "builtin")
+DEFAULTGCRANGE = (0.2, 0.8)
+DEFAULTMAXSOFTMASKED = 0.5
+
+
+countOccurrences = duplicateKeys.countOccurrences
+collisionsFromCounts = duplicateKeys.collisionsFromCounts
 
 
 def detectCollisionsInList(inputList:list) -> dict:
-    occurrenceCounterDict = {}
-    for item in inputList:
-        if not item in occurrenceCounterDict:
-            occurrenceCounterDict[item] = 0
-        occurrenceCounterDict[item] +=1
-    collisions = {}
-    for key, count in occurrenceCounterDict.items():
-        if count > 1:
-            collisions[key] = count
-    return collisions
+    return collisionsFromCounts(countOccurrences(inputList))
 
 
+@functools.lru_cache(maxsize=_SIMPLIFIEDNAMECACHESIZE)
 def simplifyName(name:str) -> str:
-    name = name.lower()
-    name = re.sub(_WHITESPACEREGEX, "", name)
-    return name
+    return name.lower().translate(_WHITESPACEDELETIONTABLE)
+
+
+def simplifyNames(names:typing.Iterable[str]) -> typing.List[str]:
+    """Simplifies a whole column of names at once by joining them into one string, lowering and translating that and splitting it again.
+    This skips the cache, since a column mostly holds names that have not been seen before."""
+    names = names if isinstance(names, list) else list(names)
+    if not names:
+        return []
+    joinedNames = _NAMESEPARATOR.join(names)
+    if not joinedNames.isascii() or joinedNames.count(_NAMESEPARATOR) != len(names) - 1:  # Non-ASCII lower() can depend on the letters around it
+        return list(map(_deleteWhitespace, map(str.lower, names)))
+    return joinedNames.lower().translate(_WHITESPACEDELETIONTABLE).split(_NAMESEPARATOR)
 
 
 def makeNamingErrorList(faidxData:typing.List[faidxReader.FastaIndexLine]) -> list:
     namingErrorList = []
-    rawNames = []
-    collapsedNames = []
-    for faidxLine in faidxData:
-        rawNames.append(faidxLine.contig)
-        collapsedNames.append(simplifyName(faidxLine.contig))
+    rawNames = [faidxLine.contig for faidxLine in faidxData]
+    collapsedNames = simplifyNames(rawNames)
     rawNameCollisions = detectCollisionsInList(rawNames)
     collapsedNameCollisions = detectCollisionsInList(collapsedNames)
     for name, count in rawNameCollisions.items():
@@ -70,62 +101,91 @@ def checkForDuplicateContigs(fastaDictList:typing.List[fastaDictReader.FastaDict
     return errorList
 
 
-def checkForDuplicateBEDIntervalNames(bedList:typing.List[bedReader.BEDLine]):
-    duplicatedNameList = []
-    rawNameList = []
-    simplifiedNameList = []
-    for bedLine in bedList:
-        rawNameList.append(bedLine.nameOrElse)
-        simplifiedNameList.append(simplifyName(bedLine.nameOrElse))
-    rawNameCollisions = detectCollisionsInList(rawNameList)
-    collapsedNameCollisions = detectCollisionsInList(simplifiedNameList)
+def makeSequenceStatisticsWarnings(statisticsList:typing.List[sequenceStatistics.ContigStatistics]) -> list:
+    warningList = []
+    for contigStatistics in statisticsList:
+        contig = contigStatistics.contig
+        if contigStatistics.invalidCount:
+            warningList.append("Contig %s contains %s characters that are not IUPAC nucleotide codes" %(contig, contigStatistics.invalidCount))
+        if contigStatistics.ambiguityCount:
+            warningList.append("Contig %s contains %s IUPAC ambiguity codes other than N" %(contig, contigStatistics.ambiguityCount))
+        if contigStatistics.baseLength and contigStatistics.nCount == contigStatistics.baseLength:
+            warningList.append("Contig %s is made up entirely of N bases" %contig)
+        elif contigStatistics.baseLength and contigStatistics.softMaskedCount == contigStatistics.baseLength:
+            warningList.append("Contig %s is entirely lower case (soft-masked)" %contig)
+    return warningList
+
+
+def makeDuplicateBEDIntervalNameErrors(rawNameCollisions:dict, collapsedNameCollisions:dict,
+                                       errors:errorCollection.ErrorCollection=None) -> errorCollection.ErrorCollection:
+    if errors is None:
+        errors = errorCollection.ErrorCollection()
     for name, count in rawNameCollisions.items():
-        error = "Detected %s BED intervals with the name %s" % (count, name)
-        duplicatedNameList.append(error)
+        errors.add("Duplicated interval name", "Detected %s BED intervals with the name %s", count, name)
     for name, count in collapsedNameCollisions.items():
-        error = "Detected %s BED intervals with names similar to %s" % (count, name)
-        duplicatedNameList.append(error)
-    return duplicatedNameList
+        errors.add("Similar interval names", "Detected %s BED intervals with names similar to %s", count, name)
+    return errors
 
 
-def checkForDuplicatedIntervals(bedList:typing.List[bedReader.BEDLine]):
-    errorList = []
-    intervalList = []
-    for bedLine in bedList:
-        interval = (
-            bedLine.contig,
-            bedLine.interval.start,
-            bedLine.interval.end
-        )
-        intervalList.append(interval)
-    duplicateIntervals = detectCollisionsInList(intervalList)
-    for interval, count in duplicateIntervals.items():
-        contig, start, stop = interval
-        error = "Detected the interval %s:%s-%s used %s times in the BED file." %(contig, start, stop, count)
-        errorList.append(error)
-    return errorList
+def checkForDuplicateBEDIntervalNames(bedList:[bedTable.BEDTable, typing.List[bedReader.BEDLine]],
+                                      errors:errorCollection.ErrorCollection=None) -> errorCollection.ErrorCollection:
+    bedList = bedTable.asBEDTable(bedList)
+    rawNameHashes = duplicateKeys.hashStrings(bedList.namesOrElse())
+    simplifiedNameHashes = duplicateKeys.hashStrings(simplifyNames(bedList.namesOrElse()))
+    rawNameCollisions, collapsedNameCollisions = duplicateKeys.findNameCollisions([bedList], rawNameHashes, simplifiedNameHashes, simplifyName)
+    return makeDuplicateBEDIntervalNameErrors(rawNameCollisions, collapsedNameCollisions, errors)
 
 
-def crosscheckBEDFile(bedList:typing.List[bedReader.BEDLine],
-                      faidxData:typing.List[faidxReader.FastaIndexLine]) -> list:
-    errorList = []
-    contigLengthTable = {}
-    for line in faidxData:
-        contigLengthTable[line.contig] = line.baseLength
-    for line in bedList:
-        if not line.contig in contigLengthTable:
-            error = "BED line %s tried to reference contig %s which does not exist in the FASTA file." %(line.name, line.contig)
-            errorList.append(error)
-            continue
-        if line.interval.lastIncludedBase > contigLengthTable[line.contig]:
-            error = "BED line %s is trying to read interval %s which is out of its contig's bounds" %(line.name, line.interval)
-            errorList.append(error)
-    return errorList
+def makeDuplicatedIntervalErrors(duplicateIntervals:dict, contigs:bedTable.StringTable,
+                                 errors:errorCollection.ErrorCollection=None) -> errorCollection.ErrorCollection:
+    if errors is None:
+        errors = errorCollection.ErrorCollection()
+    category = "Duplicated interval"
+    shownIntervals = itertools.islice(duplicateIntervals.items(), errors.room(category))  # The rest are only counted, so their contigs are not decoded
+    shownCount = 0
+    for (contigCode, start, stop), count in shownIntervals:
+        errors.add(category, "Detected the interval %s:%s-%s used %s times in the BED file.", contigs.decode(contigCode), start, stop, count)
+        shownCount += 1
+    errors.count(category, len(duplicateIntervals) - shownCount)
+    return errors
 
 
-def prependFileNameToErrorLines(fileName:str, errorList:typing.List[str]) -> typing.List[str]:
+def checkForDuplicatedIntervals(bedList:[bedTable.BEDTable, typing.List[bedReader.BEDLine]],
+                                errors:errorCollection.ErrorCollection=None) -> errorCollection.ErrorCollection:
+    bedList = bedTable.asBEDTable(bedList)
+    duplicateIntervals = duplicateKeys.findIntervalCollisions(bedList.contigCodes, bedList.starts, bedList.ends)
+    return makeDuplicatedIntervalErrors(duplicateIntervals, bedList.contigs, errors)
+
+
+def crosscheckBEDFile(bedList:[bedTable.BEDTable, typing.List[bedReader.BEDLine]],
+                      faidxData:[contigBoundsChecker.ContigLengthTable, typing.List[faidxReader.FastaIndexLine]],
+                      errors:errorCollection.ErrorCollection=None) -> errorCollection.ErrorCollection:
+    """Errors for rows on contigs missing from the FASTA or out of their contig's bounds. Rows past the example limit of their category are
+    only counted, so their names and intervals are never looked up."""
+    bedList = bedTable.asBEDTable(bedList)
+    contigLengthTable = contigBoundsChecker.asContigLengthTable(faidxData)
+    if errors is None:
+        errors = errorCollection.ErrorCollection()
+    crosscheckResult = contigBoundsChecker.crosscheckBEDTable(bedList, contigLengthTable)
+    shownRows = {}
+    for category, rows in ((_UNKNOWNCONTIG, crosscheckResult.unknownContigRows), (_OUTOFBOUNDS, crosscheckResult.outOfBoundsRows)):
+        room = errors.room(category)
+        shown = rows if room is None else rows[:room]
+        shownRows.update(dict.fromkeys(shown, category))
+        errors.count(category, len(rows) - len(shown))
+    for index in sorted(shownRows):
+        if shownRows[index] == _UNKNOWNCONTIG:
+            errors.add(_UNKNOWNCONTIG, "BED line %s tried to reference contig %s which does not exist in the FASTA file.", bedList.name(index), bedList.contig(index))
+        else:
+            errors.add(_OUTOFBOUNDS, "BED line %s is trying to read interval %s which is out of its contig's bounds", bedList.name(index), bedList.intervalString(index))
+    return errors
+
+
+def prependFileNameToErrorLines(fileName:str, errorList:[typing.List[str], errorCollection.ErrorCollection]) -> [typing.List[str], errorCollection.ErrorCollection]:
     if not errorList:
         return errorList
+    if isinstance(errorList, errorCollection.ErrorCollection):
+        return errorList.withPrefix(fileName + ": ")
     errorList = [fileName + ": " + error for error in errorList]
     return errorList
 
@@ -155,70 +215,596 @@ def validateFASTA(faidx:typing.List[faidxReader.FastaIndexLine], fastaDict:typin
     return errorList
 
 
-def validateBED(bedList:typing.List[bedReader.BEDLine]) -> list:
-    errorList = []
-    for lineNumber, line in enumerate(bedList):
-        if line.errors:
-            for error in line.errors:
-                errorMessage = "Line %s: %s" %(lineNumber + 1, error)
-                errorList.append(errorMessage)
-    duplicateIntervalNames = checkForDuplicateBEDIntervalNames(bedList)
-    duplicateIntervals = checkForDuplicatedIntervals(bedList)
-    errorList += duplicateIntervalNames
-    errorList += duplicateIntervals
-    return errorList
+def makeBEDLineErrorList(bedList:bedTable.BEDTable, errors:errorCollection.ErrorCollection=None) -> errorCollection.ErrorCollection:
+    if errors is None:
+        errors = errorCollection.ErrorCollection()
+    errors.extend(bedList.lineErrors)
+    return errors
 
 
-def generateValidationReport(fastaPath:str, *bedPaths:str, verbose:bool=True) -> validationReport.ValidationReport:
-    print("Tecan Genomics FASTA and BED cross validator | Version: %s | Date: %s" % (versionInfo.VERSION, versionInfo.DATE))
-    _VALIDATIONREPORT.addInput("FASTA", fastaPath)
-    for bedPath in bedPaths:
-        _VALIDATIONREPORT.addInput("BED", bedPath)
-    if not os.path.isfile(fastaPath):
-        _VALIDATIONREPORT.addCritical("Unable to find FASTA file at %s" %fastaPath)
-    for bedPath in bedPaths:
-        if not os.path.isfile(bedPath):
-            _VALIDATIONREPORT.addCritical("Unable to find BED file at %s" %bedPath)
-    if not _VALIDATIONREPORT.passed:
-        _VALIDATIONREPORT.addCritical("Stopping before further analysis due to the absence of expected files")
-        return _VALIDATIONREPORT
-    if samtoolsRunner._SAMTOOLSPATH:
+def makeBEDBlockErrorList(bedList:bedTable.BEDTable, errors:errorCollection.ErrorCollection=None) -> errorCollection.ErrorCollection:
+    if errors is None:
+        errors = errorCollection.ErrorCollection()
+    for lineNumber, category, template, args in bedBlocks.findBlockErrors(bedList):
+        errors.add(category, "Line %s: " + template, bedList.firstRow + lineNumber + 1, *args)
+    return errors
+
+
+def validateBED(bedList:[bedTable.BEDTable, typing.List[bedReader.BEDLine]], maxExamples:int=None) -> errorCollection.ErrorCollection:
+    """Errors found in the BED lines themselves, keeping at most maxExamples (or all if None) of each kind of error"""
+    bedList = bedTable.asBEDTable(bedList)
+    errors = errorCollection.ErrorCollection(maxExamples)
+    makeBEDLineErrorList(bedList, errors)
+    makeBEDBlockErrorList(bedList, errors)
+    checkForDuplicateBEDIntervalNames(bedList, errors)
+    checkForDuplicatedIntervals(bedList, errors)
+    return errors
+
+
+def makeOverlapWarnings(overlaps:typing.List[typing.Tuple[int, str, int, int, bool]], maxExamples:int=None) -> errorCollection.ErrorCollection:
+    warnings = errorCollection.ErrorCollection(maxExamples)
+    for row, contig, start, end, nested in overlaps:
+        if nested:
+            warnings.add("Nested interval", "Line %s: interval %s:%s-%s is nested inside another interval", row + 1, contig, start, end)
+        else:
+            warnings.add("Overlapping interval", "Line %s: interval %s:%s-%s overlaps another interval", row + 1, contig, start, end)
+    return warnings
+
+
+def checkIntervalOverlaps(index:intervalIndex.IntervalIndex, maxExamples:int=None) -> typing.Tuple[errorCollection.ErrorCollection, dict]:
+    """Returns (overlap warnings, interval statistics) for the intervals of one BED file"""
+    overlaps = index.findOverlaps()
+    statistics = {
+        "Indexed intervals": len(index),
+        "Overlapping intervals": len(overlaps),
+        "Nested intervals": sum(nested for row, contig, start, end, nested in overlaps),
+        "Merged footprint (bp)": index.footprint()
+    }
+    return makeOverlapWarnings(overlaps, maxExamples), statistics
+
+
+def parseGCRange(gcRange:str) -> typing.Tuple[float, float]:
+    """Takes a range like 0.2,0.8 (or 20,80 as percentages) and returns it as fractions"""
+    bounds = [float(bound) for bound in gcRange.split(",")]
+    if len(bounds) != 2:
+        raise ValueError("A GC range needs a minimum and a maximum separated by a comma")
+    if max(bounds) > 1:
+        bounds = [bound / 100 for bound in bounds]
+    minimum, maximum = bounds
+    if not 0 <= minimum <= maximum <= 1:
+        raise ValueError("A GC range needs a minimum no larger than its maximum, both between 0 and 1")
+    return minimum, maximum
+
+
+def makeSequenceWarnings(findings:typing.List[typing.Tuple[int, str, int, int, str, float]], gcRange:typing.Tuple[float, float],
+                         maxExamples:int=None) -> errorCollection.ErrorCollection:
+    warnings = errorCollection.ErrorCollection(maxExamples)
+    for row, contig, start, end, category, fraction in findings:
+        if category == "Interval entirely N":
+            warnings.add(category, "Line %s: interval %s:%s-%s is made up entirely of N bases", row + 1, contig, start, end)
+        elif category == "Mostly soft-masked interval":
+            warnings.add(category, "Line %s: interval %s:%s-%s is %.1f%% soft-masked (lower case)", row + 1, contig, start, end, fraction * 100)
+        else:
+            warnings.add(category, "Line %s: interval %s:%s-%s has %.1f%% GC, outside the expected %.1f%% to %.1f%%", row + 1, contig, start, end,
+                         fraction * 100, gcRange[0] * 100, gcRange[1] * 100)
+    return warnings
+
+
+def checkIntervalSequences(index:intervalIndex.IntervalIndex, fetcher:sequenceFetcher.SequenceFetcher, gcRange:typing.Tuple[float, float]=DEFAULTGCRANGE,
+                           maxSoftMasked:float=DEFAULTMAXSOFTMASKED, maxExamples:int=None) -> typing.Tuple[errorCollection.ErrorCollection, dict]:
+    """Returns (sequence warnings, sequence statistics) for the intervals of one BED file: intervals that are all N, intervals more than
+    maxSoftMasked soft-masked and intervals with a GC fraction (of their A, C, G and T bases) outside gcRange. The intervals of each contig
+    are fetched in start order from the index, so the reference is read in one forward pass per contig."""
+    minimumGC, maximumGC = gcRange
+    findings = []
+    checkedBases = 0
+    for contig, contigIntervals in index.contigs.items():
+        if contig not in fetcher:  # Intervals on contigs missing from the FASTA already have crosscheck errors
+            continue
+        sequences = fetcher.fetchSorted(contig, contigIntervals.starts, contigIntervals.ends)
+        for row, start, end, sequence in zip(contigIntervals.rows, contigIntervals.starts, contigIntervals.ends, sequences):
+            length = len(sequence)
+            if not length:
+                continue
+            checkedBases += length
+            gcCount, atCount, nCount, softMaskedCount = sequenceStatistics.baseComposition(sequence)
+            if nCount == length:
+                findings.append((row, contig, start, end, "Interval entirely N", 1.0))
+                continue
+            if softMaskedCount > maxSoftMasked * length:
+                findings.append((row, contig, start, end, "Mostly soft-masked interval", softMaskedCount / length))
+            if gcCount + atCount:
+                gcFraction = gcCount / (gcCount + atCount)
+                if not minimumGC <= gcFraction <= maximumGC:
+                    findings.append((row, contig, start, end, "GC out of range", gcFraction))
+    findings.sort(key=operator.itemgetter(0))
+    statistics = {
+        "Sequence checked (bp)": checkedBases,
+        "Intervals entirely N": sum(finding[4] == "Interval entirely N" for finding in findings),
+        "Mostly soft-masked intervals": sum(finding[4] == "Mostly soft-masked interval" for finding in findings),
+        "Intervals with GC out of range": sum(finding[4] == "GC out of range" for finding in findings)
+    }
+    return makeSequenceWarnings(findings, gcRange, maxExamples), statistics
+
+
+def openSequenceFetcher(fastaPath:str, reference:"PreparedReference",
+                        report:validationReport.ValidationReport) -> typing.Optional[sequenceFetcher.SequenceFetcher]:
+    """Returns None after adding a warning to the report if the sequence of the FASTA cannot be read at random"""
+    try:
+        return sequenceFetcher.SequenceFetcher(fastaPath, reference.faidx)
+    except (sequenceFetcher.SequenceFetchError, bgzf.BGZFError, OSError) as error:
+        report.addWarning("Unable to check the sequence of BED intervals: %s" %error)
+        return None
+
+
+def makeBEDComparisonWarnings(targetPath:str, baitPath:str, comparison:intervalIndex.IntervalComparison,
+                              maxExamples:int=None) -> typing.Tuple[errorCollection.ErrorCollection, errorCollection.ErrorCollection]:
+    """Returns (warnings about the target BED, warnings about the bait BED)"""
+    targetWarnings = errorCollection.ErrorCollection(maxExamples)
+    baitWarnings = errorCollection.ErrorCollection(maxExamples)
+    for row, contig, start, end in comparison.uncoveredTargets:
+        targetWarnings.add("Target not covered", "Line %s: target %s:%s-%s is not covered by any interval in %s", row + 1, contig, start, end, baitPath)
+    for row, contig, start, end in comparison.baitsOutsideTargets:
+        baitWarnings.add("Interval outside targets", "Line %s: interval %s:%s-%s does not overlap any target in %s", row + 1, contig, start, end, targetPath)
+    return targetWarnings, baitWarnings
+
+
+def compareBEDFiles(targetPath:str, targetIndex:intervalIndex.IntervalIndex, baitPath:str, baitIndex:intervalIndex.IntervalIndex,
+                    report:validationReport.ValidationReport, maxExamples:int=None) -> None:
+    comparison = intervalIndex.compareIntervalIndexes(targetIndex, baitIndex)
+    targetWarnings, baitWarnings = makeBEDComparisonWarnings(targetPath, baitPath, comparison, maxExamples)
+    report.addWarnings(prependFileNameToErrorLines(targetPath, targetWarnings))
+    report.addWarnings(prependFileNameToErrorLines(baitPath, baitWarnings))
+    report.addStatistics("%s compared with targets in %s" %(baitPath, targetPath), comparison.statistics)
+
+
+def validateBEDStream(bedPath:str, contigLengthTable:contigBoundsChecker.ContigLengthTable, chunkSize:int=bedTable.DEFAULTCHUNKSIZE,
+                      buildIntervalIndex:bool=False, timer:stageTimer.StageTimer=stageTimer.DISABLEDTIMER,
+                      maxExamples:int=None) -> typing.Tuple[errorCollection.ErrorCollection, errorCollection.ErrorCollection, typing.Optional[intervalIndex.IntervalIndex]]:
+    """Streaming equivalent of running validateBED and crosscheckBEDFile on a whole file. Rows are read and checked a chunk at a time,
+    and only fixed width keys for the names and intervals are carried between chunks (plus the rows if an interval index is wanted).
+    The file is only read a second time if two names share a hash, to find out which names they are. Returns (BED errors, crosscheck
+    errors, interval index or None)."""
+    errors = errorCollection.ErrorCollection(maxExamples)
+    blockErrors = errorCollection.ErrorCollection(maxExamples)
+    crosscheckErrors = errorCollection.ErrorCollection(maxExamples)
+    rawNameHashes = array.array("q")
+    simplifiedNameHashes = array.array("q")
+    intervalColumns = (array.array("i"), array.array("q"), array.array("q"))
+    contigs = bedTable.StringTable()
+    indexColumns = (array.array("q"), array.array("q"), array.array("q"), array.array("q"))
+    readingStage = timer.record("Read BED file %s" %bedPath)
+    readingStage.addBytes(os.path.getsize(bedPath))
+    for chunk in timer.iterate(readingStage.name, bedTable.iterateBEDFile(bedPath, chunkSize, maxExamples=maxExamples)):
+        readingStage.addRows(len(chunk))
+        with timer.stage("Validate BED lines in %s" %bedPath) as validationStage:
+            makeBEDLineErrorList(chunk, errors)
+            makeBEDBlockErrorList(chunk, blockErrors)
+            validationStage.addRows(len(chunk))
+        with timer.stage("Crosscheck BED file %s" %bedPath) as crosscheckStage:
+            crosscheckBEDFile(chunk, contigLengthTable, crosscheckErrors)
+            crosscheckStage.addRows(len(chunk))
+        with timer.stage("Collect BED names and intervals in %s" %bedPath):
+            rawNameHashes.extend(duplicateKeys.hashStrings(chunk.namesOrElse()))
+            simplifiedNameHashes.extend(duplicateKeys.hashStrings(simplifyNames(chunk.namesOrElse())))
+            contigCodes = [contigs.encode(contig) for contig in chunk.contigs.strings]  # Chunk contig codes are local to the chunk
+            intervalColumns[0].extend(map(contigCodes.__getitem__, chunk.contigCodes))
+            intervalColumns[1].extend(chunk.starts)
+            intervalColumns[2].extend(chunk.ends)
+        if buildIntervalIndex:
+            with timer.stage("Build interval index for %s" %bedPath):
+                chunkIndex = intervalIndex.IntervalIndex.fromBEDTable(chunk, contigLengthTable)  # Drops rows the same way a whole file index would
+                for contig, contigIntervals in chunkIndex.contigs.items():
+                    indexColumns[0].extend(itertools.repeat(contigs.encode(contig), len(contigIntervals)))
+                    indexColumns[1].extend(contigIntervals.starts)
+                    indexColumns[2].extend(contigIntervals.ends)
+                    indexColumns[3].extend(contigIntervals.rows)
+    errors.extend(blockErrors)
+    with timer.stage("Find duplicate BED names in %s" %bedPath):
+        rawNameCollisions, collapsedNameCollisions = duplicateKeys.findNameCollisions(bedTable.iterateBEDFile(bedPath, chunkSize), rawNameHashes, simplifiedNameHashes, simplifyName)
+        makeDuplicateBEDIntervalNameErrors(rawNameCollisions, collapsedNameCollisions, errors)
+    with timer.stage("Find duplicate BED intervals in %s" %bedPath):
+        makeDuplicatedIntervalErrors(duplicateKeys.findIntervalCollisions(*intervalColumns), contigs, errors)
+    if not buildIntervalIndex:
+        return errors, crosscheckErrors, None
+    with timer.stage("Build interval index for %s" %bedPath):
+        bedIntervalIndex = intervalIndex.IntervalIndex.fromColumns(contigs.strings, *indexColumns)
+    return errors, crosscheckErrors, bedIntervalIndex
+
+
+def keepsLineErrorExamples(bedList:bedTable.BEDTable, maxExamples:int=None) -> bool:
+    """True if the table kept at least maxExamples of each kind of line error (all of them if None)"""
+    keptExamples = bedList.lineErrors.maxExamples
+    return keptExamples is None or (maxExamples is not None and maxExamples <= keptExamples)
+
+
+def validateBEDFile(bedPath:str, contigLengthTable:contigBoundsChecker.ContigLengthTable, streaming:bool=False, buildIntervalIndex:bool=False,
+                    timer:stageTimer.StageTimer=stageTimer.DISABLEDTIMER, maxExamples:int=None,
+                    cache:referenceCache.ReferenceCache=None) -> typing.Tuple[str, errorCollection.ErrorCollection, errorCollection.ErrorCollection, typing.Optional[intervalIndex.IntervalIndex]]:
+    """Reads and validates one BED file, keeping at most maxExamples (or all if None) of each kind of error. Returns (reading failure message,
+    BED errors, crosscheck errors, interval index) where the failure message is empty if the file could be read and the interval index is
+    None unless one was asked for. With a cache, the findings for an unchanged BED file checked against the same contigs are read back from
+    it, and otherwise the parsed file is read from the cache instead of being parsed again if it is stored there."""
+    fingerprint = None
+    findings = None
+    bedLines = None
+    if cache is not None:
+        with timer.stage("Load cached BED data for %s" %bedPath):
+            fingerprint, findings = cache.loadBEDFindings(bedPath)
+            if not isinstance(findings, dict) or findings.get("maxExamples") != maxExamples or findings.get("contigs") != contigLengthTable.fingerprint():
+                findings = None
+            if fingerprint is not None and (buildIntervalIndex if findings else not streaming):  # Streaming runs never hold the whole table
+                bedLines = cache.loadBEDTable(bedPath, fingerprint)
+            if bedLines is not None and not findings and not keepsLineErrorExamples(bedLines, maxExamples):
+                bedLines = None  # Stored by a run that kept fewer examples of its line errors
+    if findings and (bedLines is not None or not buildIntervalIndex):
+        bedIntervalIndex = None
+        if buildIntervalIndex:
+            with timer.stage("Build interval index for %s" %bedPath):
+                bedIntervalIndex = intervalIndex.IntervalIndex.fromBEDTable(bedLines, contigLengthTable)
+        return "", errorCollection.ErrorCollection.fromDict(findings["errors"]), errorCollection.ErrorCollection.fromDict(findings["crosscheckErrors"]), bedIntervalIndex
+    try:
+        if streaming and bedLines is None:
+            bedFileErrors, bedFileCrosscheckErrors, bedIntervalIndex = validateBEDStream(bedPath, contigLengthTable, buildIntervalIndex=buildIntervalIndex, timer=timer, maxExamples=maxExamples)
+        else:
+            if bedLines is None:
+                with timer.stage("Read BED file %s" %bedPath) as readingStage:
+                    bedLines = bedTable.readBEDFile(bedPath, maxExamples=maxExamples)
+                    readingStage.addRows(len(bedLines))
+                    readingStage.addBytes(os.path.getsize(bedPath))
+            with timer.stage("Validate BED lines in %s" %bedPath) as validationStage:
+                bedFileErrors = validateBED(bedLines, maxExamples)
+                validationStage.addRows(len(bedLines))
+            with timer.stage("Crosscheck BED file %s" %bedPath) as crosscheckStage:
+                bedFileCrosscheckErrors = crosscheckBEDFile(bedLines, contigLengthTable, errorCollection.ErrorCollection(maxExamples))
+                crosscheckStage.addRows(len(bedLines))
+            bedIntervalIndex = None
+            if buildIntervalIndex:
+                with timer.stage("Build interval index for %s" %bedPath):
+                    bedIntervalIndex = intervalIndex.IntervalIndex.fromBEDTable(bedLines, contigLengthTable)
+    except bedReader.BEDLineError as error:
+        return "%s reading failed: %s" %(bedPath, error), errorCollection.ErrorCollection(maxExamples), errorCollection.ErrorCollection(maxExamples), None
+    if fingerprint is not None:
+        with timer.stage("Store BED data in the cache for %s" %bedPath):
+            findings = {"maxExamples": maxExamples, "contigs": contigLengthTable.fingerprint(), "errors": bedFileErrors.toDict(),
+                        "crosscheckErrors": bedFileCrosscheckErrors.toDict()}
+            cache.storeBED(bedPath, fingerprint, bedLines, findings)  # Streaming runs only store the findings, since the whole file was never in memory
+    return "", bedFileErrors, bedFileCrosscheckErrors, bedIntervalIndex
+
+
+def _initializeBEDWorker(contigLengthTable:contigBoundsChecker.ContigLengthTable) -> None:
+    global _WORKERCONTIGLENGTHTABLE
+    _WORKERCONTIGLENGTHTABLE = contigLengthTable
+
+
+def _validateBEDFileInWorker(bedPath:str, streaming:bool, buildIntervalIndex:bool, instrument:bool, maxExamples:int,
+                             cache:referenceCache.ReferenceCache=None) -> typing.Tuple[typing.Tuple[str, errorCollection.ErrorCollection, errorCollection.ErrorCollection, typing.Optional[intervalIndex.IntervalIndex]], typing.List[stageTimer.StageRecord]]:
+    timer = stageTimer.StageTimer(enabled=instrument)
+    result = validateBEDFile(bedPath, _WORKERCONTIGLENGTHTABLE, streaming, buildIntervalIndex, timer, maxExamples, cache)
+    return result, list(timer.records.values())
+
+
+def makeBEDWorkerPool(contigLengthTable:contigBoundsChecker.ContigLengthTable, workers:int) -> "concurrent.futures.ProcessPoolExecutor":
+    """Pool of processes for _validateBEDFileInWorker, with the contig length table sent to each worker once when it starts rather than
+    with every file"""
+    return concurrent.futures.ProcessPoolExecutor(max_workers=workers, initializer=_initializeBEDWorker, initargs=(contigLengthTable,))
+
+
+def validateBEDFiles(bedPaths:typing.List[str], contigLengthTable:contigBoundsChecker.ContigLengthTable, streaming:bool=False, workers:int=1,
+                     buildIntervalIndex:bool=False, timer:stageTimer.StageTimer=stageTimer.DISABLEDTIMER, maxExamples:int=None,
+                     cache:referenceCache.ReferenceCache=None) -> typing.List[typing.Tuple[str, errorCollection.ErrorCollection, errorCollection.ErrorCollection, typing.Optional[intervalIndex.IntervalIndex]]]:
+    """Runs validateBEDFile for each path, spread over a pool of worker processes if more than one worker is requested. Results come back in
+    the same order as bedPaths."""
+    workers = min(workers, len(bedPaths))
+    if workers <= 1:
+        return [validateBEDFile(bedPath, contigLengthTable, streaming, buildIntervalIndex, timer, maxExamples, cache) for bedPath in bedPaths]
+    results = []
+    with makeBEDWorkerPool(contigLengthTable, workers) as executor:
+        workerResults = executor.map(_validateBEDFileInWorker, bedPaths, itertools.repeat(streaming), itertools.repeat(buildIntervalIndex),
+                                     itertools.repeat(timer.enabled), itertools.repeat(maxExamples), itertools.repeat(cache))
+        for result, records in workerResults:
+            timer.merge(records)  # Memory peaks from here on are those of the worker that ran the stage
+            results.append(result)
+    return results
+
+
+def parseBackend(backend:str) -> str:
+    backend = backend.lower()
+    if backend not in BACKENDS:
+        raise ValueError("FASTA analysis backend must be one of %s, but got %s" %(", ".join(BACKENDS), backend))
+    return backend
+
+
+def analyzeReferenceWithSamtools(fastaPath:str, report:validationReport.ValidationReport, verbose:bool=True,
+                                 timer:stageTimer.StageTimer=stageTimer.DISABLEDTIMER) -> [fbvsupport.fastaAnalysis.FastaAnalysis, None]:
+    with timer.stage("Samtools faidx %s" %fastaPath):
         faidxPath = makeFaidx(fastaPath)
-        if not faidxPath:
-            _VALIDATIONREPORT.addCritical("Unable to index FASTA file at %s" %fastaPath)
+    if not faidxPath:
+        report.addCritical("Unable to index FASTA file at %s" %fastaPath)
+    with timer.stage("Samtools dict %s" %fastaPath):
         fastaDictPath = makeFastaDictionary(fastaPath)
-        if not fastaDictPath:
-            _VALIDATIONREPORT.addCritical("Unable to make a dictionary from FASTA file at %s" %fastaPath)
-        if not _VALIDATIONREPORT.passed:
-            _VALIDATIONREPORT.addCritical("Stopping before further analysis due to a corrupt or unreadable FASTA file at %s" %fastaPath)
-            return _VALIDATIONREPORT
-        if verbose:
-            print("Initial processing of FASTA file was successful. Starting validations.")
+    if not fastaDictPath:
+        report.addCritical("Unable to make a dictionary from FASTA file at %s" %fastaPath)
+    if not report.passed:
+        report.addCritical("Stopping before further analysis due to a corrupt or unreadable FASTA file at %s" %fastaPath)
+        return None
+    if verbose:
+        print("Initial processing of FASTA file was successful. Starting validations.")
+    with timer.stage("Read FASTA index %s" %faidxPath) as readingStage:
         faidx = faidxReader.readFastaIndexFile(faidxPath)
+        readingStage.addRows(len(faidx))
+    with timer.stage("Read FASTA dictionary %s" %fastaDictPath) as readingStage:
         fastaDict = fastaDictReader.readFastaDictFile(fastaDictPath)
+        readingStage.addRows(len(fastaDict))
+    return faidx, fastaDict, None  # Samtools does not give sequence statistics
+
+
+def analyzeReferenceInProcess(fastaPath:str, report:validationReport.ValidationReport,
+                              timer:stageTimer.StageTimer=stageTimer.DISABLEDTIMER) -> [fbvsupport.fastaAnalysis.FastaAnalysis, None]:
+    try:
+        with timer.stage("Analyze FASTA file %s" %fastaPath) as analysisStage:
+            analysis = fbvsupport.fastaAnalysis.analyzeFastaWithStatistics(fastaPath)
+            analysisStage.addRows(len(analysis[0]))
+            analysisStage.addBytes(os.path.getsize(fastaPath))
+        return analysis
+    except Exception as err:
+        print("Error analyzing FASTA file at %s" %fastaPath)
+        print(err)
+        report.addCritical("Stopping before further analysis due to a corrupt or unanalyzable FASTA file at %s" %fastaPath)
+        return None
+
+
+def analyzeReference(fastaPath:str, report:validationReport.ValidationReport, verbose:bool=True, cache:referenceCache.ReferenceCache=None,
+                     backend:str="auto", timer:stageTimer.StageTimer=stageTimer.DISABLEDTIMER,
+                     needStatistics:bool=False, writeIndex:bool=False) -> [fbvsupport.fastaAnalysis.FastaAnalysis, None]:
+    """Gets the index, dictionary and sequence statistics for the FASTA from the cache or else from the chosen backend. "auto" uses Samtools
+    when it is installed and the builtin analysis (which gives the same index and dictionary) when it is not. Samtools gives no statistics,
+    so they are None when it is used, and with needStatistics "auto" uses the builtin analysis and only falls back on Samtools if that fails.
+    With writeIndex, the index and dictionary are also written next to the FASTA the way Samtools would write them. Returns None after
+    adding critical errors to the report if the FASTA could not be processed."""
+    backend = parseBackend(backend)
+    if cache:
+        with timer.stage("Load cached FASTA analysis"):
+            cachedData = cache.load(fastaPath)
+        if cachedData and (cachedData[2] is not None or not needStatistics or backend == "samtools"):
+            if verbose:
+                print("Using cached analysis of FASTA file at %s" %fastaPath)
+            if writeIndex:
+                writeIndexFiles(fastaPath, cachedData, timer)
+            return cachedData
+    if backend == "samtools" and not samtoolsRunner.getSamToolsPath():
+        report.addCritical("The Samtools backend was requested, but no Samtools executable could be found")
+        return None
+    if backend == "samtools" or (backend == "auto" and not needStatistics and samtoolsRunner.getSamToolsPath()):
+        referenceData = analyzeReferenceWithSamtools(fastaPath, report, verbose, timer)
+    elif backend == "auto":
+        if verbose and not needStatistics:
+            print("Unable to find local Samtools installation. Analyzing FASTA with local packages.")
+        fallbackReport = validationReport.ValidationReport(report.testName)
+        referenceData = analyzeReferenceInProcess(fastaPath, fallbackReport, timer)
+        if referenceData is None and samtoolsRunner.getSamToolsPath():  # Only looks for Samtools once it is needed
+            print("Analyzing FASTA with local packages failed. Trying again with Samtools.")
+            referenceData = analyzeReferenceWithSamtools(fastaPath, report, verbose, timer)
+        elif referenceData is None:
+            report.addCriticals(fallbackReport.criticalList)
     else:
-        print("Unable to find local Samtools installation. Analyzing FASTA with local packages.")
-        try:
-            faidx, fastaDict = fbvsupport.fastaAnalysis.analyzeFasta(fastaPath)
-        except Exception as err:
-            print("Error analyzing FASTA file at %s" %fastaPath)
-            print(err)
-            _VALIDATIONREPORT.addCritical("Stopping before further analysis due to a corrupt or unanalyzable FASTA file at %s" %fastaPath)
-            return _VALIDATIONREPORT
-    bedDict = {}
+        referenceData = analyzeReferenceInProcess(fastaPath, report, timer)
+    if referenceData is None:
+        return None
+    if writeIndex:
+        writeIndexFiles(fastaPath, referenceData, timer)
+    if cache:
+        with timer.stage("Store FASTA analysis in the cache"):
+            cache.store(fastaPath, *referenceData)
+    return referenceData
+
+
+def writeIndexFiles(fastaPath:str, referenceData:fbvsupport.fastaAnalysis.FastaAnalysis, timer:stageTimer.StageTimer=stageTimer.DISABLEDTIMER) -> None:
+    """Writes the .fai and .dict files (and the .gzi of a BGZF FASTA) for the analyzed FASTA next to it, unless they are already there"""
+    faidx, fastaDict, statistics = referenceData
+    try:
+        with timer.stage("Write FASTA index and dictionary for %s" %fastaPath):
+            fbvsupport.fastaAnalysis.writeIndexFiles(fastaPath, faidx=faidx, fastaDict=fastaDict)
+    except OSError as error:
+        print("WARNING: Unable to write the index and dictionary for %s: %s" %(fastaPath, error))
+
+
+@slottedDataClass.slottedDataClass(slots=True)
+class PreparedReference:
+    """Everything the validations need from a FASTA, which does not change from one set of BED files to the next. FASTA errors and warnings
+    are kept without the file name so that they can be reported under whatever path a later run gives for the same FASTA."""
+    faidx: typing.List[faidxReader.FastaIndexLine]
+    fastaDict: typing.List[fastaDictReader.FastaDictLine]
+    statistics: typing.Optional[typing.List[sequenceStatistics.ContigStatistics]]
+    contigLengthTable: contigBoundsChecker.ContigLengthTable
+    fastaErrors: typing.List[str]
+    fastaWarnings: typing.List[str]
+
+
+def prepareReference(fastaPath:str, report:validationReport.ValidationReport, verbose:bool=True, cache:referenceCache.ReferenceCache=None,
+                     backend:str="auto", timer:stageTimer.StageTimer=stageTimer.DISABLEDTIMER, needStatistics:bool=False,
+                     writeIndex:bool=False) -> [PreparedReference, None]:
+    """Analyzes (or loads the cached analysis of) the FASTA and validates it. The FASTA content warnings are only made when the analysis gave
+    sequence statistics (see analyzeReference). Returns None after adding critical errors to the report if the FASTA could not be processed."""
+    referenceData = analyzeReference(fastaPath, report, verbose=verbose, cache=cache, backend=backend, timer=timer, needStatistics=needStatistics,
+                                     writeIndex=writeIndex)
+    if referenceData is None:
+        return None
+    faidx, fastaDict, statistics = referenceData
+    with timer.stage("Validate FASTA %s" %fastaPath):
+        contigLengthTable = contigBoundsChecker.ContigLengthTable.fromFaidx(faidx)
+        fastaErrors = validateFASTA(faidx, fastaDict)
+        if statistics is not None:
+            fastaWarnings = makeSequenceStatisticsWarnings(statistics)
+        else:
+            fastaWarnings = []
+    return PreparedReference(faidx, fastaDict, statistics, contigLengthTable, fastaErrors, fastaWarnings)
+
+
+class ReferenceStore:
+    """Prepared references held in memory between runs (such as the jobs of a validation server), keyed on the FASTA's absolute path, size
+    and modification time so that a changed FASTA is prepared again. The least recently used reference is dropped once more than limit are
+    held. Runs that need a reference another run is still preparing wait for it instead of preparing it a second time."""
+
+    def __init__(self, limit:int=DEFAULTREFERENCELIMIT, cache:referenceCache.ReferenceCache=None):
+        self.limit = limit
+        self.cache = cache
+        self.references = collections.OrderedDict()
+        self.lock = threading.Lock()
+        self.preparing = {}
+
+    @staticmethod
+    def referenceKey(fastaPath:str, backend:str, needStatistics:bool=False) -> typing.Tuple[str, int, int, str, bool]:
+        absolutePath = os.path.abspath(fastaPath)
+        fileStats = os.stat(absolutePath)
+        return absolutePath, fileStats.st_size, fileStats.st_mtime_ns, parseBackend(backend), needStatistics
+
+    def fastaPaths(self) -> typing.List[str]:
+        with self.lock:
+            return [key[0] for key in self.references]
+
+    def get(self, fastaPath:str, report:validationReport.ValidationReport, backend:str="auto",
+            timer:stageTimer.StageTimer=stageTimer.DISABLEDTIMER, needStatistics:bool=False, writeIndex:bool=False) -> [PreparedReference, None]:
+        """Returns the prepared reference for the FASTA, preparing it first if it is not held already. Returns None after adding critical
+        errors to the report if the FASTA could not be processed, in which case the next run will try it again."""
+        key = self.referenceKey(fastaPath, backend, needStatistics)
+        with self.lock:
+            if key in self.references:
+                self.references.move_to_end(key)
+                return self.references[key]
+            keyLock = self.preparing.setdefault(key, threading.Lock())
+        with keyLock:
+            with self.lock:
+                if key in self.references:  # Prepared by another run while this one waited
+                    self.references.move_to_end(key)
+                    return self.references[key]
+            reference = prepareReference(fastaPath, report, verbose=False, cache=self.cache, backend=backend, timer=timer, needStatistics=needStatistics,
+                                         writeIndex=writeIndex)
+            with self.lock:
+                self.preparing.pop(key, None)
+                if reference is not None:
+                    self.references[key] = reference
+                    while len(self.references) > self.limit:
+                        self.references.popitem(last=False)
+        return reference
+
+
+def startReport(report:validationReport.ValidationReport, fastaPath:str, bedPaths:typing.Iterable[str]) -> bool:
+    """Adds the input files to the report and checks that they exist. Returns False after adding critical errors if any are missing."""
+    report.addInput("FASTA", fastaPath)
     for bedPath in bedPaths:
-        try:
-            bedDict[bedPath] = bedReader.readBEDFile(bedPath)
-        except bedReader.BEDLineError as error:
-            _VALIDATIONREPORT.addCritical("%s reading failed: %s" %(bedPath, error))
-    fastaErrors = validateFASTA(faidx, fastaDict)
-    fastaErrors = prependFileNameToErrorLines(fastaPath, fastaErrors)
-    _VALIDATIONREPORT.addErrors(fastaErrors)
-    for bedFilePath, bedLines in bedDict.items():
-        bedFileErrors = validateBED(bedLines)
-        bedFileCrosscheckErrors = crosscheckBEDFile(bedLines, faidx)
-        bedFileErrors = prependFileNameToErrorLines(bedFilePath, bedFileErrors)
-        bedFileCrosscheckErrors = prependFileNameToErrorLines(bedFilePath, bedFileCrosscheckErrors)
-        _VALIDATIONREPORT.addErrors(bedFileErrors)
-        _VALIDATIONREPORT.addErrors(bedFileCrosscheckErrors)
-    return _VALIDATIONREPORT
+        report.addInput("BED", bedPath)
+    if not os.path.isfile(fastaPath):
+        report.addCritical("Unable to find FASTA file at %s" %fastaPath)
+    for bedPath in bedPaths:
+        if not os.path.isfile(bedPath):
+            report.addCritical("Unable to find BED file at %s" %bedPath)
+    if not report.passed:
+        report.addCritical("Stopping before further analysis due to the absence of expected files")
+        return False
+    return True
+
+
+def addValidationResults(report:validationReport.ValidationReport, fastaPath:str, reference:PreparedReference, bedPaths:typing.List[str],
+                         bedResults:typing.List[typing.Tuple[str, errorCollection.ErrorCollection, errorCollection.ErrorCollection, typing.Optional[intervalIndex.IntervalIndex]]],
+                         checkOverlaps:bool=False, compareBEDs:bool=False, maxExamples:int=errorCollection.DEFAULTMAXEXAMPLES,
+                         timer:stageTimer.StageTimer=stageTimer.DISABLEDTIMER, checkSequence:bool=False,
+                         gcRange:typing.Tuple[float, float]=DEFAULTGCRANGE, maxSoftMasked:float=DEFAULTMAXSOFTMASKED,
+                         checkFastaContent:bool=False) -> validationReport.ValidationReport:
+    """Adds the findings for the FASTA and for each BED file (with the results from validateBEDFiles in the same order as bedPaths) to the
+    report, along with the FASTA content, overlap, sequence and comparison checks that were asked for"""
+    report.addErrors(prependFileNameToErrorLines(fastaPath, reference.fastaErrors))
+    if checkFastaContent and reference.statistics is None:
+        report.addWarning("Unable to check the content of FASTA file at %s because Samtools gives no sequence statistics. Use the builtin backend to check it." %fastaPath)
+    elif checkFastaContent:
+        report.addWarnings(prependFileNameToErrorLines(fastaPath, reference.fastaWarnings))
+    fetcher = None
+    if checkSequence and any(not readingFailure for readingFailure, bedFileErrors, bedFileCrosscheckErrors, bedIntervalIndex in bedResults):
+        fetcher = openSequenceFetcher(fastaPath, reference, report)
+    try:
+        for bedFilePath, (readingFailure, bedFileErrors, bedFileCrosscheckErrors, bedIntervalIndex) in zip(bedPaths, bedResults):
+            if readingFailure:
+                report.addCritical(readingFailure)
+                continue
+            bedFileErrors = prependFileNameToErrorLines(bedFilePath, bedFileErrors)
+            bedFileCrosscheckErrors = prependFileNameToErrorLines(bedFilePath, bedFileCrosscheckErrors)
+            report.addErrors(bedFileErrors)
+            report.addErrors(bedFileCrosscheckErrors)
+            if checkOverlaps:
+                with timer.stage("Check overlaps in %s" %bedFilePath):
+                    overlapWarnings, intervalStatistics = checkIntervalOverlaps(bedIntervalIndex, maxExamples)
+                report.addWarnings(prependFileNameToErrorLines(bedFilePath, overlapWarnings))
+                report.addStatistics(bedFilePath, intervalStatistics)
+            if fetcher is not None:
+                with timer.stage("Check sequence of intervals in %s" %bedFilePath) as sequenceStage:
+                    sequenceWarnings, sequenceCheckStatistics = checkIntervalSequences(bedIntervalIndex, fetcher, gcRange, maxSoftMasked, maxExamples)
+                    sequenceStage.addRows(len(bedIntervalIndex))
+                report.addWarnings(prependFileNameToErrorLines(bedFilePath, sequenceWarnings))
+                report.addStatistics(bedFilePath, sequenceCheckStatistics)
+    finally:
+        if fetcher is not None:
+            fetcher.close()
+    if compareBEDs:
+        if len(bedPaths) < 2:
+            report.addWarning("Comparing BED files needs a target BED file and at least one more BED file to compare with it")
+            return report
+        targetPath = bedPaths[0]
+        targetIndex = bedResults[0][3]
+        for baitPath, (readingFailure, bedFileErrors, bedFileCrosscheckErrors, baitIndex) in zip(bedPaths[1:], bedResults[1:]):
+            if targetIndex is not None and baitIndex is not None:  # Files that could not be read already have a critical error
+                with timer.stage("Compare %s with targets" %baitPath):
+                    compareBEDFiles(targetPath, targetIndex, baitPath, baitIndex, report, maxExamples)
+    return report
+
+
+def runValidations(fastaPath:str, *bedPaths:str, verbose:bool=True, streaming:bool=False, workers:int=1,
+                   useCache:bool=True, cacheDirectory:str=referenceCache.DEFAULTCACHEDIRECTORY, cacheSizeLimit:int=None,
+                   backend:str="auto", checkOverlaps:bool=False, compareBEDs:bool=False, maxExamples:int=errorCollection.DEFAULTMAXEXAMPLES,
+                   timer:stageTimer.StageTimer=stageTimer.DISABLEDTIMER, report:validationReport.ValidationReport=None,
+                   referenceStore:ReferenceStore=None, checkSequence:bool=False, gcRange:typing.Tuple[float, float]=DEFAULTGCRANGE,
+                   maxSoftMasked:float=DEFAULTMAXSOFTMASKED, checkFastaContent:bool=False, cacheBEDTables:bool=False,
+                   writeIndex:bool=False) -> validationReport.ValidationReport:
+    """Validates the FASTA and BED files and cross-checks them against each other. With checkFastaContent, contigs with IUPAC ambiguity
+    codes, characters that are not nucleotide codes, only N bases or only soft-masked bases are warned about. With compareBEDs, the first BED file is treated as the
+    targets and every other BED file as baits (or primers) for them, and their relationship is reported as well. With checkSequence, the
+    bases of every interval are read from the FASTA to warn about intervals that are all N, mostly soft-masked or outside gcRange. Only the first maxExamples
+    errors and warnings of each kind are listed for each BED file (all of them if None), and the rest are counted in the report. Findings go
+    in a new report unless one is given, and with a referenceStore the FASTA is only analyzed and validated if the store does not hold it
+    already. With cacheBEDTables, the parsed columns of each BED file are cached along with its findings. With writeIndex, the FASTA index
+    and dictionary are written next to the FASTA when it is prepared."""
+    if report is None:
+        report = validationReport.ValidationReport(REPORTNAME)
+    if verbose:
+        print("Tecan Genomics FASTA and BED cross validator | Version: %s | Date: %s" % (versionInfo.VERSION, versionInfo.DATE))
+    if not startReport(report, fastaPath, bedPaths):
+        return report
+    if referenceStore is not None:
+        cache = referenceStore.cache
+        reference = referenceStore.get(fastaPath, report, backend=backend, timer=timer, needStatistics=checkFastaContent, writeIndex=writeIndex)
+    else:
+        if useCache:
+            cache = referenceCache.ReferenceCache(cacheDirectory, cacheSizeLimit, cacheBEDTables)
+            if verbose:
+                print("Caching analyses in %s (use --no-cache to turn this off)" %cache.directory)
+        else:
+            cache = None
+        reference = prepareReference(fastaPath, report, verbose=verbose, cache=cache, backend=backend, timer=timer, needStatistics=checkFastaContent,
+                                     writeIndex=writeIndex)
+    if reference is None:
+        return report
+    uniqueBedPaths = list(dict.fromkeys(bedPaths))  # A BED listed twice is only validated once
+    bedResults = validateBEDFiles(uniqueBedPaths, reference.contigLengthTable, streaming=streaming, workers=workers, buildIntervalIndex=checkOverlaps or compareBEDs or checkSequence,
+                                  timer=timer, maxExamples=maxExamples, cache=cache)
+    return addValidationResults(report, fastaPath, reference, uniqueBedPaths, bedResults, checkOverlaps, compareBEDs, maxExamples, timer,
+                                checkSequence, gcRange, maxSoftMasked, checkFastaContent)
+
+
+def generateValidationReport(fastaPath:str, *bedPaths:str, instrument:bool=False, **options) -> validationReport.ValidationReport:
+    """Runs the validations (see runValidations for the options). With instrument, the time, rows, bytes read and peak memory of each stage
+    go in the performance section of the report."""
+    timer = stageTimer.StageTimer(enabled=instrument)
+    with timer.stage("Total"):
+        report = runValidations(fastaPath, *bedPaths, timer=timer, **options)
+    for stage, values in timer.toDict().items():
+        report.addPerformance(stage, values)
+    return report
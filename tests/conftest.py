@@ -0,0 +1,49 @@
+import os
+import sys
+import zlib
+import struct
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fbvsupport import bedReader
+
+
+def bgzfBlock(data:bytes) -> bytes:
+    compressor = zlib.compressobj(6, zlib.DEFLATED, -15)
+    compressedData = compressor.compress(data) + compressor.flush()
+    blockSize = 18 + len(compressedData) + 8
+    header = b"\x1f\x8b\x08\x04\x00\x00\x00\x00\x00\xff\x06\x00BC\x02\x00" + struct.pack("<H", blockSize - 1)
+    return header + compressedData + struct.pack("<II", zlib.crc32(data), len(data))
+
+
+def writeBGZF(path:str, data:bytes, blockSize:int=1000) -> str:
+    """Writes data as BGZF blocks of blockSize uncompressed bytes followed by the empty end of file block, the way bgzip would"""
+    file = open(path, 'wb')
+    for blockStart in range(0, len(data), blockSize):
+        file.write(bgzfBlock(data[blockStart:blockStart + blockSize]))
+    file.write(bgzfBlock(b""))
+    file.close()
+    return path
+
+
+@pytest.fixture
+def bgzfBlockMaker():
+    return bgzfBlock
+
+
+@pytest.fixture
+def bgzfWriter():
+    return writeBGZF
+
+
+@pytest.fixture
+def validationRun(monkeypatch):
+    """BEDLine collects errors instead of raising them, as it does once validations is imported"""
+    monkeypatch.setattr(bedReader, "VALIDATIONRUN", True)
+
+
+@pytest.fixture
+def strictRun(monkeypatch):
+    """BEDLine raises on the first error, as it does outside of a validation run"""
+    monkeypatch.setattr(bedReader, "VALIDATIONRUN", False)
@@ -0,0 +1,82 @@
+import json
+import os
+import random
+import pytest
+import validator
+from fbvsupport import batchValidation
+from fbvsupport import validations
+
+
+OPTIONS = {"verbose": False, "useCache": False, "backend": "builtin", "checkOverlaps": True, "compareBEDs": True, "maxExamples": 20}
+
+
+def writeFile(path:str, text:str) -> str:
+    file = open(path, 'w')
+    file.write(text)
+    file.close()
+    return path
+
+
+def makeReference(seed:int) -> str:
+    generator = random.Random(seed)
+    return "".join(">chr%s\n%s\n" %(contig, "".join(generator.choice("ACGT") for base in range(600))) for contig in (1, 2))
+
+
+def makeBED(seed:int) -> str:
+    generator = random.Random(seed)
+    lines = []
+    for row in range(200):
+        start = generator.randrange(-2, 700)
+        lines.append("chr%s\t%s\t%s\tname%s\n" %(generator.choice([1, 2, 3]), start, start + generator.randrange(1, 50), generator.randrange(150)))
+    return "".join(lines)
+
+
+@pytest.fixture
+def manifestFiles(tmp_path):
+    """Four jobs over two references, with one BED used by three of them and a reference that cannot be read"""
+    for number in range(2):
+        writeFile(str(tmp_path / ("ref%s.fa" %number)), makeReference(number))
+    writeFile(str(tmp_path / "broken.fa"), ">chr1\nACGT\n>\n")
+    for number in range(3):
+        writeFile(str(tmp_path / ("regions%s.bed" %number)), makeBED(number))
+    lines = ["# reference\tBEDs\toutput", "ref0.fa\tregions0.bed\tregions1.bed\tjob0.json", "ref1.fa\tregions0.bed\tjob1.json", "",
+             "ref0.fa\tregions2.bed\tregions0.bed\tjob2.json", "broken.fa\tregions1.bed\tjob3.json", "ref1.fa\tjob4.json"]
+    return writeFile(str(tmp_path / "manifest.tsv"), "\n".join(lines) + "\n")
+
+
+def testManifestPathsAreRelativeToTheManifest(manifestFiles):
+    directory = os.path.dirname(manifestFiles)
+    jobs = batchValidation.readManifest(manifestFiles)
+    assert [(job.fastaPath, job.bedPaths, job.outputPath) for job in jobs[:2]] == [
+        (os.path.join(directory, "ref0.fa"), [os.path.join(directory, "regions0.bed"), os.path.join(directory, "regions1.bed")], os.path.join(directory, "job0.json")),
+        (os.path.join(directory, "ref1.fa"), [os.path.join(directory, "regions0.bed")], os.path.join(directory, "job1.json"))]
+    jsonManifest = writeFile(os.path.join(directory, "manifest.json"), json.dumps([{"fasta": job.fastaPath, "beds": job.bedPaths, "output": job.outputPath} for job in jobs]))
+    assert batchValidation.readManifest(jsonManifest) == jobs
+    assert [[job.outputPath[-9:] for job in group] for group in batchValidation.groupJobsByReference(jobs)] == \
+           [["job0.json", "job2.json"], ["job1.json", "job4.json"], ["job3.json"]]
+
+
+@pytest.mark.parametrize("text", ["", "# Only a comment\n", "ref0.fa\n", "ref0.fa\tjob.json\nref1.fa\tjob.json\n"])
+def testBadManifestsAreRejected(tmp_path, text):
+    with pytest.raises(batchValidation.ManifestError):
+        batchValidation.readManifest(writeFile(str(tmp_path / "manifest.tsv"), text))
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def testEachReferenceIsAnalyzedOnceAndEachJobGetsItsOwnReport(manifestFiles, monkeypatch, workers):
+    jobs = batchValidation.readManifest(manifestFiles)
+    expectedReports = [validations.generateValidationReport(job.fastaPath, *job.bedPaths, **OPTIONS).toDict() for job in jobs]
+    analyzedPaths = []
+    analyzeReference = validations.analyzeReference
+    monkeypatch.setattr(validations, "analyzeReference", lambda fastaPath, *args, **kwargs: analyzedPaths.append(fastaPath) or analyzeReference(fastaPath, *args, **kwargs))
+    validatedPaths = []
+    validateBEDFile = validations.validateBEDFile
+    monkeypatch.setattr(validations, "validateBEDFile", lambda bedPath, *args: validatedPaths.append(bedPath) or validateBEDFile(bedPath, *args))
+    validator.runManifest([], dict(OPTIONS, manifestPath=manifestFiles, workers=workers))
+    assert sorted(analyzedPaths) == sorted(set(job.fastaPath for job in jobs))
+    if workers == 1:  # Worker processes do not see the patched function
+        assert sorted(validatedPaths) == sorted(os.path.join(os.path.dirname(manifestFiles), "regions%s.bed" %number) for number in (0, 0, 1, 2))
+    for job, expectedReport in zip(jobs, expectedReports):
+        outputFile = open(job.outputPath)
+        assert json.load(outputFile) == json.loads(json.dumps(expectedReport))
+        outputFile.close()
@@ -0,0 +1,105 @@
+import io
+import random
+import pytest
+from fbvsupport import bedBlocks
+from fbvsupport import bedTable
+
+
+def bed12Line(start:int, end:int, blockCount, blockSizes:str, blockStarts:str, contig:str="chr1") -> str:
+    return "%s\t%s\t%s\tname\t0\t+\t%s\t%s\t0,0,0\t%s\t%s\t%s\n" %(contig, start, end, start, end, blockCount, blockSizes, blockStarts)
+
+
+def findErrors(text:str) -> list:
+    table = bedTable.processBEDStream(io.StringIO(text))
+    return [(row, category, template %args) for row, category, template, args in bedBlocks.findBlockErrors(table)]
+
+
+def blockErrorsForRow(row:int, start:int, end:int, blockCount:int, blockSizes:str, blockStarts:str) -> list:
+    """Checks one row the simple way, for comparison with the whole table checks"""
+    errors = []
+    sizeList = blockSizes.rstrip(",")
+    startList = blockStarts.rstrip(",")
+    sizeCount = len(sizeList.split(",")) if sizeList else 0
+    startCount = len(startList.split(",")) if startList else 0
+    if sizeCount != blockCount:
+        errors.append((row, "Block count does not match block sizes", "Block count of %s does not match the %s block sizes given" %(blockCount, sizeCount)))
+    if startCount != blockCount:
+        errors.append((row, "Block count does not match block starts", "Block count of %s does not match the %s block starts given" %(blockCount, startCount)))
+    if errors or not blockCount:
+        return errors
+    try:
+        sizes = [int(size) for size in sizeList.split(",")]
+    except ValueError:
+        return [(row, "Block sizes are not integers", "Block sizes %s are not a comma separated list of integers" %sizeList)]
+    try:
+        starts = [int(blockStart) for blockStart in startList.split(",")]
+    except ValueError:
+        return [(row, "Block starts are not integers", "Block starts %s are not a comma separated list of integers" %startList)]
+    for blockNumber, size in enumerate(sizes):
+        if size < 1:
+            errors.append((row, "Empty block", "Block %s has a size of %s, but blocks must be at least one base long" %(blockNumber + 1, size)))
+    if starts[0]:
+        errors.append((row, "First block does not start at the interval start", "First block starts at %s, but should start at 0" %starts[0]))
+    if starts[-1] + sizes[-1] != end - start:
+        errors.append((row, "Last block does not end at the interval end", "Last block ends %s bases into the interval, but the interval is %s bases long" %(starts[-1] + sizes[-1], end - start)))
+    for blockNumber in range(1, blockCount):
+        if starts[blockNumber] < starts[blockNumber - 1] + sizes[blockNumber - 1]:
+            errors.append((row, "Overlapping blocks", "Block %s starts at %s, before the end of the block before it at %s" %(blockNumber + 1, starts[blockNumber], starts[blockNumber - 1] + sizes[blockNumber - 1])))
+            break
+    return errors
+
+
+CASES = [
+    (bed12Line(0, 100, 2, "10,20,", "0,80,"), []),
+    (bed12Line(0, 100, 2, "10,20", "0,80"), []),
+    (bed12Line(0, 100, 3, "10,20,", "0,80,"), [(0, "Block count does not match block sizes", "Block count of 3 does not match the 2 block sizes given"),
+                                              (0, "Block count does not match block starts", "Block count of 3 does not match the 2 block starts given")]),
+    (bed12Line(0, 100, 2, "10,x,", "0,80,"), [(0, "Block sizes are not integers", "Block sizes 10,x are not a comma separated list of integers")]),
+    (bed12Line(0, 100, 2, "10,20,", "0,8.0,"), [(0, "Block starts are not integers", "Block starts 0,8.0 are not a comma separated list of integers")]),
+    (bed12Line(0, 100, 2, "0,20,", "0,80,"), [(0, "Empty block", "Block 1 has a size of 0, but blocks must be at least one base long")]),
+    (bed12Line(0, 100, 2, "10,20,", "5,80,"), [(0, "First block does not start at the interval start", "First block starts at 5, but should start at 0")]),
+    (bed12Line(0, 100, 2, "10,10,", "0,80,"), [(0, "Last block does not end at the interval end", "Last block ends 90 bases into the interval, but the interval is 100 bases long")]),
+    (bed12Line(0, 100, 3, "50,10,20,", "0,40,80,"), [(0, "Overlapping blocks", "Block 2 starts at 40, before the end of the block before it at 50")]),
+    (bed12Line(0, 100, 1, "100,", "0,"), []),
+]
+
+
+@pytest.mark.parametrize("line, expected", CASES)
+def testBlockErrors(validationRun, line, expected):
+    assert findErrors(line) == expected
+
+
+def testRowsWithLineErrorsAreSkipped(validationRun):
+    text = bed12Line(0, 100, 2, "10,20,", "5,80,") + bed12Line(-5, 100, 2, "10,20,", "5,80,") + bed12Line(0, 100, 2, "10,20,", "5,80,")
+    assert [row for row, category, message in findErrors(text)] == [0, 2]
+
+
+def testMatchesRowByRowChecks(validationRun):
+    generator = random.Random(1)
+    lines = []
+    expected = []
+    for row in range(3000):
+        blockCount = generator.randrange(1, 6)
+        sizes = [generator.randrange(1, 50) for block in range(blockCount)]
+        starts = [0]
+        for size in sizes[:-1]:
+            starts.append(starts[-1] + size + generator.randrange(0, 30))
+        fault = generator.randrange(12)
+        if fault == 0 and blockCount > 1:
+            sizes[generator.randrange(blockCount - 1)] = generator.choice([0, -4])
+        elif fault == 1:
+            starts[0] = 3
+        elif fault == 2 and blockCount > 1:
+            starts[-1] = starts[-2]
+        elif fault == 3:
+            blockCount += 1
+        length = starts[-1] + sizes[-1] + (generator.randrange(1, 5) if fault == 4 else 0)
+        blockSizes = ",".join(map(str, sizes)) + generator.choice([",", ""])
+        blockStarts = ",".join(map(str, starts)) + generator.choice([",", ""])
+        if fault == 5:
+            blockSizes = blockSizes.replace("1", "l", 1)
+        start = generator.randrange(0, 100000)
+        lines.append(bed12Line(start, start + length, blockCount, blockSizes, blockStarts))
+        expected += blockErrorsForRow(row, start, start + length, blockCount, blockSizes, blockStarts)
+    assert expected
+    assert findErrors("".join(lines)) == expected
@@ -0,0 +1,169 @@
+import io
+import random
+import pytest
+from fbvsupport import bedReader
+from fbvsupport import bedTable
+
+
+BED3 = "chr1\t0\t100\nchr1\t50\t150\nchr2\t10\t20\n"
+BED4 = "track name=test\n#comment\nbrowser position chr1\nchr1\t0\t100\tfirst\nchr2 5 25 second\n\nchr1\t7\t9\tthird\n"
+BED6 = "chr1\t0\t100\ta\t0\t+\nchr1\t10\t20\tb\t.\t-\nchr2\t3\t4\tc\t1000\t.\n"
+BED12 = ("chr1\t0\t100\ta\t0\t+\t10\t90\t0,0,0\t2\t10,20,\t0,80,\n"
+         "chr1\t200\t300\tb\t500\t-\t200\t200\t255,0,0\t1\t100\t0\n")
+BED6ERRORS = ("chr1\t-5\t100\ta\t0\t+\n"        # Negative start
+              "chr1\t50\t40\tb\t0\t+\n"         # Start after end
+              "chr1\t60\t60\tc\t0\t+\n"         # Zero length
+              "chr1\t0\t10\td\t1001\t+\n"       # Score out of range
+              "chr1\t0\t10\te\t-1\t*\n"         # Score out of range and invalid strand
+              "chr1\t0\t10\tf\tlots\t+\n"       # Score that is not a number
+              "chr1\t0\t10\tg\tnan\t+\n"        # Score that is not a number once converted
+              "chr2\t0\t10\th\t5\t+\n")
+BED12ERRORS = ("chr1\t0\t100\ta\t0\t+\t-10\t90\t0,0,0\t2\t10,20,\t0,80,\n"    # Negative thick start
+               "chr1\t0\t100\tb\t0\t+\t10\t90\t0,0,0\t-2\t10,20,\t0,80,\n"    # Negative block count
+               "chr1\t0\t100\td\t0\t+\t10\t90\t0,0,0\t2\t10,20,\t0,80,\n")
+FAILINGFILES = [
+    "chr1\t0\t100\ta\tb\n",                                   # Five fields is not a BED format
+    "chr1\t0\t100\ta\nchr1\t0\t100\n",                        # Field count changes partway through
+    "chr1\tzero\t100\n",                                      # Start that is not an integer
+    "chr1\t0\t100\tc\t0\t+\t10\t90\t0,0,0\tx\t10,20,\t0,80,\n",  # Block count that is not an integer
+    "# Only a comment\n"
+]
+
+
+def parseBoth(text:str, maxExamples:int=None):
+    return bedReader.processBEDStream(io.StringIO(text)), bedTable.processBEDStream(io.StringIO(text), maxExamples)
+
+
+def baselineLineErrors(bedLines) -> list:
+    """The line errors as the original BEDLine based validation listed them"""
+    return ["Line %s: %s" %(lineNumber + 1, error) for lineNumber, bedLine in enumerate(bedLines) for error in bedLine.errors]
+
+
+def assertTableMatches(table:bedTable.BEDTable, bedLines:list) -> None:
+    assert len(table) == len(bedLines)
+    for index, bedLine in enumerate(bedLines):
+        tableLine = table[index]
+        assert (tableLine.contig, tableLine.start, tableLine.end, tableLine.strand) == (bedLine.contig, bedLine.start, bedLine.end, bedLine.strand)
+        assert (table.contig(index), table.starts[index], table.ends[index]) == (bedLine.contig, bedLine.start, bedLine.end)
+        assert table.nameOrElse(index) == bedLine.nameOrElse
+        assert table.errors(index) == bedLine.errors
+        assert table.hasErrors(index) == bool(bedLine.errors)
+        if table.bedFormatLength >= 6 and not bedLine.errors:
+            assert (table.scores[index], table.strand(index)) == (bedLine._score, bedLine.strand)
+        if table.bedFormatLength == 12 and not bedLine.errors:
+            if bedLine.thickInterval:
+                assert (table.thickStarts[index], table.thickEnds[index]) == (bedLine.thickInterval.start, bedLine.thickInterval.end)
+            else:  # An empty thick interval is stored as 0, 0
+                assert (table.thickStarts[index], table.thickEnds[index]) == (0, 0)
+            assert (table.rgbs[index], table.blockCounts[index], table.blockSizes[index], table.blockStarts[index]) == \
+                   (bedLine.rgb, bedLine.blockCount, bedLine.blockSizes, bedLine.blockStarts)
+    assert list(table.namesOrElse()) == [bedLine.nameOrElse for bedLine in bedLines]
+    assert list(table.lineErrors) == baselineLineErrors(bedLines)
+
+
+@pytest.mark.parametrize("text", [BED3, BED4, BED6, BED12, BED6ERRORS, BED12ERRORS])
+def testTableMatchesBEDLines(validationRun, text):
+    bedLines, table = parseBoth(text)
+    assertTableMatches(table, bedLines)
+
+
+@pytest.mark.parametrize("text", FAILINGFILES)
+def testTableFailsLikeBEDLines(validationRun, text):
+    with pytest.raises(Exception) as baselineError:  # Not every one of these was a BEDLineError
+        bedReader.processBEDStream(io.StringIO(text))
+    with pytest.raises(bedReader.BEDLineError) as tableError:
+        bedTable.processBEDStream(io.StringIO(text))
+    assert str(baselineError.value) in str(tableError.value)
+
+
+def testThickStartAfterThickEndFails(validationRun):
+    """BEDLine only fails on these once its errors are read, which the table does while adding the row"""
+    text = "chr1\t0\t100\ta\t0\t+\t90\t10\t0,0,0\t1\t100\t0\n"
+    with pytest.raises(ValueError) as baselineError:
+        bedReader.processBEDStream(io.StringIO(text))[0].errors
+    with pytest.raises(bedReader.BEDLineError) as tableError:
+        bedTable.processBEDStream(io.StringIO(text))
+    assert str(baselineError.value) in str(tableError.value)
+
+
+@pytest.mark.parametrize("text", [BED6ERRORS, BED12ERRORS])
+def testStrictRunRaisesLikeBEDLines(strictRun, text):
+    with pytest.raises(bedReader.BEDLineError) as baselineError:
+        bedReader.processBEDStream(io.StringIO(text))
+    with pytest.raises(bedReader.BEDLineError) as tableError:
+        bedTable.processBEDStream(io.StringIO(text))
+    assert str(tableError.value) == str(baselineError.value)
+
+
+def makeRandomBED6(rowCount:int, errorRate:float, seed:int) -> str:
+    generator = random.Random(seed)
+    lines = []
+    for row in range(rowCount):
+        start = generator.randrange(0, 10000)
+        end = start + generator.randrange(1, 500)
+        score = generator.choice(["0", "500", "1000", ".", "12.5"])
+        strand = generator.choice("+-.")
+        if generator.random() < errorRate:
+            fault = generator.randrange(5)
+            if fault == 0:
+                start = -start - 1
+            elif fault == 1:
+                start, end = end, start
+            elif fault == 2:
+                end = start
+            elif fault == 3:
+                score = "2000"
+            else:
+                strand = "?"
+        lines.append("chr%s\t%s\t%s\tname%s\t%s\t%s\n" %(generator.randrange(1, 4), start, end, row, score, strand))
+    return "".join(lines)
+
+
+def testBulkParsingMatchesBEDLines(validationRun):
+    bedLines, table = parseBoth(makeRandomBED6(5000, 0.05, 1))
+    assert table.errorRows
+    assertTableMatches(table, bedLines)
+
+
+def testTableFromBEDLines(validationRun):
+    bedLines = bedReader.processBEDStream(io.StringIO(BED6ERRORS))
+    assertTableMatches(bedTable.BEDTable.fromBEDLines(bedLines), bedLines)
+
+
+def testChunksMatchWholeFile(validationRun):
+    text = makeRandomBED6(1000, 0.05, 2)
+    wholeTable = bedTable.processBEDStream(io.StringIO(text))
+    chunks = list(bedTable.iterateBEDStream(io.StringIO(text), chunkSize=128))
+    assert [chunk.firstRow for chunk in chunks] == list(range(0, 1000, 128))
+    assert sum(map(len, chunks)) == len(wholeTable)
+    chunkErrors = [error for chunk in chunks for error in chunk.lineErrors]
+    assert chunkErrors == list(wholeTable.lineErrors)
+    chunkErrorRows = [chunk.firstRow + row for chunk in chunks for row in chunk.errorRows]
+    assert chunkErrorRows == list(wholeTable.errorRows)
+
+
+def testLineErrorExamplesAreBounded(validationRun):
+    text = makeRandomBED6(2000, 0.5, 3)
+    bedLines, boundedTable = parseBoth(text, maxExamples=2)
+    fullTable = bedTable.processBEDStream(io.StringIO(text))
+    assert boundedTable.lineErrors.counts == fullTable.lineErrors.counts
+    assert all(kept <= 2 for kept in boundedTable.lineErrors.kept.values())
+    assert list(boundedTable.errorRows) == list(fullTable.errorRows)
+    assert [boundedTable.errors(index) for index in range(len(bedLines))] == [bedLine.errors for bedLine in bedLines]
+
+
+def testScoresThatAreNotNumbersStayOnTheBulkPath(validationRun):
+    lines = makeRandomBED6(3000, 0.05, 4).splitlines(keepends=True)
+    for row in range(0, len(lines), 7):
+        fields = lines[row].split("\t")
+        fields[4] = random.Random(row).choice(["abc", "1,5", "", "0x10"])
+        lines[row] = "\t".join(fields)
+    text = "".join(lines)
+    bedLines, table = parseBoth(text)
+    assertTableMatches(table, bedLines)
+    bedLines, boundedTable = parseBoth(text, maxExamples=3)
+    assert boundedTable.lineErrors.counts == table.lineErrors.counts
+    assert set(boundedTable.lineErrors).issubset(table.lineErrors)
+    assert len(boundedTable._rowSources) <= 3 * len(boundedTable.lineErrors.counts)  # Only the rows behind kept examples keep their fields
+    keptRows = set(boundedTable._rowSources)
+    assert [boundedTable.errors(index) for index in keptRows] == [bedLines[index].errors for index in keptRows]
@@ -0,0 +1,66 @@
+import io
+import random
+from fbvsupport import bedReader
+from fbvsupport import bedTable
+from fbvsupport import contigBoundsChecker
+from fbvsupport import errorCollection
+from fbvsupport import faidxReader
+from fbvsupport import validations
+
+
+FAIDX = [faidxReader.FastaIndexLine("chr1", 1000, 6, 60, 61), faidxReader.FastaIndexLine("chr2", 500, 1030, 60, 61),
+         faidxReader.FastaIndexLine("chr1", 800, 1550, 60, 61)]  # A duplicated contig keeps the last length
+
+
+def crosscheckByLine(bedLines:list, faidxData:list) -> list:
+    """The original crosscheck, one BEDLine at a time"""
+    errorList = []
+    contigLengthTable = {}
+    for line in faidxData:
+        contigLengthTable[line.contig] = line.baseLength
+    for line in bedLines:
+        if not line.contig in contigLengthTable:
+            errorList.append("BED line %s tried to reference contig %s which does not exist in the FASTA file." %(line.name, line.contig))
+            continue
+        if line.interval.lastIncludedBase > contigLengthTable[line.contig]:
+            errorList.append("BED line %s is trying to read interval %s which is out of its contig's bounds" %(line.name, line.interval))
+    return errorList
+
+
+def makeBED(rowCount:int, seed:int) -> str:
+    generator = random.Random(seed)
+    lines = []
+    for row in range(rowCount):
+        contig = generator.choice(["chr1", "chr2", "chrUn", "chr1_alt"])
+        end = generator.choice([1, 499, 500, 501, 502, 799, 800, 801, 802, 1000, 1001, 1002, generator.randrange(1, 1200)])
+        start = generator.randrange(0, end)
+        lines.append("%s\t%s\t%s\tname%s\t0\t+\n" %(contig, start, end, row))
+    return "".join(lines)
+
+
+def testCrosscheckMatchesLineByLine(validationRun):
+    text = makeBED(3000, 1)
+    bedLines = bedReader.processBEDStream(io.StringIO(text))
+    expected = crosscheckByLine(bedLines, FAIDX)
+    assert expected
+    assert list(validations.crosscheckBEDFile(bedTable.processBEDStream(io.StringIO(text)), FAIDX)) == expected
+    assert list(validations.crosscheckBEDFile(bedLines, contigBoundsChecker.ContigLengthTable.fromFaidx(FAIDX))) == expected
+
+
+def testLastIncludedBaseBoundary(validationRun):
+    text = "chr2\t0\t500\tatEnd\t0\t+\nchr2\t0\t501\tpastEnd\t0\t+\nchr2\t0\t502\tbeyond\t0\t+\nchrUn\t0\t10\tunknown\t0\t+\n"
+    result = contigBoundsChecker.crosscheckBEDTable(bedTable.processBEDStream(io.StringIO(text)), contigBoundsChecker.ContigLengthTable.fromFaidx(FAIDX))
+    assert (result.unknownContigRows, result.outOfBoundsRows) == ([3], [2])
+    assert len(result) == 2
+
+
+def testCrosscheckKeepsFirstExamples(validationRun):
+    text = makeBED(3000, 2)
+    bedLines = bedReader.processBEDStream(io.StringIO(text))
+    errors = validations.crosscheckBEDFile(bedTable.processBEDStream(io.StringIO(text)), FAIDX, errorCollection.ErrorCollection(maxExamples=3))
+    expected = crosscheckByLine(bedLines, FAIDX)
+    unknownContigErrors = [error for error in expected if "does not exist" in error]
+    outOfBoundsErrors = [error for error in expected if "out of its contig's bounds" in error]
+    assert list(errors) == [error for error in expected if error in unknownContigErrors[:3] or error in outOfBoundsErrors[:3]]
+    assert len(errors) == len(expected)
+    assert sum(errors.omitted().values()) == len(expected) - 6
@@ -0,0 +1,50 @@
+import array
+import io
+import random
+from fbvsupport import bedTable
+from fbvsupport import duplicateKeys
+from fbvsupport import validations
+
+
+def makeNamedBED(rowCount:int, seed:int) -> str:
+    generator = random.Random(seed)
+    names = ["name%s" %generator.randrange(rowCount) for row in range(rowCount // 2)] + ["NAME%s" %row for row in range(10)]
+    return "".join("chr1\t%s\t%s\t%s\n" %(row, row + 1, generator.choice(names)) for row in range(rowCount))
+
+
+def testFindDuplicateKeys():
+    generator = random.Random(1)
+    keys = [generator.randrange(-2 ** 63, 2 ** 63) for key in range(5000)] + [generator.randrange(100) for key in range(500)]
+    keys += [2 ** 70 + generator.randrange(50) for key in range(100)] + [-2 ** 66 - 3] * 2  # Too wide for 64 bits
+    keys += keys[:200]
+    generator.shuffle(keys)
+    assert duplicateKeys.findDuplicateKeys(iter(keys)) == set(validations.detectCollisionsInList(keys))
+    assert duplicateKeys.findDuplicateKeys(array.array("q", range(1000))) == set()
+
+
+def testNameCollisionsMatchDetectCollisionsInList(validationRun):
+    table = bedTable.processBEDStream(io.StringIO(makeNamedBED(3000, 2)))
+    names = list(table.namesOrElse())
+    expected = (validations.detectCollisionsInList(names), validations.detectCollisionsInList(map(validations.simplifyName, names)))
+    assert expected[0] and expected[1] != expected[0]
+    rawNameHashes = duplicateKeys.hashStrings(names)
+    simplifiedNameHashes = duplicateKeys.hashStrings(validations.simplifyNames(names))
+    collisions = duplicateKeys.findNameCollisions([table], rawNameHashes, simplifiedNameHashes, validations.simplifyName)
+    assert [list(counts.items()) for counts in collisions] == [list(counts.items()) for counts in expected]
+    sharedHashes = array.array("q", [0] * len(names))  # Every name shares a hash, so only the names themselves tell them apart
+    chunks = list(bedTable.iterateBEDStream(io.StringIO(makeNamedBED(3000, 2)), chunkSize=256))
+    assert duplicateKeys.findNameCollisions(chunks, sharedHashes, sharedHashes, validations.simplifyName) == expected
+
+
+def testIntervalCollisionsMatchDetectCollisionsInList():
+    generator = random.Random(3)
+    for contigCount, maxPosition in ((3, 500), (5000, 2 ** 40)):  # The second packs keys too wide for 64 bits
+        intervals = []
+        for row in range(4000):
+            if intervals and generator.random() < 0.1:
+                intervals.append(generator.choice(intervals))
+                continue
+            start = generator.randrange(-10, maxPosition)
+            intervals.append((generator.randrange(contigCount), start, start + generator.randrange(-5, 50)))
+        contigCodes, starts, ends = (array.array("q", column) for column in zip(*intervals))
+        assert list(duplicateKeys.findIntervalCollisions(contigCodes, starts, ends).items()) == list(validations.detectCollisionsInList(intervals).items())
@@ -0,0 +1,52 @@
+from fbvsupport import errorCollection
+
+
+def fillCollection(errors:errorCollection.ErrorCollection) -> errorCollection.ErrorCollection:
+    for number in range(5):
+        errors.add("Odd" if number % 2 else "Even", "Error %s of %s", number, "x")
+    errors.add("Plain", "No arguments")
+    errors.count("Counted only", 4)
+    return errors
+
+
+def testExamplesAreCappedAndTheRestCounted():
+    errors = fillCollection(errorCollection.ErrorCollection(maxExamples=2))
+    assert list(errors) == ["Error 0 of x", "Error 1 of x", "Error 2 of x", "Error 3 of x", "No arguments"]
+    assert errors.counts == {"Even": 3, "Odd": 2, "Plain": 1, "Counted only": 4}
+    assert errors.omitted() == {"Even": 1, "Counted only": 4}
+    assert (errors.room("Even"), errors.room("Plain"), errors.room("New")) == (0, 1, 2)
+    assert len(errors) == 10 and errors
+    assert not errorCollection.ErrorCollection(maxExamples=2)
+
+
+def testAddSaysWhetherTheErrorWasKept():
+    errors = errorCollection.ErrorCollection(maxExamples=1)
+    assert errors.add("Category", "First")
+    assert not errors.add("Category", "Second")
+    unbounded = errorCollection.ErrorCollection()
+    assert all(unbounded.add("Category", "Error %s", number) for number in range(100))
+    assert unbounded.room("Category") is None and unbounded.omitted() == {}
+
+
+def testExtendKeepsTheLimitOfTheCollectionExtended():
+    errors = errorCollection.ErrorCollection(maxExamples=3)
+    errors.add("Even", "Earlier")
+    errors.extend(fillCollection(errorCollection.ErrorCollection()))
+    assert list(errors) == ["Earlier", "Error 0 of x", "Error 1 of x", "Error 2 of x", "Error 3 of x", "No arguments"]
+    assert errors.counts == {"Even": 4, "Odd": 2, "Plain": 1, "Counted only": 4}
+    assert errors.omitted() == {"Even": 1, "Counted only": 4}
+
+
+def testPrefixGoesOnMessagesAndOmittedCategories():
+    errors = fillCollection(errorCollection.ErrorCollection(maxExamples=2)).withPrefix("a.bed: ")
+    assert list(errors)[0] == "a.bed: Error 0 of x"
+    assert errors.omitted() == {"a.bed: Even": 1, "a.bed: Counted only": 4}
+
+
+def testDictRoundTrip():
+    errors = fillCollection(errorCollection.ErrorCollection(maxExamples=2))
+    restored = errorCollection.ErrorCollection.fromDict(errors.toDict())
+    assert list(restored) == list(errors)
+    assert (restored.counts, restored.kept, restored.omitted(), restored.maxExamples) == (errors.counts, errors.kept, errors.omitted(), 2)
+    assert not restored.add("Odd", "Past the limit")
+    assert restored.toDict() == errors.toDict() | {"counts": errors.counts | {"Odd": 3}}
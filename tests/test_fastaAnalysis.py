@@ -0,0 +1,127 @@
+import os
+import gzip
+import random
+import hashlib
+import pytest
+from fbvsupport import bgzf
+from fbvsupport import fastaAnalysis
+
+
+def randomSequence(generator:random.Random, length:int) -> str:
+    sequence = "".join(generator.choice("ACGTacgtNNRY") for base in range(length))
+    return sequence[:length // 3] + "N" * 50 + sequence[length // 3:]
+
+
+def formatFasta(contigs:list, lineWidth:int, newline:str="\n", finalNewline:bool=True) -> bytes:
+    lines = []
+    for header, sequence in contigs:
+        lines.append(">" + header)
+        lines += [sequence[lineStart:lineStart + lineWidth] for lineStart in range(0, len(sequence), lineWidth)]
+    text = newline.join(lines)
+    if finalNewline:
+        text += newline
+    return text.encode()
+
+
+def makeContigs(seed:int) -> list:
+    generator = random.Random(seed)
+    return [("chr%s description %s" %(number, number), randomSequence(generator, generator.randrange(100, 3000))) for number in range(1, 5)]
+
+
+LAYOUTS = {
+    "width60": formatFasta(makeContigs(1), 60),
+    "width61NoFinalNewline": formatFasta(makeContigs(2), 61, finalNewline=False),
+    "windowsLineEndings": formatFasta(makeContigs(3), 50, newline="\r\n"),
+    "exactLines": formatFasta([("chrA", "ACGT" * 20), ("chrB", "acgtn" * 16)], 40),
+    "singleLineContigs": formatFasta([("chrA", "ACGTTGCA"), ("chrB", "NNNN"), ("chrC", "g")], 80),
+}
+IRREGULARLAYOUTS = {
+    "raggedLines": b">chr1\nACGTACGT\nACG\nACGTACGT\n",
+    "trailingBlankLines": formatFasta(makeContigs(4), 60) + b"\n\n",
+}
+
+
+def writeFasta(directory, name:str, data:bytes) -> str:
+    path = os.path.join(str(directory), name)
+    file = open(path, 'wb')
+    file.write(data)
+    file.close()
+    return path
+
+
+def analysisOrError(function, path:str):
+    try:
+        return function(path)
+    except Exception as error:
+        return type(error), str(error).replace(path, "")
+
+
+@pytest.mark.parametrize("layout", sorted(LAYOUTS))
+def testMappedAnalysisMatchesLineByLine(tmp_path, layout):
+    data = LAYOUTS[layout]
+    path = writeFasta(tmp_path, "plain.fa", data)
+    expected = fastaAnalysis.analyzeFastaByLine(path)
+    mappedResult = fastaAnalysis.analyzeFastaMapped(path, threads=3)
+    if mappedResult is not None or b"\r" not in data:  # Carriage returns are left to the line by line analysis
+        assert mappedResult == expected
+    assert fastaAnalysis.analyzeFastaWithStatistics(path) == expected
+
+
+@pytest.mark.parametrize("layout", sorted(IRREGULARLAYOUTS))
+def testIrregularLayoutsFallBackToLineByLine(tmp_path, layout):
+    path = writeFasta(tmp_path, "plain.fa", IRREGULARLAYOUTS[layout])
+    assert analysisOrError(fastaAnalysis.analyzeFastaWithStatistics, path) == analysisOrError(fastaAnalysis.analyzeFastaByLine, path)
+
+
+@pytest.mark.parametrize("layout", sorted(LAYOUTS))
+def testCompressedAnalysisMatchesLineByLine(tmp_path, bgzfWriter, layout):
+    data = LAYOUTS[layout]
+    gzipPath = writeFasta(tmp_path, "plain.fa.gz", gzip.compress(data))
+    bgzfPath = bgzfWriter(os.path.join(str(tmp_path), "blocked.fa.gz"), data, blockSize=97)
+    for path in (gzipPath, bgzfPath):
+        expected = fastaAnalysis.analyzeFastaByLine(path)
+        compressedResult = fastaAnalysis.analyzeCompressedFasta(path, threads=3)
+        if compressedResult is not None or b"\r" not in data:
+            assert compressedResult == expected
+        assert fastaAnalysis.analyzeFastaWithStatistics(path) == expected
+    assert not os.path.exists(bgzf.gziPathFor(bgzfPath))
+
+
+@pytest.mark.parametrize("layout", sorted(IRREGULARLAYOUTS))
+def testIrregularCompressedLayoutsFallBackToLineByLine(tmp_path, bgzfWriter, layout):
+    path = bgzfWriter(os.path.join(str(tmp_path), "blocked.fa.gz"), IRREGULARLAYOUTS[layout], blockSize=97)
+    assert analysisOrError(fastaAnalysis.analyzeFastaWithStatistics, path) == analysisOrError(fastaAnalysis.analyzeFastaByLine, path)
+
+
+def testHandCheckedAnalysis(tmp_path):
+    path = writeFasta(tmp_path, "small.fa", b">a first contig\nACGT\nac\n>b\nNNNN\nNR\n")
+    faidx, fastaDict = fastaAnalysis.analyzeFasta(path)
+    assert [indexLine.faidxString for indexLine in faidx] == ["a\t6\t16\t4\t5", "b\t6\t27\t4\t5"]
+    assert [dictLine.md5Hash for dictLine in fastaDict] == [hashlib.md5(b"ACGTAC").hexdigest(), hashlib.md5(b"NNNNNR").hexdigest()]
+    assert {dictLine.uri for dictLine in fastaDict} == {"file://" + os.path.realpath(path)}
+
+
+def testBuildGziIndexMatchesBlockLayout(tmp_path, bgzfWriter, bgzfBlockMaker):
+    data = LAYOUTS["width60"]
+    path = bgzfWriter(os.path.join(str(tmp_path), "blocked.fa.gz"), data, blockSize=1000)
+    expected = []
+    compressedOffset = 0
+    for uncompressedOffset in range(0, len(data), 1000):
+        if uncompressedOffset:
+            expected.append((compressedOffset, uncompressedOffset))
+        compressedOffset += len(bgzfBlockMaker(data[uncompressedOffset:uncompressedOffset + 1000]))
+    assert bgzf.buildGziIndex(path) == expected
+    assert bgzf.loadOrBuildGziIndex(path) == expected
+    assert not os.path.exists(bgzf.gziPathFor(path))
+    assert bgzf.loadOrBuildGziIndex(path, writeIndex=True) == expected
+    assert bgzf.gziIndexIsCurrent(path)
+    assert bgzf.readGziIndex(bgzf.gziPathFor(path)) == expected
+
+
+
+def testHandCheckedStatistics(tmp_path):
+    path = writeFasta(tmp_path, "small.fa", b">a first contig\nACGT\nac\n>b\nNNNN\nNR\n>c\nNNac\nNN\n")
+    faidx, fastaDict, statistics = fastaAnalysis.analyzeFastaWithStatistics(path)
+    assert [(contig.gcCount, contig.atCount, contig.nCount, contig.softMaskedCount, contig.ambiguityCount) for contig in statistics] == \
+           [(3, 3, 0, 2, 0), (0, 0, 5, 0, 1), (1, 1, 4, 2, 0)]
+    assert [(contig.nRunCount, contig.longestNRun) for contig in statistics] == [(0, 0), (1, 5), (2, 2)]
@@ -0,0 +1,41 @@
+import os
+import subprocess
+import sys
+import pytest
+
+
+REPOSITORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def modulesLoadedBy(statements:str) -> set:
+    """Runs the statements in a fresh interpreter, since this one has already imported most of the package"""
+    script = statements + "\nimport sys\nprint('\\n'.join(sys.modules))"
+    result = subprocess.run([sys.executable, "-c", script], cwd=REPOSITORY, capture_output=True, text=True, check=True)
+    return set(result.stdout.split())
+
+
+def testImportingThePackageLoadsNoSubmodules():
+    loadedModules = modulesLoadedBy("import fbvsupport")
+    assert not {module for module in loadedModules if module.startswith("fbvsupport.")}
+    assert "tkinter" not in loadedModules
+
+
+@pytest.mark.parametrize("statements", ["import validator", "import fbvsupport\nfbvsupport.validations", "from fbvsupport import batchValidation"])
+def testCommandLinePathLeavesOutTheGUI(statements):
+    loadedModules = modulesLoadedBy(statements)
+    assert "fbvsupport.validations" in loadedModules
+    assert "fbvsupport.gui" not in loadedModules and "tkinter" not in loadedModules
+
+
+def testSamtoolsIsOnlySearchedForWhenNeeded():
+    script = "from fbvsupport import validations, samtoolsRunner\nprint(samtoolsRunner._SAMTOOLSSEARCHED)"
+    result = subprocess.run([sys.executable, "-c", script], cwd=REPOSITORY, capture_output=True, text=True, check=True)
+    assert result.stdout.split()[-1] == "False"
+
+
+def testSubmodulesAreLoadedOnFirstUse():
+    import fbvsupport
+    assert fbvsupport.errorCollection.ErrorCollection
+    assert "errorCollection" in dir(fbvsupport)
+    with pytest.raises(AttributeError):
+        fbvsupport.notASubmodule
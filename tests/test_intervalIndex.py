@@ -0,0 +1,111 @@
+import io
+import random
+from fbvsupport import bedTable
+from fbvsupport import intervalIndex
+
+
+def makeBED(rowCount:int, seed:int) -> str:
+    """Short intervals packed onto small contigs, with repeated intervals and a few rows that have errors"""
+    generator = random.Random(seed)
+    lines = []
+    for row in range(rowCount):
+        start = generator.randrange(0, 2000)
+        end = start + generator.randrange(1, 60)
+        if lines and generator.random() < 0.05:
+            contig, start, end = lines[-1].split("\t")[:3]
+        else:
+            contig = generator.choice(["chr1", "chr2", "chrUn"])
+        if generator.random() < 0.02:
+            start, end = end, start
+        lines.append("%s\t%s\t%s\tname%s\n" %(contig, start, end, row))
+    return "".join(lines)
+
+
+def bruteForceOverlaps(table:bedTable.BEDTable, knownContigs=None) -> list:
+    """Compares every pair of rows. A row is nested when another row contains it, and an identical row only counts as containing the ones
+    after it."""
+    errorRows = set(table.errorRows)
+    rows = [(row, table.contig(row), table.starts[row], table.ends[row]) for row in range(len(table))
+            if row not in errorRows and (knownContigs is None or table.contig(row) in knownContigs)]
+    overlaps = []
+    for row, contig, start, end in rows:
+        others = [(otherRow, otherStart, otherEnd) for otherRow, otherContig, otherStart, otherEnd in rows if otherContig == contig and otherRow != row]
+        if not any(otherStart < end and start < otherEnd for otherRow, otherStart, otherEnd in others):
+            continue
+        nested = any(otherStart <= start and otherEnd >= end and ((otherStart, otherEnd) != (start, end) or otherRow < row)
+                     for otherRow, otherStart, otherEnd in others)
+        overlaps.append((row, contig, start, end, nested))
+    return overlaps
+
+
+def testFindOverlapsMatchesBruteForce(validationRun):
+    table = bedTable.processBEDStream(io.StringIO(makeBED(800, 1)))
+    assert table.errorRows
+    expected = bruteForceOverlaps(table)
+    assert any(nested for *interval, nested in expected) and not all(nested for *interval, nested in expected)
+    assert intervalIndex.IntervalIndex.fromBEDTable(table).findOverlaps() == expected
+
+
+def testUnknownContigsAreLeftOut(validationRun):
+    table = bedTable.processBEDStream(io.StringIO(makeBED(800, 2)))
+    index = intervalIndex.IntervalIndex.fromBEDTable(table, knownContigs={"chr1", "chr2"})
+    assert sorted(index.contigs) == ["chr1", "chr2"]
+    assert index.findOverlaps() == bruteForceOverlaps(table, {"chr1", "chr2"})
+
+
+def testOverlappingMatchesBruteForce(validationRun):
+    table = bedTable.processBEDStream(io.StringIO(makeBED(800, 3)))
+    index = intervalIndex.IntervalIndex.fromBEDTable(table)
+    errorRows = set(table.errorRows)
+    generator = random.Random(4)
+    for query in range(200):
+        contig = generator.choice(["chr1", "chr2", "chrUn", "chrM"])
+        start = generator.randrange(0, 2100)
+        end = start + generator.randrange(1, 100)
+        expected = [row for row in range(len(table)) if row not in errorRows and table.contig(row) == contig
+                    and table.starts[row] < end and start < table.ends[row]]
+        assert sorted(index.overlapping(contig, start, end)) == expected
+
+
+def testFootprintMatchesBruteForce(validationRun):
+    table = bedTable.processBEDStream(io.StringIO(makeBED(800, 5)))
+    errorRows = set(table.errorRows)
+    coveredBases = set()
+    for row in range(len(table)):
+        if row not in errorRows:
+            coveredBases.update((table.contig(row), position) for position in range(table.starts[row], table.ends[row]))
+    assert intervalIndex.IntervalIndex.fromBEDTable(table).footprint() == len(coveredBases)
+
+
+def coveredBasesOf(table:bedTable.BEDTable) -> set:
+    errorRows = set(table.errorRows)
+    return {(table.contig(row), position) for row in range(len(table)) if row not in errorRows for position in range(table.starts[row], table.ends[row])}
+
+
+def testCompareIntervalIndexesMatchesBruteForce(validationRun):
+    targets = bedTable.processBEDStream(io.StringIO(makeBED(300, 6)))
+    baits = bedTable.processBEDStream(io.StringIO(makeBED(600, 7)))
+    targetBases, baitBases = coveredBasesOf(targets), coveredBasesOf(baits)
+    uncoveredTargets, partiallyCoveredTargets = [], []
+    for row in sorted(set(range(len(targets))) - set(targets.errorRows)):
+        interval = (row, targets.contig(row), targets.starts[row], targets.ends[row])
+        coveredCount = sum((targets.contig(row), position) in baitBases for position in range(targets.starts[row], targets.ends[row]))
+        if not coveredCount:
+            uncoveredTargets.append(interval)
+        elif coveredCount < targets.ends[row] - targets.starts[row]:
+            partiallyCoveredTargets.append(interval)
+    baitsOutsideTargets = [(row, baits.contig(row), baits.starts[row], baits.ends[row]) for row in sorted(set(range(len(baits))) - set(baits.errorRows))
+                           if not any((baits.contig(row), position) in targetBases for position in range(baits.starts[row], baits.ends[row]))]
+    comparison = intervalIndex.compareIntervalIndexes(intervalIndex.IntervalIndex.fromBEDTable(targets), intervalIndex.IntervalIndex.fromBEDTable(baits))
+    assert uncoveredTargets and partiallyCoveredTargets and baitsOutsideTargets
+    assert sorted(comparison.uncoveredTargets, key=lambda interval: interval[0]) == uncoveredTargets
+    assert sorted(comparison.partiallyCoveredTargets, key=lambda interval: interval[0]) == partiallyCoveredTargets
+    assert sorted(comparison.baitsOutsideTargets, key=lambda interval: interval[0]) == baitsOutsideTargets
+    assert comparison.statistics == {
+        "Targets without bait coverage": len(uncoveredTargets),
+        "Targets partially covered by baits": len(partiallyCoveredTargets),
+        "Baits outside targets": len(baitsOutsideTargets),
+        "Target footprint (bp)": len(targetBases),
+        "Bait footprint (bp)": len(baitBases),
+        "Intersected bases (bp)": len(targetBases & baitBases)
+    }
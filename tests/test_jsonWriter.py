@@ -0,0 +1,39 @@
+import io
+import json
+import pytest
+from fbvsupport import jsonWriter
+
+
+VALUES = [
+    {},
+    [],
+    "plain",
+    {"Test": {"Errors": ["Line 1: bad \"start\"", "Ünïcode ☃ and \t tabs"], "Warnings": [], "Counts": {"Zero length": 3}}},
+    {1: "one", 2.5: [True, False, None], None: {}, True: [[], {}]},
+    [1, 2.0, -3.5e30, float("nan"), float("inf"), "x", None, [1, [2, [3]]], {"nested": ({"tuple": (1, 2)},)}],
+    ["message %s" %number for number in range(25001)],
+    [{"row": number} if number % 10000 == 9999 else number for number in range(20003)],
+]
+
+
+def writtenText(value, indent) -> str:
+    outputFile = io.StringIO()
+    jsonWriter.writeJSONValue(outputFile, value, indent)
+    return outputFile.getvalue()
+
+
+@pytest.mark.parametrize("indent", [2, 4, 0, None])
+@pytest.mark.parametrize("valueNumber", range(len(VALUES)))
+def testMatchesJSONDumps(indent, valueNumber):
+    value = VALUES[valueNumber]
+    assert writtenText(value, indent) == json.dumps(value, indent=indent)
+
+
+def testJSONLines():
+    outputFile = io.StringIO()
+    jsonWriter.writeJSONLine(outputFile, {"Test": "BED", "Errors": 2})
+    values = ["first", "sécond \"quoted\"", {"nested": [1]}]
+    jsonWriter.writeJSONLines(outputFile, {"Level": "Error", "Test": "BED"}, "Message", values)
+    lines = outputFile.getvalue().splitlines()
+    assert lines[0] == json.dumps({"Test": "BED", "Errors": 2})
+    assert lines[1:] == [json.dumps({"Level": "Error", "Test": "BED", "Message": value}) for value in values]
@@ -0,0 +1,128 @@
+import io
+import os
+import pytest
+from fbvsupport import bedTable
+from fbvsupport import fastaAnalysis
+from fbvsupport import referenceCache
+
+
+FASTA = b">chr1 first\nACGTACGTAC\nacgtNNNNRY\nAC\n>chr2\nGGGGCCCC\n"
+BED = "chr1\t0\t10\ta\t0\t+\nchr1\t5\t5\tb\t0\t+\nchr2\t-1\t4\tc\t2000\t*\nchr2\t1\t3\td\t.\t-\nchr2\t1\t3\te\tabc\t+\n"
+
+
+def writeFile(path:str, data:bytes) -> str:
+    file = open(path, 'wb')
+    file.write(data)
+    file.close()
+    return path
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return referenceCache.ReferenceCache(str(tmp_path / "cache"), sizeLimit=1024 * 1024, storeBEDTables=True)
+
+
+def assertTablesEqual(table:bedTable.BEDTable, expected:bedTable.BEDTable) -> None:
+    assert len(table) == len(expected)
+    assert list(table.lineErrors) == list(expected.lineErrors)
+    assert list(table.errorRows) == list(expected.errorRows)
+    for index in range(len(expected)):
+        assert (table.contig(index), table.starts[index], table.ends[index], table.name(index), table.strand(index)) == \
+               (expected.contig(index), expected.starts[index], expected.ends[index], expected.name(index), expected.strand(index))
+        assert table.errors(index) == expected.errors(index)
+        assert table[index] == expected[index]
+
+
+def testFastaAnalysisRoundTrip(tmp_path, cache):
+    fastaPath = writeFile(str(tmp_path / "ref.fa"), FASTA)
+    assert cache.load(fastaPath) is None
+    analysis = fastaAnalysis.analyzeFastaWithStatistics(fastaPath)
+    assert cache.store(fastaPath, *analysis)
+    assert cache.load(fastaPath) == analysis
+    faidx, fastaDict, statistics = analysis
+    assert cache.store(fastaPath, faidx, fastaDict)
+    assert cache.load(fastaPath) == (faidx, fastaDict, None)
+
+
+def testChangedFastaIsAMiss(tmp_path, cache):
+    fastaPath = writeFile(str(tmp_path / "ref.fa"), FASTA)
+    cache.store(fastaPath, *fastaAnalysis.analyzeFastaWithStatistics(fastaPath))
+    writeFile(fastaPath, FASTA.replace(b"GGGG", b"TTTT"))
+    os.utime(fastaPath, ns=(0, 0))
+    assert cache.load(fastaPath) is None
+
+
+def testBEDFindingsAndTableRoundTrip(tmp_path, cache, validationRun):
+    bedPath = writeFile(str(tmp_path / "regions.bed"), BED.encode())
+    fingerprint, findings = cache.loadBEDFindings(bedPath)
+    assert fingerprint and findings is None
+    table = bedTable.processBEDStream(io.StringIO(BED))
+    storedFindings = {"errors": list(table.lineErrors), "warnings": {"counts": {"Overlap": 2}}}
+    assert cache.storeBED(bedPath, fingerprint, table, storedFindings)
+    assert cache.loadBEDFindings(bedPath) == (fingerprint, storedFindings)
+    assertTablesEqual(cache.loadBEDTable(bedPath, fingerprint), table)
+
+
+def testBEDTablesAreOnlyStoredOnRequest(tmp_path, validationRun):
+    cache = referenceCache.ReferenceCache(str(tmp_path / "cache"), sizeLimit=1024 * 1024)
+    bedPath = writeFile(str(tmp_path / "regions.bed"), BED.encode())
+    fingerprint, findings = cache.loadBEDFindings(bedPath)
+    assert cache.storeBED(bedPath, fingerprint, bedTable.processBEDStream(io.StringIO(BED)), {"errors": []})
+    assert cache.loadBEDFindings(bedPath) == (fingerprint, {"errors": []})
+    assert cache.loadBEDTable(bedPath, fingerprint) is None
+
+
+def testOversizedBEDEntriesAreNotStored(tmp_path):
+    cache = referenceCache.ReferenceCache(str(tmp_path / "cache"), sizeLimit=400)
+    bedPath = writeFile(str(tmp_path / "regions.bed"), BED.encode())
+    fingerprint, findings = cache.loadBEDFindings(bedPath)
+    assert not cache.storeBED(bedPath, fingerprint, None, {"errors": ["x" * 200]})
+    assert cache.loadBEDFindings(bedPath) == (fingerprint, None)
+
+
+def testOversizedEntriesAreNotStored(tmp_path):
+    cache = referenceCache.ReferenceCache(str(tmp_path / "cache"), sizeLimit=400)
+    fastaPath = writeFile(str(tmp_path / "ref.fa"), FASTA)
+    assert not cache.store(fastaPath, *fastaAnalysis.analyzeFastaWithStatistics(fastaPath))
+    assert cache.load(fastaPath) is None
+
+
+def testEvictionRemovesLeastRecentlyUsed(tmp_path, cache):
+    fingerprints = []
+    for number in range(3):
+        fastaPath = writeFile(str(tmp_path / ("ref%s.fa" %number)), FASTA.replace(b"chr2", ("chr%s" %(number + 2)).encode()))
+        assert cache.store(fastaPath, *fastaAnalysis.analyzeFastaWithStatistics(fastaPath))
+        fingerprint = referenceCache.fingerprintFile(fastaPath)
+        os.utime(cache.entryPath(fingerprint), (1000 + number, 1000 + number))
+        fingerprints.append(fingerprint)
+    assert cache.evict() == []
+    os.utime(cache.entryPath(fingerprints[0]), (2000, 2000))  # Used most recently
+    cache.sizeLimit = os.path.getsize(cache.entryPath(fingerprints[1])) * 2
+    assert cache.evict() == [fingerprints[1]]
+    assert sorted(os.listdir(cache.directory)) == sorted(fingerprint + ".fbv" for fingerprint in (fingerprints[0], fingerprints[2]))
+    writeFile(os.path.join(cache.directory, "notes.txt"), b"Not a cache entry")
+    cache.clear()
+    assert os.listdir(cache.directory) == ["notes.txt"]
+
+
+@pytest.mark.parametrize("size, expected", [("1024", 1024), ("256M", 256 * 1024 * 1024), ("2g", 2 * 1024 ** 3), ("1.5KB", 1536), (" 10k ", 10240)])
+def testParseSize(size, expected):
+    assert referenceCache.parseSize(size) == expected
+
+
+@pytest.mark.parametrize("size", ["", "lots", "-5M", "M"])
+def testParseSizeRejectsBadSizes(size):
+    with pytest.raises(ValueError):
+        referenceCache.parseSize(size)
+
+
+def testSizeLimitFromEnvironment(tmp_path, monkeypatch):
+    monkeypatch.delenv(referenceCache.CACHESIZEVARIABLE, raising=False)
+    assert referenceCache.ReferenceCache(str(tmp_path)).sizeLimit == referenceCache.DEFAULTCACHESIZELIMIT
+    monkeypatch.setenv(referenceCache.CACHESIZEVARIABLE, "64M")
+    assert referenceCache.ReferenceCache(str(tmp_path)).sizeLimit == 64 * 1024 * 1024
+    assert referenceCache.ReferenceCache(str(tmp_path), sizeLimit=10).sizeLimit == 10
+    monkeypatch.setenv(referenceCache.CACHESIZEVARIABLE, "lots")
+    with pytest.raises(ValueError) as error:
+        referenceCache.ReferenceCache(str(tmp_path))
+    assert referenceCache.CACHESIZEVARIABLE in str(error.value)
@@ -0,0 +1,97 @@
+import os
+import random
+import pytest
+from fbvsupport import fastaAnalysis
+from fbvsupport import sequenceFetcher
+
+
+def makeFasta(directory, seed:int, bgzfWriter=None):
+    generator = random.Random(seed)
+    sequences = {"chr%s" %number: "".join(generator.choice("ACGTacgtN") for base in range(length))
+                 for number, length in ((1, 50000), (2, 777), (3, 0))}
+    lines = []
+    for contig, sequence in sequences.items():
+        lines.append(">" + contig)
+        lines += [sequence[lineStart:lineStart + 60] for lineStart in range(0, len(sequence), 60)]
+    data = ("\n".join(lines) + "\n").encode()
+    if bgzfWriter is None:
+        path = os.path.join(str(directory), "ref.fa")
+        file = open(path, 'wb')
+        file.write(data)
+        file.close()
+    else:
+        path = bgzfWriter(os.path.join(str(directory), "ref.fa.gz"), data, blockSize=4000)
+    faidx, fastaDict, statistics = fastaAnalysis.analyzeFastaWithStatistics(path)
+    return path, faidx, {contig: sequence.encode() for contig, sequence in sequences.items()}
+
+
+def randomIntervals(generator:random.Random, contigLength:int, count:int):
+    intervals = []
+    for number in range(count):
+        start = generator.randrange(-10, contigLength + 10)
+        intervals.append((start, start + generator.choice([0, 1, 59, 60, 61, 500, 20000])))
+    intervals.sort()
+    return [start for start, end in intervals], [end for start, end in intervals]
+
+
+class CountingFetcher(sequenceFetcher.SequenceFetcher):
+    """Records every byte range read so the tests can check what fetchSorted reads"""
+
+    def __init__(self, *args):
+        super().__init__(*args)
+        self.reads = []
+
+    def readBytes(self, startByte:int, endByte:int) -> bytes:
+        self.reads.append((startByte, endByte))
+        return super().readBytes(startByte, endByte)
+
+
+@pytest.mark.parametrize("compressed", [False, True])
+def testFetchMatchesSequence(tmp_path, bgzfWriter, compressed):
+    path, faidx, sequences = makeFasta(tmp_path, 1, bgzfWriter if compressed else None)
+    fetcher = sequenceFetcher.SequenceFetcher(path, faidx)
+    for contig, sequence in sequences.items():
+        for start, end in ((0, 0), (0, 1), (59, 61), (0, len(sequence)), (-5, 10), (len(sequence) - 3, len(sequence) + 100), (30, 20)):
+            assert fetcher.fetch(contig, start, end) == sequence[max(start, 0):max(end, 0)]
+    with pytest.raises(sequenceFetcher.SequenceFetchError):
+        fetcher.fetch("chrUnknown", 0, 10)
+    fetcher.close()
+
+
+@pytest.mark.parametrize("compressed", [False, True])
+def testFetchSortedMatchesFetch(tmp_path, bgzfWriter, compressed):
+    path, faidx, sequences = makeFasta(tmp_path, 2, bgzfWriter if compressed else None)
+    fetcher = sequenceFetcher.SequenceFetcher(path, faidx)
+    generator = random.Random(3)
+    for contig, sequence in sequences.items():
+        starts, ends = randomIntervals(generator, len(sequence), 300)
+        fetched = list(fetcher.fetchSorted(contig, starts, ends))
+        assert fetched == [fetcher.fetch(contig, start, end) for start, end in zip(starts, ends)]
+    fetcher.close()
+
+
+def testFetchSortedCoalescesReads(tmp_path, monkeypatch):
+    path, faidx, sequences = makeFasta(tmp_path, 4)
+    fetcher = CountingFetcher(path, faidx)
+    starts = list(range(0, 40000, 100))
+    ends = [start + 150 for start in starts]  # Every interval overlaps the next one
+    assert list(fetcher.fetchSorted("chr1", starts, ends)) == [sequences["chr1"][start:end] for start, end in zip(starts, ends)]
+    assert len(fetcher.reads) == 1
+    fetcher.reads = []
+    monkeypatch.setattr(sequenceFetcher, "_MAXREADBASES", 5000)
+    list(fetcher.fetchSorted("chr1", starts, ends))
+    assert 1 < len(fetcher.reads) < len(starts)
+    for (firstStart, firstEnd), (secondStart, secondEnd) in zip(fetcher.reads, fetcher.reads[1:]):
+        assert secondStart >= firstEnd  # Reads only move forward and never read the same bytes twice
+    fetcher.close()
+
+
+def testFetchSortedSkipsDistantIntervals(tmp_path):
+    path, faidx, sequences = makeFasta(tmp_path, 5)
+    fetcher = CountingFetcher(path, faidx)
+    starts = [0, 100, sequenceFetcher._COALESCEGAP * 2, sequenceFetcher._COALESCEGAP * 2 + 50]
+    ends = [start + 10 for start in starts]
+    assert list(fetcher.fetchSorted("chr1", starts, ends)) == [sequences["chr1"][start:end] for start, end in zip(starts, ends)]
+    assert len(fetcher.reads) == 2
+    assert sum(readEnd - readStart for readStart, readEnd in fetcher.reads) < sequenceFetcher._COALESCEGAP
+    fetcher.close()
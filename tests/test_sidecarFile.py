@@ -0,0 +1,71 @@
+import array
+import pytest
+from fbvsupport import sidecarFile
+
+
+FINGERPRINT = "0123456789abcdef0123456789abcdef01234567"
+SECTIONS = {
+    "starts": array.array("q", [0, 5, 1 << 40, -3]),
+    "scores": array.array("d", [0.0, 12.5, 1000.0]),
+    "codes": array.array("B", [1, 2, 3]),
+    "empty": array.array("q"),
+    "names": ["chr1", "name with spaces", "", "été"],
+    "noNames": [],
+    "findings": {"counts": {"Zero length": 3}, "entries": [["Zero length", "Line 1: zero length"]], "maxExamples": None}
+}
+
+
+def testSectionsRoundTrip(tmp_path):
+    path = sidecarFile.writeSidecar(str(tmp_path / "entry.fbv"), "BED", FINGERPRINT, SECTIONS)
+    sidecar = sidecarFile.Sidecar(path, "BED", FINGERPRINT)
+    for name, value in SECTIONS.items():
+        assert name in sidecar
+        stored = sidecar.section(name)
+        assert stored == value
+        assert type(stored) == type(value)
+        if isinstance(value, array.array):
+            assert stored.typecode == value.typecode
+    assert "missing" not in sidecar
+    with pytest.raises(sidecarFile.SidecarError):
+        sidecar.section("missing")
+    sidecar.close()
+
+
+def testSectionsAreAligned(tmp_path):
+    path = sidecarFile.writeSidecar(str(tmp_path / "entry.fbv"), "BED", FINGERPRINT, SECTIONS)
+    sidecar = sidecarFile.Sidecar(path, "BED", FINGERPRINT)
+    assert all(offset % 8 == 0 for typeCode, offset, length, count in sidecar.sections.values())
+    sidecar.close()
+
+
+@pytest.mark.parametrize("kind, fingerprint", [("FASTA", FINGERPRINT), ("BED", "f" * 40)])
+def testWrongKindOrFingerprintIsRejected(tmp_path, kind, fingerprint):
+    path = sidecarFile.writeSidecar(str(tmp_path / "entry.fbv"), "BED", FINGERPRINT, SECTIONS)
+    with pytest.raises(sidecarFile.SidecarError):
+        sidecarFile.Sidecar(path, kind, fingerprint)
+
+
+def testDamagedFilesAreRejected(tmp_path):
+    path = sidecarFile.writeSidecar(str(tmp_path / "entry.fbv"), "BED", FINGERPRINT, SECTIONS)
+    data = open(path, 'rb').read()
+    for damagedData in (b"", data[:20], data[:len(data) // 2], b"NOTSIDE" + data[7:]):
+        damagedFile = open(path, 'wb')
+        damagedFile.write(damagedData)
+        damagedFile.close()
+        with pytest.raises(sidecarFile.SidecarError):
+            sidecarFile.Sidecar(path, "BED", FINGERPRINT)
+
+
+def testStringsWithNewlinesAreRefused(tmp_path):
+    path = str(tmp_path / "entry.fbv")
+    with pytest.raises(sidecarFile.SidecarError):
+        sidecarFile.writeSidecar(path, "BED", FINGERPRINT, {"names": ["one", "two\nthree"]})
+
+
+def testSectionSizeEstimate():
+    for value in SECTIONS.values():
+        typeCode, data, count = sidecarFile.encodeSection(value)
+        if isinstance(value, array.array):
+            assert sidecarFile.sectionSize(value) == len(data)
+        else:
+            assert abs(sidecarFile.sectionSize(value) - len(data)) <= max(len(value), 1) * 2
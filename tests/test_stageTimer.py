@@ -0,0 +1,66 @@
+import itertools
+import logging
+import pytest
+from fbvsupport import stageTimer
+from fbvsupport import validationReport
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """A perf_counter that moves on one second every time it is read"""
+    ticks = itertools.count()
+    monkeypatch.setattr(stageTimer.time, "perf_counter", lambda: float(next(ticks)))
+
+
+def testStagesEnteredAgainAddUp(clock):
+    timer = stageTimer.StageTimer()
+    for chunk in range(3):
+        with timer.stage("Validate") as record:
+            record.addRows(10)
+            record.addBytes(100)
+    record = timer.records["Validate"]
+    assert (record.seconds, record.calls, record.rows, record.bytesRead) == (3.0, 3, 30, 300)
+    values = timer.toDict()["Validate"]
+    assert (values["Seconds"], values["Calls"], values["Rows"], values["Rows Per Second"], values["Bytes Read"]) == (3.0, 3, 30, 10, 300)
+    assert values["Megabytes Per Second"] == 0.0
+
+
+def testIterateOnlyTimesProducingItems(clock):
+    timer = stageTimer.StageTimer()
+    items = []
+    for item in timer.iterate("Read", ["a", "b"]):
+        stageTimer.time.perf_counter()  # Time the caller spends is left out
+        items.append(item)
+    assert items == ["a", "b"]
+    assert (timer.records["Read"].seconds, timer.records["Read"].calls) == (3.0, 1)  # Two items and the end of the iterable
+
+
+def testDisabledTimerKeepsNothing():
+    timer = stageTimer.StageTimer(enabled=False)
+    with timer.stage("Validate") as record:
+        record.addRows(10)
+    assert list(timer.iterate("Read", [1, 2])) == [1, 2]
+    timer.merge([stageTimer.StageRecord("Worker", 1.0, 1)])
+    assert timer.records == {} and timer.toDict() == {}
+
+
+def testMergeAddsWorkerRecords(clock):
+    timer = stageTimer.StageTimer()
+    with timer.stage("Read") as record:
+        record.addRows(5)
+    timer.merge([stageTimer.StageRecord("Read", 2.0, 1, rows=7, peakMemory=10), stageTimer.StageRecord("Index", 0.5, 1, bytesRead=20)])
+    read = timer.records["Read"]
+    assert (read.seconds, read.calls, read.rows) == (3.0, 2, 12)
+    assert read.peakMemory == max(10, stageTimer.peakMemoryBytes() or 0)
+    assert timer.toDict()["Index"] == {"Seconds": 0.5, "Bytes Read": 20, "Megabytes Per Second": 0.0}
+
+
+def testPerformanceSectionOnlyWhenInstrumented(caplog):
+    report = validationReport.ValidationReport("Test")
+    assert "Performance" not in report.toDict()["Test"]
+    report.addPerformance("Read", {"Seconds": 1.5})
+    report.addPerformance("Read", {"Rows": 10})
+    assert report.toDict()["Test"]["Performance"] == {"Read": {"Seconds": 1.5, "Rows": 10}}
+    with caplog.at_level(logging.INFO):
+        report.dumpToLogger(logging.getLogger("test"))
+    assert "Performance of Read: Seconds 1.5, Rows 10" in caplog.text
@@ -0,0 +1,77 @@
+import http.client
+import json
+import threading
+import pytest
+from fbvsupport import validationServer
+
+
+TOKEN = "test-token"
+
+
+@pytest.fixture
+def server():
+    server = validationServer.ValidationServer(port=0, token=TOKEN, defaultOptions={"backend": "builtin"})
+    thread = threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def sendRequest(server, method:str, path:str, body:bytes=None, headers:dict=None) -> tuple:
+    connection = http.client.HTTPConnection("127.0.0.1", server.server_address[1], timeout=30)
+    allHeaders = {validationServer.TOKENHEADER: TOKEN, "Content-Type": "application/json"}
+    allHeaders.update(headers or {})
+    connection.request(method, path, body, {name: value for name, value in allHeaders.items() if value is not None})
+    response = connection.getresponse()
+    result = response.status, json.loads(response.read())
+    connection.close()
+    return result
+
+
+def writeFasta(directory) -> str:
+    fastaPath = str(directory / "ref.fa")
+    fastaFile = open(fastaPath, 'w')
+    fastaFile.write(">chr1\nACGTACGTAC\nACGT\n>chr2\nGGCC\n")
+    fastaFile.close()
+    return fastaPath
+
+
+@pytest.mark.parametrize("headers", [{validationServer.TOKENHEADER: None}, {validationServer.TOKENHEADER: "wrong"}])
+def testRequestsWithoutTheTokenAreRefused(server, headers):
+    for method, path in (("GET", "/status"), ("POST", "/validate")):
+        status, response = sendRequest(server, method, path, b"{}", headers)
+        assert status == 403 and validationServer.TOKENHEADER in response["Error"]
+
+
+@pytest.mark.parametrize("host", ["example.com", "example.com:%s", "127.0.0.1:1", "localhost"])
+def testRequestsForAnotherHostAreRefused(server, host):
+    if "%s" in host:
+        host %= server.server_address[1]
+    status, response = sendRequest(server, "GET", "/status", headers={"Host": host})
+    assert status == 403 and "Requests must be sent to" in response["Error"]
+
+
+@pytest.mark.parametrize("contentType", [None, "text/plain", "application/x-www-form-urlencoded", "multipart/form-data; boundary=x"])
+def testJobsThatAreNotJSONAreRefused(server, tmp_path, contentType):
+    body = json.dumps({"fasta": writeFasta(tmp_path)}).encode()
+    status, response = sendRequest(server, "POST", "/validate", body, {"Content-Type": contentType})
+    assert status == 415 and "application/json" in response["Error"]
+    assert server.jobCount == 0
+
+
+def testJobsAreRunAndCounted(server, tmp_path):
+    fastaPath = writeFasta(tmp_path)
+    assert sendRequest(server, "GET", "/status", headers={"Host": "localhost:%s" %server.server_address[1]})[0] == 200
+    assert sendRequest(server, "POST", "/validate", b'{"fasta": 5}')[0] == 400
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(sendRequest(server, "POST", "/validate", json.dumps({"fasta": fastaPath}).encode())))
+               for job in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert [status for status, report in results] == [200] * 4
+    assert all(report == results[0][1] for status, report in results)
+    status, response = sendRequest(server, "GET", "/status")
+    assert (status, response["Jobs"], response["References"]) == (200, 4, [fastaPath])
@@ -0,0 +1,134 @@
+import json
+import random
+import re
+import pytest
+from fbvsupport import contigBoundsChecker
+from fbvsupport import errorCollection
+from fbvsupport import validations
+
+
+CONTIGLENGTHS = contigBoundsChecker.ContigLengthTable(["chr1", "chr2"], [5000, 3000])
+
+
+def makeBED12(rowCount:int, seed:int) -> str:
+    """Rows with a mix of line errors, block errors, duplicated and similar names, duplicated intervals, unknown contigs and intervals past
+    the end of their contig"""
+    generator = random.Random(seed)
+    lines = []
+    for row in range(rowCount):
+        contig = generator.choice(["chr1", "chr1", "chr2", "chrUn"])
+        start = generator.randrange(0, 5000)
+        end = start + generator.randrange(1, 300)
+        name = generator.choice(["name%s" %row, "name%s" %row, "name%s" %generator.randrange(rowCount), "NAME%s" %generator.randrange(rowCount)])
+        blockSize = end - start
+        fault = generator.randrange(20)
+        if fault == 0:
+            start, end = end, start
+        elif fault == 1:
+            blockSize -= 1
+        elif fault == 2 and lines:  # The interval of the row before under a new name
+            contig, start, end = lines[-1].split("\t")[:3]
+            start, end = int(start), int(end)
+            blockSize = end - start
+        lines.append("%s\t%s\t%s\t%s\t0\t+\t%s\t%s\t0,0,0\t1\t%s,\t0,\n" %(contig, start, end, name, min(start, end), max(start, end), blockSize))
+    return "".join(lines)
+
+
+@pytest.fixture
+def bedPath(tmp_path):
+    path = str(tmp_path / "regions.bed")
+    file = open(path, 'w')
+    file.write(makeBED12(3000, 1))
+    file.close()
+    return path
+
+
+def findingsOf(result:tuple) -> tuple:
+    failure, errors, crosscheckErrors, index = result
+    return failure, list(errors), errors.counts, list(crosscheckErrors), crosscheckErrors.counts
+
+
+@pytest.mark.parametrize("maxExamples", [None, 5])
+def testStreamingMatchesWholeFile(validationRun, bedPath, maxExamples):
+    wholeFile = validations.validateBEDFile(bedPath, CONTIGLENGTHS, maxExamples=maxExamples)
+    assert wholeFile[1] and wholeFile[2]
+    streamed = validations.validateBEDFile(bedPath, CONTIGLENGTHS, streaming=True, maxExamples=maxExamples)
+    assert findingsOf(streamed) == findingsOf(wholeFile)
+    smallChunks = validations.validateBEDStream(bedPath, CONTIGLENGTHS, chunkSize=97, maxExamples=maxExamples)
+    assert findingsOf(("",) + smallChunks) == findingsOf(wholeFile)
+
+
+def testStreamingIntervalIndexMatchesWholeFile(validationRun, bedPath):
+    wholeFileIndex = validations.validateBEDFile(bedPath, CONTIGLENGTHS, buildIntervalIndex=True)[3]
+    streamedIndex = validations.validateBEDStream(bedPath, CONTIGLENGTHS, chunkSize=97, buildIntervalIndex=True)[2]
+    assert streamedIndex.findOverlaps() == wholeFileIndex.findOverlaps()
+    assert streamedIndex.footprint() == wholeFileIndex.footprint()
+
+
+def writeReferenceAndBEDs(directory, bedCount:int) -> tuple:
+    generator = random.Random(2)
+    fastaPath = str(directory / "ref.fa")
+    fastaFile = open(fastaPath, 'w')
+    for contig, length in zip(CONTIGLENGTHS.contigs, CONTIGLENGTHS.lengths):
+        sequence = "".join(generator.choice("ACGT") for base in range(length))
+        fastaFile.write(">%s\n%s\n" %(contig, "\n".join(sequence[lineStart:lineStart + 60] for lineStart in range(0, length, 60))))
+    fastaFile.close()
+    bedPaths = []
+    for bedNumber in range(bedCount):
+        bedPath = str(directory / ("regions%s.bed" %bedNumber))
+        bedFile = open(bedPath, 'w')
+        bedFile.write(makeBED12(500 + 100 * bedNumber, 10 + bedNumber) if bedNumber != 2 else "chr1\t0\t10\tname\tscore\n")  # The third cannot be read
+        bedFile.close()
+        bedPaths.append(bedPath)
+    return fastaPath, bedPaths
+
+
+def testWorkersGiveTheSerialReport(tmp_path):
+    fastaPath, bedPaths = writeReferenceAndBEDs(tmp_path, 5)
+    options = {"verbose": False, "useCache": False, "backend": "builtin", "checkOverlaps": True, "compareBEDs": True, "maxExamples": 20}
+    serialReport = validations.generateValidationReport(fastaPath, *bedPaths, workers=1, **options).toDict()
+    parallelReport = validations.generateValidationReport(fastaPath, *bedPaths, workers=3, **options).toDict()
+    assert serialReport == parallelReport
+    assert json.dumps(serialReport) == json.dumps(parallelReport)  # The same order as well
+
+
+def simplifyNameByRegex(name:str) -> str:
+    """The original simplifyName"""
+    return re.sub(r"\s", "", name.lower())
+
+
+def testSimplifyNamesMatchesRegex():
+    generator = random.Random(3)
+    characters = list(map(chr, range(0x3100)))
+    names = characters + ["Chr 1", "chr\t1_ALT", "", "\x00", "a\x00B", "\u039f\u03a3 \u03a3", "CHR\u3000Un", "\u0130stanbul"]
+    names += ["".join(generator.choice(characters[:0x80] + ["\u00a0", "\u2028", "\u03a3"]) for length in range(generator.randrange(12))) for name in range(2000)]
+    expected = list(map(simplifyNameByRegex, names))
+    assert list(map(validations.simplifyName, names)) == expected
+    assert validations.simplifyNames(names) == expected
+    asciiNames = [name for name in names if name.isascii() and "\x00" not in name]
+    assert validations.simplifyNames(iter(asciiNames)) == list(map(simplifyNameByRegex, asciiNames))  # The joined column path
+    assert validations.simplifyNames([]) == []
+
+
+def testInstrumentedReportAddsPerformanceOnly(tmp_path):
+    fastaPath, bedPaths = writeReferenceAndBEDs(tmp_path, 2)
+    plainReport = validations.generateValidationReport(fastaPath, *bedPaths, backend="builtin", useCache=False).toDict()
+    instrumentedReport = validations.generateValidationReport(fastaPath, *bedPaths, backend="builtin", useCache=False, instrument=True).toDict()
+    testName, = instrumentedReport
+    performance = instrumentedReport[testName].pop("Performance")
+    assert instrumentedReport == plainReport
+    assert "Total" in performance and "Analyze FASTA file %s" %fastaPath in performance
+    for bedPath in bedPaths:
+        assert performance["Read BED file %s" %bedPath]["Rows"] == 500 + 100 * bedPaths.index(bedPath)
+
+
+def testUnreadableBEDGivesEmptyErrorCollections(tmp_path):
+    bedPath = str(tmp_path / "unreadable.bed")
+    bedFile = open(bedPath, 'w')
+    bedFile.write("chr1\t0\t10\tname\tscore\n")
+    bedFile.close()
+    failure, errors, crosscheckErrors, index = validations.validateBEDFile(bedPath, CONTIGLENGTHS, maxExamples=5)
+    assert failure.startswith("%s reading failed" %bedPath)
+    for collection in (errors, crosscheckErrors):
+        assert isinstance(collection, errorCollection.ErrorCollection) and not collection and collection.maxExamples == 5
+    assert index is None
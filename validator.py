@@ -5,12 +5,88 @@ import traceback
 import fbvsupport
 
 
-TESTNAME = "FASTA and BED Validation"
+TESTNAME = fbvsupport.validations.REPORTNAME
+
+NDJSONENDINGS = (".ndjson", ".jsonl")
+
+
+FLAGOPTIONS = {
+    "--streaming": ("streaming", True),
+    "--no-cache": ("useCache", False),
+    "--cache-bed-tables": ("cacheBEDTables", True),
+    "--check-overlaps": ("checkOverlaps", True),
+    "--compare": ("compareBEDs", True),
+    "--instrument": ("instrument", True),
+    "--check-sequence": ("checkSequence", True),
+    "--check-fasta-content": ("checkFastaContent", True),
+    "--write-index": ("writeIndex", True),
+    "--serve": ("serve", True)
+}
+
+VALUEOPTIONS = {
+    "--workers": ("workers", int),
+    "--cache-dir": ("cacheDirectory", str),
+    "--cache-size-mb": ("cacheSizeLimit", lambda value: int(float(value) * 1024 * 1024)),
+    "--backend": ("backend", fbvsupport.validations.parseBackend),
+    "--max-examples": ("maxExamples", lambda value: int(value) or None),
+    "--gc-range": ("gcRange", fbvsupport.validations.parseGCRange),
+    "--max-soft-masked": ("maxSoftMasked", float),
+    "--port": ("port", int),
+    "--manifest": ("manifestPath", str)
+}
 
 
 def printHelp():
-    print("USAGE: python3 validator.py <input.fasta> [<in1.bed> <in2.bed> <inN.bed>] <output.json>")
+    print("USAGE: python3 validator.py [options] <input.fasta> [<in1.bed> <in2.bed> <inN.bed>] <output.json>")
     print("This program requires an input FASTA and an output file to be specified. BED files are optional, but can include as many as needed to validate against the FASTA.")
+    print("An output file ending in %s is written as newline delimited JSON with one line per finding." %" or ".join(NDJSONENDINGS))
+    print("Options:")
+    print("  --streaming    Validate BED files in a single pass without loading them into memory (for very large BED files)")
+    print("  --check-overlaps    Warn about overlapping and nested intervals within each BED file and report each file's merged footprint")
+    print("  --compare    Treat the first BED file as targets and compare every other BED file (such as baits or primers) with it")
+    print("  --check-sequence    Read the bases of every BED interval from the FASTA and warn about intervals that are entirely N, mostly soft-masked or outside the GC range")
+    print("  --gc-range MIN,MAX    GC fractions (or percentages) for --check-sequence to accept (default %s,%s)" %fbvsupport.validations.DEFAULTGCRANGE)
+    print("  --max-soft-masked F    Fraction of an interval that may be soft-masked (lower case) before --check-sequence warns about it (default %s)" %fbvsupport.validations.DEFAULTMAXSOFTMASKED)
+    print("  --check-fasta-content    Warn about FASTA contigs with IUPAC ambiguity codes or characters that are not nucleotide codes, and contigs that are entirely N or entirely soft-masked")
+    print("  --instrument    Record the time, rows and bytes handled and peak memory of each stage in a Performance section of the report")
+    print("  --workers N    Validate up to N BED files at the same time in separate processes (default 1)")
+    print("  --max-examples N    List at most N errors and warnings of each kind for each BED file and only count the rest (default %s, 0 lists them all)" %fbvsupport.errorCollection.DEFAULTMAXEXAMPLES)
+    print("  --no-cache    Always analyze the FASTA instead of using a cached analysis from an earlier run")
+    print("  --cache-dir PATH    Directory for cached FASTA analyses (default %s, or set FBV_CACHE_DIR)" %fbvsupport.referenceCache.DEFAULTCACHEDIRECTORY)
+    print("  --cache-bed-tables    Also cache the parsed columns of each BED file, so an unchanged BED file is not parsed again by later runs with other options (entries over a quarter of the cache size limit are never stored)")
+    print("  --cache-size-mb N    Size limit for the FASTA analysis cache in megabytes (default %s, or set %s to a size such as 512M)" %(fbvsupport.referenceCache.DEFAULTCACHESIZELIMIT // (1024 * 1024), fbvsupport.referenceCache.CACHESIZEVARIABLE))
+    print("  --write-index    Write the FASTA index (.fai), dictionary (.dict) and BGZF block index (.gzi) next to the FASTA, as Samtools does, when the builtin analysis makes them")
+    print("  --backend NAME    How to index the FASTA: %s (default auto, which uses Samtools if it is installed and the builtin analysis if not)" %", ".join(fbvsupport.validations.BACKENDS))
+    print("Batch mode: python3 validator.py --manifest <manifest.tsv or manifest.json> [options]")
+    print("  --manifest PATH    Run every job listed in the manifest, each with its own report (TSV lines of FASTA, BED files and output file, or a JSON list of {\"fasta\", \"beds\", \"output\"}). Each FASTA is only analyzed once and the options apply to every job.")
+    print("Server mode: python3 validator.py --serve [--port N] [options] [<reference1.fasta> <referenceN.fasta>]")
+    print("  --serve    Run as a server on localhost that takes validation jobs over HTTP, keeping the given references (and any others jobs use) loaded between jobs")
+    print("  --port N    Port for the server to listen on (default %s). Other options given with --serve are the defaults for every job." %fbvsupport.validationServer.DEFAULTPORT)
+    print("  Requests must carry the token the server prints at start up (or the one set in FBV_SERVER_TOKEN) in an %s header." %fbvsupport.validationServer.TOKENHEADER)
+
+
+def separateOptions(args:typing.List[str]) -> typing.Tuple[typing.List[str], dict]:
+    positionalArgs = []
+    options = {}
+    argIterator = iter(args)
+    for arg in argIterator:
+        if arg in FLAGOPTIONS:
+            optionName, value = FLAGOPTIONS[arg]
+            options[optionName] = value
+        elif arg in VALUEOPTIONS:
+            optionName, optionType = VALUEOPTIONS[arg]
+            value = next(argIterator, None)
+            if value is None:
+                raise ArgumentValidationFailure("Option %s requires a value" %arg)
+            try:
+                options[optionName] = optionType(value)
+            except ValueError:
+                raise ArgumentValidationFailure("Unable to use %s as the value for option %s" %(value, arg))
+        elif arg.startswith("--"):
+            raise ArgumentValidationFailure("Unrecognized option %s" %arg)
+        else:
+            positionalArgs.append(arg)
+    return positionalArgs, options
 
 
 def getFilePathsFromGUI() -> typing.List[str]:
@@ -36,8 +112,12 @@ def getFilePathsFromGUI() -> typing.List[str]:
 
 class ArgPack:
 
-    def __init__(self, fastaFile:str, bedFiles:typing.List[str], outputFile:str, skipValidation:bool=False, expectBedFiles:bool=True):
+    def __init__(self, fastaFile:str, bedFiles:typing.List[str], outputFile:str, skipValidation:bool=False, expectBedFiles:bool=True, options:dict=None):
         self.fastaFile = fastaFile
+        if not options:
+            self.options = {}
+        else:
+            self.options = options
         if not bedFiles:
             self.bedFiles = []
         else:
@@ -61,6 +141,7 @@ class ArgPack:
 
         # The following block of checks are to prevent a user who forgot to include an output file path from accidentally overwriting a BED file by mistake
         bedEndings = [".bed", ".bed3", ".bed4", ".bed6", ".bed12"]
+        bedEndings += [ending + ".gz" for ending in bedEndings] + [ending + ".bgz" for ending in bedEndings]
         for ending in bedEndings:
             if self.outputFile.lower().endswith(ending):
                 raise ArgumentValidationFailure("Given output file path of %s appears to end with %s and looks like it wants to be a BED file. \
@@ -68,7 +149,7 @@ class ArgPack:
                 Is that what happened here?" %(self.outputFile, ending))
         if os.path.isfile(self.outputFile) and os.stat(self.outputFile).st_size != 0:
             try:
-                testBed =fbvsupport.bedReader.readBEDFile(self.outputFile)
+                testBed =fbvsupport.bedTable.readBEDFile(self.outputFile)
             except: # Using a generic exception here because this is expected to fail in some way
                 pass
             else: # What I want to find is if I can read the output file as a BED without failures
@@ -88,7 +169,9 @@ class ArgPack:
 
     @classmethod
     def fromArgv(cls):
-        positionalArgs = sys.argv[1:]
+        positionalArgs, options = separateOptions(sys.argv[1:])
+        if "port" in options:
+            raise ArgumentValidationFailure("Option --port can only be used with --serve")
         if len(positionalArgs) == 0 and fbvsupport.gui.active:
                 positionalArgs = getFilePathsFromGUI()
         if not len(positionalArgs) >= 2:
@@ -98,7 +181,7 @@ class ArgPack:
         fasta = positionalArgs[0]
         output = positionalArgs[-1]
         beds = positionalArgs[1: -1]
-        return cls(fasta, beds, output)
+        return cls(fasta, beds, output, options=options)
 
 
 class ArgumentValidationFailure(Exception):
@@ -109,29 +192,75 @@ def parseArgs() -> ArgPack:
     return ArgPack.fromArgv()
 
 
-def validateFASTAAndBEDs(fastaPath:str, *bedPaths:str) -> fbvsupport.validationReport.ValidationReport:
-    return fbvsupport.validations.generateValidationReport(fastaPath, *bedPaths)
+def validateFASTAAndBEDs(fastaPath:str, *bedPaths:str, **options) -> fbvsupport.validationReport.ValidationReport:
+    return fbvsupport.validations.generateValidationReport(fastaPath, *bedPaths, **options)
 
 
 def writeOutputFile(validationReport:fbvsupport.validationReport.ValidationReport, outputPath:str, indent:int=2) -> str:
     outputFile = open(outputPath, 'w')
-    outputFile.write(validationReport.toJSON(indent))
+    if outputPath.lower().endswith(NDJSONENDINGS):
+        validationReport.writeNDJSON(outputFile)
+    else:
+        validationReport.writeJSON(outputFile, indent)
     outputFile.close()
     return outputPath
 
 
+def runManifest(positionalArgs:typing.List[str], options:dict) -> None:
+    manifestPath = options.pop("manifestPath")
+    if positionalArgs:
+        raise ArgumentValidationFailure("Files to validate are listed in the manifest, but %s were also given on the command line" %", ".join(positionalArgs))
+    if "port" in options:
+        raise ArgumentValidationFailure("Option --port can only be used with --serve")
+    jobs = fbvsupport.batchValidation.readManifest(manifestPath)
+    for job in jobs:
+        ArgPack(job.fastaPath, job.bedPaths, job.outputPath)  # Checks the files and output path of every job before any of them runs
+    passedCount = 0
+    for job, validationReport in fbvsupport.batchValidation.runBatch(jobs, **options):
+        writeOutputFile(validationReport, job.outputPath)
+        print("%s -> %s" %(validationReport, job.outputPath))
+        passedCount += validationReport.passed
+    print("%s of %s jobs passed" %(passedCount, len(jobs)))
+
+
+def serveValidations(fastaPaths:typing.List[str], options:dict) -> None:
+    options.pop("serve", None)
+    if "manifestPath" in options:
+        raise ArgumentValidationFailure("Option --manifest cannot be used with --serve")
+    port = options.pop("port", fbvsupport.validationServer.DEFAULTPORT)
+    server = fbvsupport.validationServer.makeServer(port, fastaPaths, token=os.environ.get("FBV_SERVER_TOKEN"), **options)
+    print("Serving validations at http://%s:%s (POST jobs to /validate). Press Ctrl+C to stop." %server.server_address)
+    print("Send this token in an %s header with every request: %s" %(fbvsupport.validationServer.TOKENHEADER, server.token))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("Stopping server")
+    finally:
+        server.server_close()
+
+
 class PointlessPlaceholderException(Exception):
     pass
 
 
 if __name__ == "__main__":
+    if getattr(sys, "frozen", False):
+        import multiprocessing  # Only imported where it is needed, to keep start up quick
+        multiprocessing.freeze_support()  # Needed for worker processes when running as a frozen executable
     exitStatus = 0
     allOrNothingException = Exception
     try:
-        args = parseArgs()
-        validationReport = validateFASTAAndBEDs(args.fastaFile, *args.bedFiles)
-        writeOutputFile(validationReport, args.outputFile)
-        print(validationReport)
+        if "--help" in sys.argv[1:] or "-h" in sys.argv[1:]:
+            printHelp()
+        elif "--serve" in sys.argv[1:]:
+            serveValidations(*separateOptions(sys.argv[1:]))
+        elif "--manifest" in sys.argv[1:]:
+            runManifest(*separateOptions(sys.argv[1:]))
+        else:
+            args = parseArgs()
+            validationReport = validateFASTAAndBEDs(args.fastaFile, *args.bedFiles, **args.options)
+            writeOutputFile(validationReport, args.outputFile)
+            print(validationReport)
     except allOrNothingException as err:
         print("Encountered an unhandled error as follows:")
         traceback.print_exc()